@@ -0,0 +1,278 @@
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+import subprocess
+from datetime import datetime
+from db_conector import get_db_connection, Base, DB_HOST
+import modelo_tablas  # Registra las tablas en Base.metadata
+
+# Benchmark de punta a punta del pipeline: cada etapa corre en un subproceso y se mide su
+# tiempo, las filas procesadas y la memoria máxima (RSS). Los resultados se agregan a un
+# historial JSON y se comparan con la corrida anterior de la misma escala.
+RUTA_ORM = os.path.dirname(os.path.abspath(__file__))
+RUTA_RAIZ = os.path.dirname(RUTA_ORM)
+RUTA_HISTORIAL = os.path.join(RUTA_RAIZ, 'logs', 'benchmark_pipeline.json')
+RUTA_LOGS_ETAPAS = os.path.join(RUTA_RAIZ, 'logs', 'benchmark')
+
+# Una etapa se marca como regresión si tarda más que la línea base en esta proporción
+# y además en al menos SEGUNDOS_MINIMOS (para no reportar ruido en etapas muy cortas).
+UMBRAL_REGRESION = 0.20
+SEGUNDOS_MINIMOS = 0.5
+
+HOSTS_LOCALES = ('localhost', '127.0.0.1', '::1', 'db')
+
+PANELES_DASHBOARD = [
+    'top_ingresos',
+    'top_crecimiento',
+    'top_intencion',
+    'datos_dispersion',
+    'productos_estrella',
+    'productos_potencial',
+    'pagos_metodos',
+    'mix_metodos',
+    'mejor_calificados'
+]
+
+
+def ejecutar_etapa(nombre, comando, escala, cwd=RUTA_ORM):
+    """
+    Ejecuta un comando como subproceso y devuelve sus métricas: segundos de reloj, código de
+    salida y RSS máximo (os.wait4 devuelve el uso de recursos del hijo, ru_maxrss en KB).
+    La salida del comando queda en logs/benchmark/<etapa>_x<escala>.log.
+    """
+    os.makedirs(RUTA_LOGS_ETAPAS, exist_ok=True)
+    ruta_log = os.path.join(RUTA_LOGS_ETAPAS, f"{nombre}_x{escala}.log")
+    print(f"--> [{nombre}] {' '.join(comando)}")
+    with open(ruta_log, 'w', encoding='utf-8') as log:
+        inicio = time.perf_counter()
+        proceso = subprocess.Popen(comando, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+        _, estado, uso = os.wait4(proceso.pid, 0)
+        segundos = time.perf_counter() - inicio
+    codigo = os.waitstatus_to_exitcode(estado)
+    metricas = {
+        'segundos': round(segundos, 3),
+        'rss_max_mb': round(uso.ru_maxrss / 1024, 1),
+        'codigo': codigo,
+        'log': os.path.relpath(ruta_log, RUTA_RAIZ)
+    }
+    if codigo != 0:
+        print(f"❌ [{nombre}] terminó con código {codigo}, ver {metricas['log']}")
+    else:
+        print(f"    {segundos:.2f} s, RSS máx. {metricas['rss_max_mb']} MB")
+    return metricas
+
+
+def _con_filas(metricas, filas):
+    metricas['filas'] = filas
+    if filas is not None and metricas['segundos'] > 0:
+        metricas['filas_por_segundo'] = round(filas / metricas['segundos'], 1)
+    return metricas
+
+
+def leer_run_results(proyecto_dbt):
+    """Tiempos por modelo del último comando de dbt, tomados de target/run_results.json."""
+    ruta = os.path.join(proyecto_dbt, 'target', 'run_results.json')
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, 'r', encoding='utf-8') as archivo:
+        resultados = json.load(archivo)
+    modelos = {}
+    for resultado in resultados.get('results', []):
+        respuesta = resultado.get('adapter_response') or {}
+        modelos[resultado['unique_id']] = {
+            'segundos': round(resultado.get('execution_time') or 0.0, 3),
+            'estado': resultado.get('status'),
+            'filas': respuesta.get('rows_affected')
+        }
+    return modelos
+
+
+def contar_filas_origen():
+    with get_db_connection() as conn:
+        return sum(
+            conn.exec_driver_sql(f"SELECT COUNT(*) FROM {tabla.name}").scalar()
+            for tabla in Base.metadata.sorted_tables
+        )
+
+
+def reiniciar_base():
+    """Deja la base vacía para la escala siguiente: tablas de origen y snapshots de dbt."""
+    tablas = ', '.join(tabla.name for tabla in Base.metadata.sorted_tables)
+    with get_db_connection() as conn:
+        with conn.begin():
+            conn.exec_driver_sql(f"TRUNCATE {tablas} RESTART IDENTITY CASCADE")
+            conn.exec_driver_sql("DROP SCHEMA IF EXISTS dbt_snapshots CASCADE")
+
+
+def etapa_dbt(nombre, argumentos, escala, dbt, proyecto_dbt, perfiles_dbt):
+    comando = [dbt] + argumentos + ['--project-dir', proyecto_dbt, '--profiles-dir', perfiles_dbt]
+    metricas = ejecutar_etapa(nombre, comando, escala, cwd=proyecto_dbt)
+    modelos = leer_run_results(proyecto_dbt) if metricas['codigo'] == 0 else {}
+    filas = [modelo['filas'] for modelo in modelos.values() if modelo['filas'] is not None]
+    metricas['modelos'] = modelos
+    return _con_filas(metricas, sum(filas) if filas else None)
+
+
+def ejecutar_pipeline(escala, dbt, proyecto_dbt, perfiles_dbt, semilla=42):
+    """Corre todas las etapas para una escala; se detiene en la primera que falla."""
+    carpeta = os.path.join(RUTA_ORM, 'datos_sinteticos', f"x{escala}")
+    if not glob.glob(os.path.join(carpeta, '*.csv.gz')):
+        # La generación de datos no forma parte de lo que se mide
+        subprocess.run([sys.executable, 'generar_datos.py', '--escala', str(escala),
+                        '--semilla', str(semilla), '--salida', carpeta], cwd=RUTA_ORM, check=True)
+
+    etapas = {}
+    etapas['crear_tablas'] = ejecutar_etapa('crear_tablas', [sys.executable, 'crear_tablas.py'], escala)
+    if etapas['crear_tablas']['codigo'] != 0:
+        return etapas
+
+    reiniciar_base()
+    archivos = sorted(glob.glob(os.path.join(carpeta, '*.csv.gz')))
+    etapas['cargar_datos'] = ejecutar_etapa(
+        'cargar_datos',
+        [sys.executable, 'cargar_datos.py', '--modo', 'copy', '--paralelo', '4', '--archivos'] + archivos,
+        escala
+    )
+    if etapas['cargar_datos']['codigo'] != 0:
+        return etapas
+    _con_filas(etapas['cargar_datos'], contar_filas_origen())
+
+    pasos_dbt = [
+        ('dbt_snapshot', ['snapshot']),
+        ('dbt_run_bronze', ['run', '--select', 'path:models/bronze', '--full-refresh']),
+        ('dbt_run_silver', ['run', '--select', 'path:models/silver', '--full-refresh']),
+        ('dbt_run_gold', ['run', '--select', 'path:models/gold', '--full-refresh'])
+    ]
+    for nombre, argumentos in pasos_dbt:
+        etapas[nombre] = etapa_dbt(nombre, argumentos, escala, dbt, proyecto_dbt, perfiles_dbt)
+        if etapas[nombre]['codigo'] != 0:
+            return etapas
+
+    etapas['consulta_dashboard'] = ejecutar_etapa(
+        'consulta_dashboard', [sys.executable, os.path.basename(__file__), '--consultar-dashboard'], escala
+    )
+    if etapas['consulta_dashboard']['codigo'] == 0:
+        with open(os.path.join(RUTA_RAIZ, etapas['consulta_dashboard']['log']), 'r', encoding='utf-8') as log:
+            filas = json.loads(log.read().strip().splitlines()[-1])['filas']
+        _con_filas(etapas['consulta_dashboard'], filas)
+    return etapas
+
+
+def consultar_dashboard():
+    """Ejecuta las consultas de todos los paneles del dashboard para el mes más reciente."""
+    sys.path.append(os.path.join(RUTA_RAIZ, 'streamlit'))
+    import consultas
+    meses = consultas.obtener_meses()
+    consultas.obtener_categorias()
+    filas = 0
+    if meses:
+        for panel in PANELES_DASHBOARD:
+            filas += len(getattr(consultas, panel)(meses[0]))
+    print(json.dumps({'filas': filas}))
+
+
+def cargar_historial(ruta=RUTA_HISTORIAL):
+    if not os.path.exists(ruta):
+        return []
+    with open(ruta, 'r', encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def guardar_historial(historial, ruta=RUTA_HISTORIAL):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(historial, archivo, ensure_ascii=False, indent=2)
+
+
+def _es_regresion(actual, base, umbral):
+    return actual - base >= SEGUNDOS_MINIMOS and actual > base * (1 + umbral)
+
+
+def detectar_regresiones(corrida, linea_base, umbral=UMBRAL_REGRESION):
+    """Compara etapas y modelos de dbt con la línea base y devuelve la lista de regresiones."""
+    regresiones = []
+    for etapa, metricas in corrida['etapas'].items():
+        base = linea_base['etapas'].get(etapa)
+        if not base or metricas['codigo'] != 0 or base['codigo'] != 0:
+            continue
+        if _es_regresion(metricas['segundos'], base['segundos'], umbral):
+            regresiones.append((etapa, base['segundos'], metricas['segundos']))
+        for modelo, tiempos in metricas.get('modelos', {}).items():
+            tiempos_base = base.get('modelos', {}).get(modelo)
+            if tiempos_base and _es_regresion(tiempos['segundos'], tiempos_base['segundos'], umbral):
+                regresiones.append((modelo, tiempos_base['segundos'], tiempos['segundos']))
+    return regresiones
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RUTA_RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar_benchmark(escalas, dbt='dbt', proyecto_dbt=None, perfiles_dbt=None, umbral=UMBRAL_REGRESION):
+    proyecto_dbt = os.path.abspath(proyecto_dbt or os.path.join(RUTA_RAIZ, 'proyecto_dbt'))
+    perfiles_dbt = os.path.abspath(perfiles_dbt or os.path.join(RUTA_RAIZ, 'dbt_profiles'))
+    historial = cargar_historial()
+    hay_regresiones = False
+
+    for escala in escalas:
+        print(f"\n===== Escala {escala}x =====")
+        corrida = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit_actual(),
+            'escala': escala,
+            'etapas': ejecutar_pipeline(escala, dbt, proyecto_dbt, perfiles_dbt)
+        }
+        linea_base = next((previa for previa in reversed(historial) if previa['escala'] == escala), None)
+        historial.append(corrida)
+        guardar_historial(historial)
+
+        print(f"\n{'etapa':<20} {'segundos':>10} {'filas/s':>12} {'RSS MB':>8}")
+        for etapa, m in corrida['etapas'].items():
+            velocidad = f"{m['filas_por_segundo']:,.0f}" if m.get('filas_por_segundo') else '-'
+            print(f"{etapa:<20} {m['segundos']:>10.2f} {velocidad:>12} {m['rss_max_mb']:>8}")
+
+        if linea_base is None:
+            print(f"\nPrimera corrida con escala {escala}x: queda como línea base.")
+            continue
+        regresiones = detectar_regresiones(corrida, linea_base, umbral)
+        if regresiones:
+            hay_regresiones = True
+            print(f"\n❌ Regresiones respecto de {linea_base['fecha']} ({linea_base.get('commit')}):")
+            for nombre, antes, ahora in regresiones:
+                print(f"    {nombre}: {antes:.2f} s -> {ahora:.2f} s (+{(ahora / antes - 1) * 100:.0f}%)")
+        else:
+            print(f"\n✅ Sin regresiones mayores al {umbral:.0%} respecto de {linea_base['fecha']}.")
+    return not hay_regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide cada etapa del pipeline y detecta regresiones.")
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1],
+                        help="Escalas de datos sintéticos a medir (ver generar_datos.py).")
+    parser.add_argument('--umbral', type=float, default=UMBRAL_REGRESION,
+                        help="Proporción de aumento de tiempo que se considera regresión (0.2 = 20%%).")
+    parser.add_argument('--dbt', default='dbt', help="Ejecutable de dbt.")
+    parser.add_argument('--proyecto-dbt', help="Carpeta del proyecto dbt (con dbt_project.yml).")
+    parser.add_argument('--perfiles-dbt', help="Carpeta con profiles.yml.")
+    parser.add_argument('--permitir-remoto', action='store_true',
+                        help="Permite correr contra una base que no es local (el benchmark la vacía).")
+    parser.add_argument('--consultar-dashboard', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.consultar_dashboard:
+        consultar_dashboard()
+        sys.exit(0)
+
+    if DB_HOST not in HOSTS_LOCALES and not args.permitir_remoto:
+        print(f"❌ El benchmark vacía las tablas y los snapshots; {DB_HOST} no parece una base local.")
+        sys.exit(2)
+
+    sin_regresiones = ejecutar_benchmark(args.escalas, args.dbt, args.proyecto_dbt, args.perfiles_dbt, args.umbral)
+    sys.exit(0 if sin_regresiones else 1)
@@ -0,0 +1,225 @@
+import os
+import re
+import time
+import json
+import argparse
+import statistics
+from db_conector import get_db_connection
+
+# Compara la versión anterior del reporte de KPIs (analyses/rpt_analisis_productos_kpis_v1.sql)
+# con la actual (models/gold/rpt_analisis_productos_kpis.sql) sobre datos sintéticos:
+# tiempo de ejecución, costo estimado por EXPLAIN y equivalencia de los resultados.
+RUTA_DBT = os.path.join(os.path.dirname(__file__), '..', 'proyecto_dbt')
+
+VERSIONES = {
+    'v1': os.path.join(RUTA_DBT, 'analyses', 'rpt_analisis_productos_kpis_v1.sql'),
+    'actual': os.path.join(RUTA_DBT, 'models', 'gold', 'rpt_analisis_productos_kpis.sql')
+}
+
+COLUMNAS_METRICAS = [
+    'producto_id',
+    'nombre_producto',
+    'nombre_categoria',
+    'mes_orden',
+    'ingresos_totales',
+    'crecimiento_porcentual_ventas',
+    'veces_agregado_al_carrito',
+    'cantidad_total_agregada_carrito'
+]
+
+COLUMNAS_RANKING = ['rank_ingresos_totales', 'rank_crecimiento_ventas', 'rank_veces_agregado_carrito']
+
+# Tablas temporales con el mismo nombre y columnas que los modelos agg_*: tapan a las reales
+# durante la transacción del benchmark, que al final se descarta.
+SQL_DATOS_SINTETICOS = """
+SELECT setseed(:semilla);
+
+CREATE TEMP TABLE agg_ingresos_productos ON COMMIT DROP AS
+SELECT
+    p AS producto_id,
+    'Producto ' || p AS nombre_producto,
+    'Categoria ' || (p % 12) AS nombre_categoria,
+    (DATE '2024-01-01' + m * INTERVAL '1 month')::DATE AS mes_orden,
+    ROUND((random() * 10000)::NUMERIC, 2) AS ingresos_totales
+FROM generate_series(1, :productos) AS p, generate_series(0, :meses - 1) AS m
+WHERE random() < 0.8;
+
+-- Productos renombrados a mitad de mes: dos filas del mismo producto y mes con nombres distintos
+INSERT INTO agg_ingresos_productos
+SELECT
+    producto_id,
+    nombre_producto || ' (anterior)',
+    nombre_categoria,
+    mes_orden,
+    ROUND((random() * 10000)::NUMERIC, 2)
+FROM agg_ingresos_productos
+WHERE random() < 0.05;
+
+CREATE TEMP TABLE agg_crecimiento_ventas_productos ON COMMIT DROP AS
+SELECT
+    mes_orden::TIMESTAMP AS mes_orden,
+    producto_id,
+    nombre_producto,
+    nombre_categoria,
+    CASE WHEN random() < 0.2 THEN NULL ELSE ROUND((random() * 200 - 100)::NUMERIC, 4) END AS crecimiento_porcentual
+FROM agg_ingresos_productos;
+
+CREATE TEMP TABLE agg_intencion_compra_productos ON COMMIT DROP AS
+SELECT
+    p AS producto_id,
+    'Producto ' || p AS nombre_producto,
+    'Categoria ' || (p % 12) AS nombre_categoria,
+    (DATE '2024-01-01' + m * INTERVAL '1 month')::DATE AS mes_orden,
+    (1 + random() * 50)::BIGINT AS veces_agregado_al_carrito,
+    (1 + random() * 200)::BIGINT AS cantidad_total_agregada_carrito
+FROM generate_series(1, :productos) AS p, generate_series(0, :meses - 1) AS m
+WHERE random() < 0.7;
+
+-- Productos que cambiaron de categoría a mitad de mes
+INSERT INTO agg_intencion_compra_productos
+SELECT
+    producto_id,
+    nombre_producto,
+    nombre_categoria || ' (anterior)',
+    mes_orden,
+    (1 + random() * 50)::BIGINT,
+    (1 + random() * 200)::BIGINT
+FROM agg_intencion_compra_productos
+WHERE random() < 0.05;
+
+ANALYZE agg_ingresos_productos;
+ANALYZE agg_crecimiento_ventas_productos;
+ANALYZE agg_intencion_compra_productos;
+"""
+
+
+def renderizar_modelo(ruta):
+    """
+    Convierte un modelo dbt del reporte en SQL ejecutable: quita el config y los bloques
+    is_incremental (se mide la construcción completa) y resuelve ref() y las macros usadas.
+    """
+    with open(ruta, 'r', encoding='utf-8') as archivo:
+        sql = archivo.read()
+    sql = re.sub(r"\{\{\s*config\(.*?\n\)\s*\}\}", "", sql, flags=re.S)
+    sql = re.sub(r"\{%-?\s*if is_incremental\(\)\s*-?%\}.*?\{%-?\s*endif\s*-?%\}", "", sql, flags=re.S)
+    sql = re.sub(r"\{\{\s*ref\('(\w+)'\)\s*\}\}", r"\1", sql)
+    sql = re.sub(r"\{\{\s*marca_actualizacion\(\)\s*\}\}", "now()", sql)
+    if '{{' in sql or '{%' in sql:
+        raise ValueError(f"{os.path.basename(ruta)} tiene Jinja que el benchmark no sabe resolver")
+    return sql.strip().rstrip(';')
+
+
+def _plan(conn, sql, analizar):
+    opciones = "ANALYZE, BUFFERS, FORMAT JSON" if analizar else "FORMAT JSON"
+    plan = conn.exec_driver_sql(f"EXPLAIN ({opciones}) {sql}").scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+def _contar_nodos(nodo, tipos):
+    propios = 1 if nodo['Node Type'] in tipos else 0
+    return propios + sum(_contar_nodos(hijo, tipos) for hijo in nodo.get('Plans', []))
+
+
+def medir_version(conn, sql, repeticiones):
+    """Devuelve las métricas de una versión: costo estimado, lecturas, ordenamientos y tiempos en ms."""
+    plan = _plan(conn, sql, analizar=False)['Plan']
+    tiempos = []
+    for _ in range(repeticiones):
+        tiempos.append(_plan(conn, sql, analizar=True)['Execution Time'])
+    return {
+        'costo': plan['Total Cost'],
+        'lecturas': _contar_nodos(plan, {'Seq Scan', 'Index Scan', 'Index Only Scan', 'Bitmap Heap Scan'}),
+        'ordenamientos': _contar_nodos(plan, {'Sort', 'Incremental Sort'}),
+        'mediana_ms': statistics.median(tiempos),
+        'minimo_ms': min(tiempos)
+    }
+
+
+def comparar_resultados(conn, sql_v1, sql_actual):
+    """
+    Materializa ambas versiones y devuelve (filas_v1, filas_actual, diferencias_metricas,
+    diferencias_orden). Las métricas deben coincidir fila a fila; los rankings se comparan por
+    el orden que definen, porque la versión anterior dejaba huecos por las filas duplicadas.
+    """
+    conn.exec_driver_sql(f"CREATE TEMP TABLE resultado_v1 ON COMMIT DROP AS {sql_v1}")
+    conn.exec_driver_sql(f"CREATE TEMP TABLE resultado_actual ON COMMIT DROP AS {sql_actual}")
+    metricas = ', '.join(COLUMNAS_METRICAS)
+    diferencias_metricas = conn.exec_driver_sql(f"""
+        SELECT COUNT(*) FROM (
+            (SELECT {metricas} FROM resultado_v1 EXCEPT ALL SELECT {metricas} FROM resultado_actual)
+            UNION ALL
+            (SELECT {metricas} FROM resultado_actual EXCEPT ALL SELECT {metricas} FROM resultado_v1)
+        ) d
+    """).scalar()
+
+    posiciones = ', '.join(
+        f"DENSE_RANK() OVER (PARTITION BY mes_orden ORDER BY {columna}) AS {columna}"
+        for columna in COLUMNAS_RANKING
+    )
+    claves = ', '.join(COLUMNAS_METRICAS[:4])
+    diferencias_orden = conn.exec_driver_sql(f"""
+        SELECT COUNT(*) FROM (
+            (SELECT {claves}, {posiciones} FROM resultado_v1
+             EXCEPT ALL SELECT {claves}, {posiciones} FROM resultado_actual)
+            UNION ALL
+            (SELECT {claves}, {posiciones} FROM resultado_actual
+             EXCEPT ALL SELECT {claves}, {posiciones} FROM resultado_v1)
+        ) d
+    """).scalar()
+
+    filas_v1 = conn.exec_driver_sql("SELECT COUNT(*) FROM resultado_v1").scalar()
+    filas_actual = conn.exec_driver_sql("SELECT COUNT(*) FROM resultado_actual").scalar()
+    return filas_v1, filas_actual, diferencias_metricas, diferencias_orden
+
+
+def ejecutar_benchmark(productos=2000, meses=36, repeticiones=5, semilla=0.42):
+    sql_versiones = {nombre: renderizar_modelo(ruta) for nombre, ruta in VERSIONES.items()}
+    conn = get_db_connection()
+    trans = conn.begin()
+    try:
+        print(f"--> Generando datos sintéticos: {productos:,} productos x {meses} meses")
+        inicio = time.perf_counter()
+        script = (SQL_DATOS_SINTETICOS
+                  .replace(':semilla', str(float(semilla)))
+                  .replace(':productos', str(int(productos)))
+                  .replace(':meses', str(int(meses))))
+        conn.exec_driver_sql(script)
+        print(f"    listo en {time.perf_counter() - inicio:.1f} s")
+
+        resultados = {}
+        for nombre, sql in sql_versiones.items():
+            print(f"--> Midiendo versión {nombre} ({repeticiones} repeticiones)")
+            resultados[nombre] = medir_version(conn, sql, repeticiones)
+
+        print(f"\n{'versión':<8} {'costo':>12} {'lecturas':>9} {'sorts':>6} {'mediana ms':>11} {'mínimo ms':>10}")
+        for nombre, m in resultados.items():
+            print(f"{nombre:<8} {m['costo']:>12,.0f} {m['lecturas']:>9} {m['ordenamientos']:>6} "
+                  f"{m['mediana_ms']:>11,.1f} {m['minimo_ms']:>10,.1f}")
+        mejora = resultados['v1']['mediana_ms'] / resultados['actual']['mediana_ms']
+        print(f"\nLa versión actual es {mejora:.2f}x más rápida (mediana).")
+
+        filas_v1, filas_actual, dif_metricas, dif_orden = comparar_resultados(
+            conn, sql_versiones['v1'], sql_versiones['actual'])
+        if filas_v1 == filas_actual and dif_metricas == 0 and dif_orden == 0:
+            print(f"✅ Mismo resultado en ambas versiones ({filas_actual:,} filas).")
+        else:
+            print(f"❌ Los resultados difieren: {filas_v1:,} vs {filas_actual:,} filas, "
+                  f"{dif_metricas} filas con métricas distintas, {dif_orden} con otro orden de ranking.")
+        return resultados
+    finally:
+        # Nada de lo creado por el benchmark debe quedar en la base
+        trans.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara la versión anterior y la actual del reporte de KPIs.")
+    parser.add_argument('--productos', type=int, default=2000, help="Productos del conjunto sintético.")
+    parser.add_argument('--meses', type=int, default=36, help="Meses del conjunto sintético.")
+    parser.add_argument('--repeticiones', type=int, default=5, help="Ejecuciones con EXPLAIN ANALYZE por versión.")
+    parser.add_argument('--semilla', type=float, default=0.42, help="Semilla de random() (entre -1 y 1).")
+    args = parser.parse_args()
+
+    ejecutar_benchmark(args.productos, args.meses, args.repeticiones, args.semilla)
@@ -0,0 +1,123 @@
+import os
+import sys
+import argparse
+from db_conector import get_db_connection, DB_HOST
+from benchmark_pipeline import HOSTS_LOCALES, RUTA_RAIZ, ejecutar_etapa, leer_run_results
+
+# Mide `dbt snapshot` de productos_historico con un catálogo sintético grande: la carga inicial,
+# una corrida sin cambios y una con un porcentaje de productos modificados. Compara la
+# estrategia 'timestamp' con updated_at derivado del hash de la fila (la que usa el proyecto)
+# con la estrategia 'check' sobre las cinco columnas, que era la anterior.
+ESTRATEGIAS = ('check', 'timestamp')
+SNAPSHOT = 'productos_historico'
+CATEGORIAS = 12
+
+
+def preparar_catalogo(productos, semilla=0.42):
+    """
+    Reemplaza productos y categorías por un catálogo sintético (vacía también las tablas que
+    los referencian) y borra el snapshot de productos.
+    """
+    with get_db_connection() as conn:
+        with conn.begin():
+            conn.exec_driver_sql("TRUNCATE categorias, productos RESTART IDENTITY CASCADE")
+            conn.exec_driver_sql("DROP TABLE IF EXISTS dbt_snapshots.productos_historico")
+            conn.exec_driver_sql(f"SELECT setseed({semilla})")
+            conn.exec_driver_sql(f"""
+                INSERT INTO categorias (nombre, descripcion)
+                SELECT 'Categoría ' || c, 'Productos de la categoría ' || c
+                FROM generate_series(1, {CATEGORIAS}) AS c
+            """)
+            conn.exec_driver_sql(f"""
+                INSERT INTO productos (nombre, descripcion, precio, stock, categoria_id)
+                SELECT 'Producto ' || p,
+                       'Descripción del producto ' || p,
+                       ROUND((5 + random() * 1495)::NUMERIC, 2),
+                       (random() * 500)::INT,
+                       1 + (p % {CATEGORIAS})
+                FROM generate_series(1, {productos}) AS p
+            """)
+            conn.exec_driver_sql("ANALYZE productos")
+
+
+def modificar_productos(proporcion):
+    """Cambia el precio de una proporción de productos. Devuelve la cantidad modificada."""
+    paso = max(1, round(1 / proporcion))
+    with get_db_connection() as conn:
+        with conn.begin():
+            return conn.exec_driver_sql(
+                f"UPDATE productos SET precio = precio + 1 WHERE producto_id % {paso} = 0"
+            ).rowcount
+
+
+def contar_versiones():
+    with get_db_connection() as conn:
+        return conn.exec_driver_sql(f"SELECT COUNT(*) FROM dbt_snapshots.{SNAPSHOT}").scalar()
+
+
+def correr_snapshot(nombre, estrategia, productos, dbt, proyecto_dbt, perfiles_dbt):
+    comando = [dbt, 'snapshot', '--select', SNAPSHOT, '--vars', f"{{estrategia_snapshots: {estrategia}}}",
+               '--project-dir', proyecto_dbt, '--profiles-dir', perfiles_dbt]
+    metricas = ejecutar_etapa(f"snapshot_{estrategia}_{nombre}", comando, productos, cwd=proyecto_dbt)
+    if metricas['codigo'] != 0:
+        raise RuntimeError(f"dbt snapshot falló, ver {metricas['log']}")
+    # Tiempo del snapshot en sí, sin el arranque de dbt ni el parseo del proyecto
+    nodo = next(iter(leer_run_results(proyecto_dbt).values()), {})
+    return metricas['segundos'], nodo.get('segundos')
+
+
+def ejecutar_benchmark(cantidades=(100_000,), proporcion=0.01, estrategias=ESTRATEGIAS,
+                       dbt='dbt', proyecto_dbt=None, perfiles_dbt=None):
+    proyecto_dbt = os.path.abspath(proyecto_dbt or os.path.join(RUTA_RAIZ, 'proyecto_dbt'))
+    perfiles_dbt = os.path.abspath(perfiles_dbt or os.path.join(RUTA_RAIZ, 'dbt_profiles'))
+    # Las vistas de staging tienen que incluir hash_fila
+    etapa = ejecutar_etapa('dbt_run_staging', [dbt, 'run', '--select', 'stg_productos', 'stg_categorias',
+                                               '--project-dir', proyecto_dbt, '--profiles-dir', perfiles_dbt],
+                           max(cantidades), cwd=proyecto_dbt)
+    if etapa['codigo'] != 0:
+        raise RuntimeError(f"dbt run de staging falló, ver {etapa['log']}")
+
+    resultados = []
+    for productos in cantidades:
+        for estrategia in estrategias:
+            print(f"\n===== {productos:,} productos, estrategia {estrategia} =====")
+            preparar_catalogo(productos)
+            for nombre in ('inicial', 'sin_cambios', 'con_cambios'):
+                modificados = modificar_productos(proporcion) if nombre == 'con_cambios' else None
+                previas = contar_versiones() if nombre != 'inicial' else 0
+                total, snapshot = correr_snapshot(nombre, estrategia, productos, dbt, proyecto_dbt, perfiles_dbt)
+                nuevas = contar_versiones() - previas
+                resultados.append((productos, estrategia, nombre, modificados, nuevas, total, snapshot))
+                esperadas = {'inicial': productos, 'sin_cambios': 0, 'con_cambios': modificados}[nombre]
+                if nuevas != esperadas:
+                    print(f"❌ Se esperaban {esperadas:,} versiones nuevas y el snapshot agregó {nuevas:,}")
+
+    print(f"\n{'productos':>10} {'estrategia':<10} {'corrida':<12} {'modificados':>11} "
+          f"{'versiones':>10} {'total s':>8} {'snapshot s':>10}")
+    for productos, estrategia, nombre, modificados, nuevas, total, snapshot in resultados:
+        print(f"{productos:>10,} {estrategia:<10} {nombre:<12} {modificados if modificados is not None else '-':>11} "
+              f"{nuevas:>10,} {total:>8.2f} {snapshot if snapshot is not None else float('nan'):>10.2f}")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide dbt snapshot de productos con catálogos grandes.")
+    parser.add_argument('--productos', type=int, nargs='+', default=[100_000],
+                        help="Tamaños de catálogo a medir.")
+    parser.add_argument('--proporcion', type=float, default=0.01,
+                        help="Proporción de productos modificados antes de la última corrida.")
+    parser.add_argument('--estrategias', nargs='+', choices=ESTRATEGIAS, default=list(ESTRATEGIAS))
+    parser.add_argument('--dbt', default='dbt', help="Ejecutable de dbt.")
+    parser.add_argument('--proyecto-dbt', help="Carpeta del proyecto dbt (con dbt_project.yml).")
+    parser.add_argument('--perfiles-dbt', help="Carpeta con profiles.yml.")
+    parser.add_argument('--permitir-remoto', action='store_true',
+                        help="Permite correr contra una base que no es local (el benchmark la vacía).")
+    args = parser.parse_args()
+
+    if DB_HOST not in HOSTS_LOCALES and not args.permitir_remoto:
+        print(f"❌ El benchmark vacía productos, categorías y las tablas que los referencian; "
+              f"{DB_HOST} no parece una base local.")
+        sys.exit(2)
+
+    ejecutar_benchmark(args.productos, args.proporcion, args.estrategias,
+                       args.dbt, args.proyecto_dbt, args.perfiles_dbt)
@@ -0,0 +1,273 @@
+import csv
+import gzip
+import os
+import re
+import time
+from datetime import date
+from itertools import groupby
+
+from db_conector import Base
+from lector_sql import leer_sentencias, lotes
+from particiones import TABLAS_PARTICIONADAS, tablas_particionadas, asegurar_particiones
+import modelo_tablas  # Registra las tablas en Base.metadata
+
+# Cantidad de filas que se envían al servidor en cada mensaje del COPY
+TAMANO_LOTE = 5000
+
+# Extensiones de exportaciones tabulares soportadas (pueden venir comprimidas con gzip)
+EXTENSIONES_TABULARES = ('.csv', '.tsv', '.csv.gz', '.tsv.gz')
+
+PATRON_INSERT = re.compile(
+    r"^\s*INSERT\s+INTO\s+([^\s(]+)\s*\(([^)]*)\)\s*VALUES\s*(.*)$",
+    re.IGNORECASE | re.DOTALL
+)
+# Solo la tabla de un INSERT, sin capturar sus valores
+PATRON_TABLA_INSERT = re.compile(r"^\s*INSERT\s+INTO\s+([^\s(]+)", re.IGNORECASE)
+
+
+# Valores sin comillas que se pueden pasar a COPY tal cual: números y NULL
+PATRON_NUMERO = re.compile(r"[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?")
+
+
+def _parsear_valores(texto):
+    """
+    Convierte la lista de tuplas de un VALUES en filas de valores (None para NULL).
+    Solo acepta literales entre comillas, números y NULL: cualquier otra cosa (expresiones
+    como NOW() o DEFAULT, casts, ON CONFLICT después de las tuplas) lanza ValueError, porque
+    COPY la tomaría como texto literal.
+    """
+    filas = []
+    fila = None
+    esperando_valor = False
+    i = 0
+    n = len(texto)
+    while i < n:
+        caracter = texto[i]
+        if caracter in ' \t\r\n':
+            i += 1
+        elif fila is None:
+            # Fuera de una tupla solo puede haber una coma antes de la próxima
+            if caracter == '(' and (not filas or esperando_valor):
+                fila = []
+                esperando_valor = True
+            elif caracter == ',' and filas and not esperando_valor:
+                esperando_valor = True
+            else:
+                raise ValueError(f"texto no soportado después de los valores: {texto[i:i + 40]!r}")
+            i += 1
+        elif caracter == ')' and not esperando_valor:
+            filas.append(fila)
+            fila = None
+            i += 1
+        elif caracter == ',' and not esperando_valor:
+            esperando_valor = True
+            i += 1
+        elif not esperando_valor:
+            raise ValueError(f"se esperaba ',' o ')' en: {texto[i:i + 40]!r}")
+        elif caracter == "'":
+            partes = []
+            i += 1
+            while True:
+                fin = texto.find("'", i)
+                if fin < 0:
+                    raise ValueError("literal sin cerrar")
+                partes.append(texto[i:fin])
+                if texto.startswith("''", fin):
+                    partes.append("'")
+                    i = fin + 2
+                else:
+                    i = fin + 1
+                    break
+            fila.append(''.join(partes))
+            esperando_valor = False
+        else:
+            numero = PATRON_NUMERO.match(texto, i)
+            if texto[i:i + 4].upper() == 'NULL' and not texto[i + 4:i + 5].isalnum():
+                fila.append(None)
+                i += 4
+            elif numero:
+                fila.append(numero.group())
+                i = numero.end()
+            else:
+                raise ValueError(f"valor no soportado (solo literales, números o NULL): {texto[i:i + 40]!r}")
+            esperando_valor = False
+    if fila is not None or esperando_valor:
+        raise ValueError("lista de valores incompleta")
+    return filas
+
+
+def leer_filas_insert(ruta):
+    """
+    Convierte un script de sentencias INSERT en un flujo de filas.
+    Devuelve tuplas (tabla, columnas, valores) sin cargar el archivo completo en memoria.
+    """
+    for sentencia in leer_sentencias(ruta):
+        coincidencia = PATRON_INSERT.match(sentencia.texto)
+        if not coincidencia:
+            raise ValueError(
+                f"Sentencia no soportada por la carga con COPY en {os.path.basename(ruta)}, "
+                f"línea {sentencia.linea}: {sentencia.texto[:80]}"
+            )
+        tabla = coincidencia.group(1)
+        columnas = tuple(columna.strip() for columna in coincidencia.group(2).split(','))
+        try:
+            filas = _parsear_valores(coincidencia.group(3))
+        except ValueError as e:
+            raise ValueError(
+                f"Sentencia no soportada por la carga con COPY en {os.path.basename(ruta)}, "
+                f"línea {sentencia.linea} ({e}; cargarla con --modo sql): {sentencia.texto[:80]}"
+            ) from None
+        for valores in filas:
+            yield tabla, columnas, valores
+
+
+def _escapar(valor):
+    """Escapa un valor para el formato de texto de COPY."""
+    if valor is None:
+        return '\\N'
+    return (valor.replace('\\', '\\\\')
+                 .replace('\t', '\\t')
+                 .replace('\n', '\\n')
+                 .replace('\r', '\\r'))
+
+
+def _lotes_copy(filas, tamano_lote):
+    """Agrupa las filas en bloques de texto listos para enviarse por COPY FROM STDIN."""
+    for lote in lotes(filas, tamano_lote):
+        yield ''.join('\t'.join(_escapar(valor) for valor in valores) + '\n' for valores in lote)
+
+
+def copiar_filas(conn, tabla, columnas, filas, tamano_lote=TAMANO_LOTE):
+    """
+    Envía un iterable de filas a `tabla` mediante COPY FROM STDIN usando
+    el cursor de pg8000 subyacente a la conexión de SQLAlchemy.
+    Devuelve la cantidad de filas copiadas.
+    """
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(
+            f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN",
+            stream=_lotes_copy(filas, tamano_lote)
+        )
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def es_archivo_tabular(ruta):
+    return ruta.lower().endswith(EXTENSIONES_TABULARES)
+
+
+def tabla_de_archivo(ruta):
+    """Obtiene el nombre de la tabla a partir de un archivo como '5.ordenes.csv.gz'."""
+    nombre = os.path.basename(ruta)
+    nombre = re.sub(r'^\d+\.', '', nombre)
+    return nombre.split('.')[0]
+
+
+def leer_filas_tabulares(ruta):
+    """
+    Lee una exportación CSV/TSV (opcionalmente .gz) cuya primera fila contiene
+    los nombres de columna. Los campos vacíos se interpretan como NULL.
+    """
+    abrir = gzip.open if ruta.lower().endswith('.gz') else open
+    delimitador = '\t' if '.tsv' in ruta.lower() else ','
+    tabla = tabla_de_archivo(ruta)
+    with abrir(ruta, 'rt', encoding='utf-8', newline='') as archivo:
+        lector = csv.reader(archivo, delimiter=delimitador)
+        columnas = tuple(next(lector))
+        for valores in lector:
+            yield tabla, columnas, [valor if valor != '' else None for valor in valores]
+
+
+def _sin_comillas(nombre):
+    """Nombre de tabla o columna sin esquema ni comillas, como las claves de TABLAS_PARTICIONADAS."""
+    return nombre.split('.')[-1].strip().strip('"')
+
+
+def tablas_insertadas(ruta):
+    """
+    Tablas en las que inserta un archivo: la del nombre si es tabular o las de todos los INSERT
+    de un script. Un script sin INSERT (DDL, UPDATE, limpieza) no inserta en ninguna.
+    """
+    if es_archivo_tabular(ruta):
+        return {tabla_de_archivo(ruta)}
+    tablas = set()
+    for sentencia in leer_sentencias(ruta):
+        coincidencia = PATRON_TABLA_INSERT.match(sentencia.texto)
+        if coincidencia:
+            tablas.add(_sin_comillas(coincidencia.group(1)))
+    return tablas
+
+
+def leer_filas(ruta):
+    if es_archivo_tabular(ruta):
+        return leer_filas_tabulares(ruta)
+    return leer_filas_insert(ruta)
+
+
+def meses_por_tabla(ruta, tablas):
+    """
+    Primera pasada sobre un archivo: meses (date del día 1) de la columna de partición de cada
+    una de `tablas` que aparecen en sus filas. Los valores llegan como texto AAAA-MM-DD..., así
+    que alcanza con sus primeros caracteres.
+    """
+    meses = {tabla: set() for tabla in tablas}
+    for (tabla, columnas), grupo in groupby(leer_filas(ruta), key=lambda fila: (fila[0], fila[1])):
+        tabla = _sin_comillas(tabla)
+        if tabla not in meses:
+            continue
+        columna = TABLAS_PARTICIONADAS[tabla]
+        nombres = [_sin_comillas(nombre) for nombre in columnas]
+        if columna not in nombres:
+            raise ValueError(f"{os.path.basename(ruta)} no trae la columna {columna}, por la que se particiona {tabla}")
+        indice = nombres.index(columna)
+        for _, _, valores in grupo:
+            valor = valores[indice]
+            if valor is not None:
+                meses[tabla].add(date(int(valor[:4]), int(valor[5:7]), 1))
+    return meses
+
+
+def cargar_archivo_copy(conn, ruta, tamano_lote=TAMANO_LOTE):
+    """
+    Carga un script .sql o una exportación CSV/TSV con COPY.
+    Devuelve un diccionario {tabla: (filas, segundos)}.
+
+    Si el archivo carga tablas particionadas, antes del COPY se recorre una vez para crear las
+    particiones de sus meses, así las filas van directo a su partición y no a la DEFAULT.
+    """
+    particionadas = tablas_particionadas(conn) & tablas_insertadas(ruta)
+    for tabla, meses in meses_por_tabla(ruta, particionadas).items():
+        asegurar_particiones(conn, tabla, meses)
+
+    metricas = {}
+    for (tabla, columnas), grupo in groupby(leer_filas(ruta), key=lambda fila: (fila[0], fila[1])):
+        inicio = time.perf_counter()
+        filas = copiar_filas(conn, tabla, columnas, (valores for _, _, valores in grupo), tamano_lote)
+        segundos = time.perf_counter() - inicio
+        filas_previas, segundos_previos = metricas.get(tabla, (0, 0.0))
+        metricas[tabla] = (filas_previas + filas, segundos_previos + segundos)
+    ajustar_secuencias(conn, metricas)
+    return metricas
+
+
+def ajustar_secuencias(conn, tablas):
+    """
+    Lleva la secuencia de la clave primaria de cada tabla al mayor id cargado: COPY con ids
+    explícitos no la avanza y los INSERT posteriores chocarían con las filas existentes.
+    """
+    for tabla in tablas:
+        if tabla not in Base.metadata.tables:
+            continue
+        for pk in Base.metadata.tables[tabla].primary_key.columns:
+            if pk.autoincrement is True:
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{tabla}', '{pk.name}'), MAX({pk.name})) FROM {tabla}"
+                )
+
+
+def formatear_metricas(tabla, filas, segundos):
+    velocidad = filas / segundos if segundos > 0 else float('inf')
+    return f"{tabla}: {filas:,} filas en {segundos:.2f} s ({velocidad:,.0f} filas/s)"
+
@@ -1,6 +1,11 @@
 import os
+import argparse
 from db_conector import get_db_connection
-from sqlalchemy import text
+from carga_copy import TAMANO_LOTE, cargar_archivo_copy, formatear_metricas, tablas_insertadas
+from planificador_carga import cargar_en_paralelo
+from lector_sql import ejecutar_script_por_lotes
+from particiones import reorganizar_default
+from instrumentacion import imprimir_resumen
 
 # Ruta a la carpeta donde tienes los archivos SQL
 RUTA_SQL = os.path.join(os.path.dirname(__file__), 'sql')
@@ -9,7 +14,7 @@ RUTA_SQL = os.path.join(os.path.dirname(__file__), 'sql')
 archivos_sql = [
     '2.usuarios.sql',
     '3.categorias.sql',
-    '4.productos.sql',
+    '4.Productos.sql',
     '5.ordenes.sql',
     '6.detalle_ordenes.sql',
     '7.direcciones_envio.sql',
@@ -20,17 +25,15 @@ archivos_sql = [
     '12.historial_pagos.sql'
 ]
 
-def ejecutar_scripts_sql():
+def ejecutar_scripts_sql(archivos=None, tamano_lote=TAMANO_LOTE, omitir_errores=False):
+    archivos = archivos or [os.path.join(RUTA_SQL, archivo) for archivo in archivos_sql]
     conn = get_db_connection()
     trans = conn.begin()
     try:
-        for archivo in archivos_sql:
-            ruta_completa = os.path.join(RUTA_SQL, archivo)
+        for ruta_completa in archivos:
+            archivo = os.path.basename(ruta_completa)
             print(f"--> Ejecutando script: {archivo}")
-            with open(ruta_completa, 'r', encoding='utf-8') as file:
-                sql_script = file.read()
-                if sql_script.strip():
-                    conn.execute(text(sql_script))
+            _cargar_archivo(conn, ruta_completa, 'sql', tamano_lote, omitir_errores)
         trans.commit()
         print("\n✅ Todos los archivos .sql ejecutados correctamente.\n")
     except Exception as e:
@@ -40,5 +43,86 @@ def ejecutar_scripts_sql():
     finally:
         conn.close()
 
+def ejecutar_carga_copy(archivos=None, tamano_lote=TAMANO_LOTE):
+    """
+    Carga masiva: convierte los scripts INSERT (o exportaciones CSV/TSV equivalentes)
+    en lotes de filas y los envía con COPY FROM STDIN en una única transacción.
+    """
+    archivos = archivos or [os.path.join(RUTA_SQL, archivo) for archivo in archivos_sql]
+    conn = get_db_connection()
+    trans = conn.begin()
+    try:
+        for archivo in archivos:
+            print(f"--> Copiando: {os.path.basename(archivo)}")
+            for tabla, (filas, segundos) in cargar_archivo_copy(conn, archivo, tamano_lote).items():
+                print(f"    {formatear_metricas(tabla, filas, segundos)}")
+        trans.commit()
+        print("\n✅ Carga masiva con COPY finalizada correctamente.\n")
+    except Exception as e:
+        trans.rollback()
+        print(f"❌ Error copiando {os.path.basename(archivo)}: {e}")
+        raise
+    finally:
+        conn.close()
+
+def _cargar_archivo(conn, ruta, modo, tamano_lote, omitir_errores=False):
+    if modo == 'copy':
+        for tabla, (filas, segundos) in cargar_archivo_copy(conn, ruta, tamano_lote).items():
+            print(f"    {formatear_metricas(tabla, filas, segundos)}")
+    else:
+        ejecutadas, errores = ejecutar_script_por_lotes(conn, ruta, tamano_lote, omitir_errores)
+        print(f"    {ejecutadas:,} sentencias ejecutadas" + (f", {len(errores)} omitidas" if errores else ""))
+        # Solo las tablas en las que insertó el script; las no particionadas se ignoran
+        reorganizar_default(conn, tablas_insertadas(ruta))
+
+def ejecutar_carga_paralela(modo='sql', archivos=None, max_hilos=4, tamano_lote=TAMANO_LOTE, omitir_errores=False):
+    """
+    Carga cada tabla en su propia conexión y transacción, lanzando en paralelo
+    las tablas cuyas dependencias (claves foráneas) ya están cargadas.
+
+    Los scripts que no insertan en ninguna tabla (DDL, UPDATE, limpieza) no tienen lugar en el
+    grafo: se ejecutan antes, en orden y en una sola transacción, con el modo sql.
+    """
+    archivos = archivos or [os.path.join(RUTA_SQL, archivo) for archivo in archivos_sql]
+    previos = []
+    tareas = {}
+    for ruta in archivos:
+        tablas = tablas_insertadas(ruta)
+        if not tablas:
+            previos.append(ruta)
+            continue
+        if len(tablas) > 1:
+            raise ValueError(
+                f"{os.path.basename(ruta)} inserta en más de una tabla ({', '.join(sorted(tablas))}); "
+                f"la carga en paralelo necesita un archivo por tabla"
+            )
+        tabla = tablas.pop()
+        if tabla in tareas:
+            raise ValueError(f"Más de un archivo carga la tabla {tabla}")
+        tareas[tabla] = lambda conn, ruta=ruta: _cargar_archivo(conn, ruta, modo, tamano_lote, omitir_errores)
+    if previos:
+        ejecutar_scripts_sql(previos, tamano_lote, omitir_errores)
+    cargar_en_paralelo(tareas, max_hilos)
+    print("\n✅ Carga en paralelo finalizada correctamente.\n")
+
 if __name__ == "__main__":
-    ejecutar_scripts_sql()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Carga los datos iniciales en la base de datos.")
+    parser.add_argument('--modo', choices=['sql', 'copy'], default='sql',
+                        help="'sql' ejecuta las sentencias de los scripts en lotes; 'copy' los convierte en lotes para COPY FROM STDIN.")
+    parser.add_argument('--archivos', nargs='+',
+                        help="Scripts .sql o exportaciones .csv/.tsv(.gz) a cargar en lugar de los de la carpeta sql/.")
+    parser.add_argument('--tamano-lote', type=int, default=TAMANO_LOTE,
+                        help="Filas por mensaje enviado en el COPY (modo copy) o sentencias por lote (modo sql).")
+    parser.add_argument('--omitir-errores', action='store_true',
+                        help="En modo sql, informa y salta las sentencias que fallan en lugar de abortar la carga.")
+    parser.add_argument('--paralelo', type=int, metavar='HILOS',
+                        help="Carga las tablas independientes en paralelo con esta cantidad de conexiones.")
+    args = parser.parse_args()
+
+    if args.paralelo:
+        ejecutar_carga_paralela(args.modo, args.archivos, args.paralelo, args.tamano_lote, args.omitir_errores)
+    elif args.modo == 'copy':
+        ejecutar_carga_copy(args.archivos, args.tamano_lote)
+    else:
+        ejecutar_scripts_sql(args.archivos, args.tamano_lote, args.omitir_errores)
+    imprimir_resumen()
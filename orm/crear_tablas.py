@@ -1,15 +1,45 @@
+import argparse
 from db_conector import get_db_engine, Base
+from particiones import metadata_particionada, crear_particiones_default
 import modelo_tablas
 
-def crear_tablas():
+def crear_indices(engine):
+    """
+    Crea los índices declarados en el modelo (claves foráneas, fechas y estado) que aún no
+    existan. create_all solo los emite junto con tablas nuevas, así que esto cubre las bases
+    creadas antes de declararlos.
+    """
+    with engine.begin() as conn:
+        for tabla in Base.metadata.sorted_tables:
+            for indice in tabla.indexes:
+                indice.create(bind=conn, checkfirst=True)
+
+def crear_tablas(particionado=False):
+    """
+    Crea las tablas del modelo. Con `particionado` las tablas de hechos de mayor volumen
+    se crean particionadas por mes (ver particiones.py); las tablas que ya existen no se tocan.
+    """
     engine = get_db_engine()
 
-    try: 
-        Base.metadata.create_all(bind=engine)
+    try:
+        if particionado:
+            metadata_particionada().create_all(bind=engine)
+            with engine.begin() as conn:
+                comunes = crear_particiones_default(conn)
+            if comunes:
+                print(f"⚠️  Ya existían sin particionar y se dejaron así: {', '.join(comunes)}")
+        else:
+            Base.metadata.create_all(bind=engine)
+        crear_indices(engine)
         print("Tablas creadas correctamente.")
     except Exception as e:
         print(f"Error al crear tablas: {e}")
         raise
 
 if __name__ == "__main__":
-    crear_tablas()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Crea las tablas del modelo en la base de datos.")
+    parser.add_argument('--particionado', action='store_true',
+                        help="Crea ordenes, carrito, historial_pagos y reseñas_productos particionadas por mes.")
+    args = parser.parse_args()
+
+    crear_tablas(args.particionado)
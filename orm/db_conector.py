@@ -1,7 +1,9 @@
 import os
-from sqlalchemy import create_engine
+import threading
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
+from instrumentacion import instrumentar_engine
 
 # Cargar las variables del .env
 load_dotenv()
@@ -13,25 +15,78 @@ DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
+# Ajustes del pool de conexiones (opcionales, con valores por defecto)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "si", "sí")
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Tiempo máximo por sentencia en milisegundos (0 = sin límite)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# Medición de cada sentencia y log de consultas lentas (instrumentacion.py)
+DB_INSTRUMENTAR = os.getenv("DB_INSTRUMENTAR", "true").lower() in ("1", "true", "si", "sí")
+
 # Usar pg8000 como driver
 DATABASE_URL = f"postgresql+pg8000://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-try:
-# Crear engine y sesión
-    engine = create_engine(DATABASE_URL, echo=False, client_encoding='utf8')
-    print("Motor de base de datos creado")
-except Exception as e:
-    print(f"Error al crear motor de base de datos: {e}")
-    raise
-
 Base = declarative_base()
-DbSesion = sessionmaker(bind=engine)
+DbSesion = sessionmaker()
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def crear_engine(pool_size=DB_POOL_SIZE,
+                 max_overflow=DB_MAX_OVERFLOW,
+                 pool_pre_ping=DB_POOL_PRE_PING,
+                 pool_recycle=DB_POOL_RECYCLE,
+                 statement_timeout_ms=DB_STATEMENT_TIMEOUT_MS,
+                 instrumentar=DB_INSTRUMENTAR):
+    """Crea un engine nuevo con los parámetros de pool indicados."""
+    try:
+        engine = create_engine(
+            DATABASE_URL,
+            echo=False,
+            client_encoding='utf8',
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_pre_ping=pool_pre_ping,
+            pool_recycle=pool_recycle
+        )
+    except Exception as e:
+        print(f"Error al crear motor de base de datos: {e}")
+        raise
+
+    if statement_timeout_ms:
+        @event.listens_for(engine, "connect")
+        def _configurar_timeout(dbapi_connection, connection_record):
+            # Se confirma para que el reset del pool (rollback) no deshaga el SET
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET statement_timeout = {int(statement_timeout_ms)}")
+            cursor.close()
+            dbapi_connection.commit()
+
+    if instrumentar:
+        instrumentar_engine(engine)
 
-def get_db_engine():
     return engine
 
+def get_db_engine():
+    """Devuelve el engine compartido del proceso, creándolo en el primer uso."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = crear_engine()
+    return _engine
+
 def get_db_session():
-    return DbSesion()
+    return DbSesion(bind=get_db_engine())
 
-def get_db_connection():
-    return engine.connect()
+def get_db_connection(stream_results=False, max_row_buffer=1000):
+    """
+    Toma una conexión del pool. Con `stream_results` las consultas usan un cursor
+    del lado del servidor y traen las filas de a `max_row_buffer` como máximo.
+    """
+    conn = get_db_engine().connect()
+    if stream_results:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=max_row_buffer)
+    return conn
@@ -0,0 +1,231 @@
+import time
+import random
+import argparse
+from sqlalchemy import func, insert, select
+from db_conector import get_db_connection, DbSesion
+from modelo_tablas import Ordenes, DetalleOrdenes, OrdenesMetodosPago, HistorialPagos, Usuarios, Productos, MetodosPago
+from particiones import TABLAS_PARTICIONADAS, tablas_particionadas, asegurar_particiones
+from instrumentacion import resumen
+
+# Escritura de muchas órdenes con su detalle y pagos en pocas sentencias. Una sesión del ORM
+# inserta cada orden y después sus hijos, esperando el id de cada una; acá cada lote de órdenes
+# se inserta con un INSERT de varias filas y RETURNING, y los ids que devuelve (en el mismo
+# orden que las filas enviadas) se reparten entre las líneas de detalle, los métodos de pago y
+# el historial, que también se insertan de a lote. Todo corre en una sola transacción.
+TAMANO_LOTE = 1000
+
+# Relación de Ordenes -> modelo hijo que se inserta con el orden_id de su orden
+HIJOS = (
+    ('detalles', DetalleOrdenes),
+    ('pagos', OrdenesMetodosPago),
+    ('historial_pagos', HistorialPagos)
+)
+
+
+def _clave(modelo):
+    return next(iter(modelo.__table__.primary_key.columns))
+
+
+def _fila(modelo, registro, ahora):
+    """
+    Valores de las columnas de `modelo` tomados de un diccionario o de un objeto del ORM, sin
+    la clave primaria (la asigna la secuencia). Todas las filas de un lote llevan las mismas
+    columnas, así que los valores faltantes se completan con el default del modelo.
+    """
+    fila = {}
+    for columna in modelo.__table__.columns:
+        if columna.primary_key:
+            continue
+        valor = registro.get(columna.name) if isinstance(registro, dict) else getattr(registro, columna.name)
+        if valor is None and columna.default is not None:
+            valor = ahora if columna.default.is_clause_element else columna.default.arg
+        fila[columna.name] = valor
+    return fila
+
+
+def _hijos(orden, atributo):
+    return (orden.get(atributo) if isinstance(orden, dict) else getattr(orden, atributo)) or []
+
+
+def _insertar(conn, modelo, filas):
+    """INSERT de varias filas con RETURNING; los ids vuelven en el orden de `filas`."""
+    if not filas:
+        return []
+    sentencia = insert(modelo).returning(_clave(modelo), sort_by_parameter_order=True)
+    return conn.execute(sentencia, filas).scalars().all()
+
+
+def _asegurar_meses(conn, particionadas, modelo, filas):
+    tabla = modelo.__tablename__
+    if tabla in particionadas:
+        asegurar_particiones(conn, tabla, [fila[TABLAS_PARTICIONADAS[tabla]] for fila in filas])
+
+
+def _insertar_lote(conn, ordenes, ahora, particionadas):
+    filas_ordenes = [_fila(Ordenes, orden, ahora) for orden in ordenes]
+    _asegurar_meses(conn, particionadas, Ordenes, filas_ordenes)
+    ids_ordenes = _insertar(conn, Ordenes, filas_ordenes)
+    ids = {Ordenes.__tablename__: ids_ordenes}
+
+    for atributo, modelo in HIJOS:
+        hijos, filas = [], []
+        for orden, orden_id in zip(ordenes, ids_ordenes):
+            for hijo in _hijos(orden, atributo):
+                fila = _fila(modelo, hijo, ahora)
+                fila['orden_id'] = orden_id
+                hijos.append(hijo)
+                filas.append(fila)
+        _asegurar_meses(conn, particionadas, modelo, filas)
+        ids_hijos = _insertar(conn, modelo, filas)
+        ids[modelo.__tablename__] = ids_hijos
+        # Los objetos del ORM quedan con sus ids, como después de un flush
+        for hijo, fila, hijo_id in zip(hijos, filas, ids_hijos):
+            if not isinstance(hijo, dict):
+                hijo.orden_id = fila['orden_id']
+                setattr(hijo, _clave(modelo).name, hijo_id)
+
+    for orden, orden_id in zip(ordenes, ids_ordenes):
+        if not isinstance(orden, dict):
+            orden.orden_id = orden_id
+    return ids
+
+
+def escribir_ordenes(ordenes, tamano_lote=TAMANO_LOTE, conn=None):
+    """
+    Inserta `ordenes` (diccionarios con las columnas de Ordenes y las listas 'detalles', 'pagos'
+    e 'historial_pagos', u objetos Ordenes con esas relaciones cargadas) de a `tamano_lote`
+    órdenes por sentencia. Con `conn` se escribe dentro de su transacción; si no, en una
+    conexión propia con una única transacción que se confirma al final.
+
+    Devuelve {tabla: [ids]} con los ids asignados en el mismo orden que la entrada.
+    """
+    if conn is None:
+        with get_db_connection() as conn, conn.begin():
+            return escribir_ordenes(ordenes, tamano_lote, conn)
+
+    # Los defaults func.now() del modelo valen lo mismo para toda la transacción
+    ahora = conn.execute(select(func.localtimestamp())).scalar()
+    particionadas = tablas_particionadas(conn)
+    ordenes = list(ordenes)
+    ids = {Ordenes.__tablename__: []}
+    ids.update({modelo.__tablename__: [] for _, modelo in HIJOS})
+    for inicio in range(0, len(ordenes), tamano_lote):
+        for tabla, ids_lote in _insertar_lote(conn, ordenes[inicio:inicio + tamano_lote], ahora, particionadas).items():
+            ids[tabla].extend(ids_lote)
+    return ids
+
+
+def ordenes_sinteticas(cantidad, usuarios, productos, metodos, semilla=42):
+    """
+    Órdenes en formato de diccionario con 1 a 3 líneas de detalle, un método de pago y su
+    historial, sobre los ids existentes de `usuarios`, `productos` ([(id, precio)]) y `metodos`.
+    La fecha de la orden y del pago queda en el default del modelo (la hora actual).
+    """
+    rng = random.Random(semilla)
+    ordenes = []
+    for _ in range(cantidad):
+        detalles = [
+            {'producto_id': producto_id, 'cantidad': rng.randint(1, 5), 'precio_unitario': precio}
+            for producto_id, precio in rng.sample(productos, min(len(productos), rng.choice([1, 1, 1, 2, 3])))
+        ]
+        total = round(sum(detalle['precio_unitario'] * detalle['cantidad'] for detalle in detalles), 2)
+        metodo = rng.choice(metodos)
+        ordenes.append({
+            'usuario_id': rng.choice(usuarios),
+            'total': total,
+            'estado': 'Pendiente',
+            'detalles': detalles,
+            'pagos': [{'metodo_pago_id': metodo, 'monto_pagado': total}],
+            'historial_pagos': [{'metodo_pago_id': metodo, 'monto': total, 'estado_pago': 'Procesando'}]
+        })
+    return ordenes
+
+
+def a_objetos_orm(ordenes):
+    """Convierte las órdenes en diccionario a objetos Ordenes con sus relaciones."""
+    return [
+        Ordenes(
+            **{clave: valor for clave, valor in orden.items() if clave not in dict(HIJOS)},
+            **{atributo: [modelo(**hijo) for hijo in orden[atributo]] for atributo, modelo in HIJOS}
+        )
+        for orden in ordenes
+    ]
+
+
+def _escribir_orm_por_orden(conn, ordenes, tamano_lote):
+    # Como un servicio que guarda cada orden al recibirla: add + flush por orden
+    sesion = DbSesion(bind=conn)
+    for orden in a_objetos_orm(ordenes):
+        sesion.add(orden)
+        sesion.flush()
+    sesion.close()
+
+
+def _escribir_orm_lote(conn, ordenes, tamano_lote):
+    sesion = DbSesion(bind=conn)
+    objetos = a_objetos_orm(ordenes)
+    for inicio in range(0, len(objetos), tamano_lote):
+        sesion.add_all(objetos[inicio:inicio + tamano_lote])
+        sesion.flush()
+    sesion.close()
+
+
+def _escribir_masiva(conn, ordenes, tamano_lote):
+    escribir_ordenes(ordenes, tamano_lote, conn)
+
+
+MODOS = {
+    'orm_por_orden': _escribir_orm_por_orden,
+    'orm_lote': _escribir_orm_lote,
+    'masiva': _escribir_masiva
+}
+
+
+def ejecutar_benchmark(cantidad=5000, tamano_lote=TAMANO_LOTE, modos=tuple(MODOS), semilla=42):
+    """
+    Inserta las mismas órdenes sintéticas con cada modo, cada uno en una transacción que al
+    final se descarta, e informa órdenes por segundo, filas por segundo y sentencias enviadas
+    (estas últimas solo con la instrumentación de db_conector activa).
+    """
+    with get_db_connection() as conn:
+        usuarios = conn.execute(select(Usuarios.usuario_id).limit(1000)).scalars().all()
+        productos = [tuple(fila) for fila in conn.execute(select(Productos.producto_id, Productos.precio).limit(1000))]
+        metodos = conn.execute(select(MetodosPago.metodo_pago_id)).scalars().all()
+    if not (usuarios and productos and metodos):
+        raise RuntimeError("El benchmark necesita usuarios, productos y métodos de pago cargados.")
+
+    ordenes = ordenes_sinteticas(cantidad, usuarios, productos, metodos, semilla)
+    filas = sum(1 + sum(len(orden[atributo]) for atributo, _ in HIJOS) for orden in ordenes)
+    print(f"--> {cantidad:,} órdenes ({filas:,} filas en total), lotes de {tamano_lote:,}")
+    print(f"{'modo':<15} {'segundos':>9} {'órdenes/s':>11} {'filas/s':>11} {'sentencias':>11}")
+    resultados = {}
+    for modo in modos:
+        conn = get_db_connection()
+        trans = conn.begin()
+        try:
+            sentencias_previas = resumen()['sentencias']
+            inicio = time.perf_counter()
+            MODOS[modo](conn, ordenes, tamano_lote)
+            segundos = time.perf_counter() - inicio
+            sentencias = resumen()['sentencias'] - sentencias_previas
+        finally:
+            trans.rollback()
+            conn.close()
+        resultados[modo] = segundos
+        print(f"{modo:<15} {segundos:>9.2f} {cantidad / segundos:>11,.0f} {filas / segundos:>11,.0f} "
+              f"{sentencias if sentencias else '-':>11}")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Escritura masiva de órdenes con su detalle y pagos.")
+    parser.add_argument('accion', choices=['benchmark'],
+                        help="'benchmark' compara la escritura masiva con el ORM sobre órdenes sintéticas.")
+    parser.add_argument('--ordenes', type=int, default=5000, help="Órdenes a insertar en cada modo.")
+    parser.add_argument('--tamano-lote', type=int, default=TAMANO_LOTE, help="Órdenes por sentencia INSERT.")
+    parser.add_argument('--modos', nargs='+', choices=list(MODOS), default=list(MODOS))
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    ejecutar_benchmark(args.ordenes, args.tamano_lote, args.modos, args.semilla)
+    print("\n✅ Benchmark finalizado; las órdenes insertadas se descartaron.\n")
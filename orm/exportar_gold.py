@@ -0,0 +1,188 @@
+import os
+import re
+import shutil
+import time
+import argparse
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from db_conector import get_db_connection
+
+# Exporta los modelos de la capa gold a archivos columnares particionados por mes, para que
+# el dashboard los lea sin pasar por PostgreSQL. Se corre después de `dbt run`.
+#   datos/gold/<modelo>/mes_orden=AAAA-MM-DD/parte.arrow (o parte.parquet)
+# Un modelo sin filas (una instalación nueva, una vista sin reseñas) se exporta como un único
+# archivo vacío en la carpeta del modelo, con las columnas y sus tipos.
+RUTA_SALIDA = os.path.join(os.path.dirname(__file__), '..', 'datos', 'gold')
+
+MODELOS_GOLD = [
+    'rpt_analisis_productos_kpis',
+    'rpt_paneles_kpis',
+    'agg_ingresos_productos',
+    'agg_crecimiento_ventas_productos',
+    'agg_intencion_compra_productos',
+    'mv_pagos_metodos',
+    'mv_mix_metodos_categorias',
+    'mv_reseñas_productos'
+]
+
+# 'arrow' (IPC sin comprimir) se puede mapear en memoria; 'parquet' ocupa menos en disco
+FORMATOS = {
+    'arrow': 'parte.arrow',
+    'parquet': 'parte.parquet'
+}
+
+COLUMNA_PARTICION = 'mes_orden'
+
+# Modelos cuyo mes no es el de la orden: se particionan por su propia columna de mes
+COLUMNAS_PARTICION_MODELO = {
+    'mv_pagos_metodos': 'mes_pago',
+    'mv_reseñas_productos': 'mes_reseña'
+}
+
+# Filas que se traen de la base por vez
+TAMANO_BLOQUE = 50_000
+
+
+TIPOS_PANDAS = {
+    'numeric': 'float64',
+    'double precision': 'float64',
+    'real': 'float64',
+    'smallint': 'Int64',
+    'integer': 'Int64',
+    'bigint': 'Int64',
+    'text': 'string',
+    'character varying': 'string'
+}
+
+
+class ModeloInexistente(LookupError):
+    """El modelo no está materializado en el esquema (todavía no corrió dbt run)."""
+
+
+def _tipos_columnas(conn, esquema, modelo):
+    """
+    Tipo de cada columna del modelo, en orden. Se lee de pg_catalog porque information_schema
+    no lista las vistas materializadas; los modificadores (numeric(10,2), timestamp(6)) se quitan.
+    """
+    filas = conn.execute(text("""
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        JOIN pg_class c ON c.oid = a.attrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = :esquema AND c.relname = :modelo
+          AND c.relkind IN ('r', 'p', 'v', 'm')
+          AND a.attnum > 0 AND NOT a.attisdropped
+        ORDER BY a.attnum
+    """), {'esquema': esquema, 'modelo': modelo})
+    return {columna: re.sub(r'\(.*?\)', '', tipo) for columna, tipo in filas.fetchall()}
+
+
+def _tipar(df, tipos):
+    """
+    Convierte lo que pg8000 entrega como objetos de Python en tipos columnares según el tipo
+    de cada columna en la base: Decimal -> float64, fechas -> datetime64, textos -> string.
+    """
+    for columna in df.columns:
+        tipo = tipos.get(columna)
+        if tipo in ('date', 'timestamp without time zone'):
+            df[columna] = pd.to_datetime(df[columna])
+        elif tipo == 'timestamp with time zone':
+            df[columna] = pd.to_datetime(df[columna], utc=True)
+        elif tipo in TIPOS_PANDAS:
+            if TIPOS_PANDAS[tipo] == 'float64':
+                df[columna] = pd.to_numeric(df[columna], errors='coerce')
+            df[columna] = df[columna].astype(TIPOS_PANDAS[tipo])
+    return df
+
+
+def _escribir(tabla_arrow, ruta, formato):
+    if formato == 'arrow':
+        feather.write_feather(tabla_arrow, ruta, compression='uncompressed')
+    else:
+        pq.write_table(tabla_arrow, ruta)
+
+
+def exportar_modelo(conn, modelo, carpeta, formato='arrow', esquema='public'):
+    """
+    Escribe un archivo por mes del modelo en una carpeta temporal y luego la reemplaza por
+    la anterior, para que el dashboard nunca lea una exportación a medio escribir.
+    Devuelve (filas, meses). Un modelo sin filas queda como un archivo vacío con su esquema.
+    """
+    tipos = _tipos_columnas(conn, esquema, modelo)
+    if not tipos:
+        raise ModeloInexistente(f"El modelo {esquema}.{modelo} no existe")
+    # Se tipa cada bloque apenas llega, para no acumular los objetos Decimal de todo el modelo
+    bloques = [
+        _tipar(bloque, tipos)
+        for bloque in pd.read_sql_query(text(f"SELECT * FROM {esquema}.{modelo}"), conn, chunksize=TAMANO_BLOQUE)
+    ]
+    df = pd.concat(bloques, ignore_index=True) if bloques else _tipar(pd.DataFrame(columns=list(tipos)), tipos)
+    columna_particion = COLUMNAS_PARTICION_MODELO.get(modelo, COLUMNA_PARTICION)
+    df[columna_particion] = pd.to_datetime(df[columna_particion]).dt.normalize()
+
+    destino = os.path.join(carpeta, modelo)
+    temporal = destino + '.tmp'
+    shutil.rmtree(temporal, ignore_errors=True)
+    meses = 0
+    for mes, grupo in df.groupby(columna_particion, sort=True):
+        particion = os.path.join(temporal, f"{columna_particion}={mes.date().isoformat()}")
+        os.makedirs(particion)
+        # La columna de partición va en el nombre de la carpeta, no dentro del archivo
+        datos = pa.Table.from_pandas(grupo.drop(columns=[columna_particion]), preserve_index=False)
+        _escribir(datos, os.path.join(particion, FORMATOS[formato]), formato)
+        meses += 1
+    os.makedirs(temporal, exist_ok=True)
+    if df.empty:
+        # Sin carpetas de meses: el dashboard toma el esquema de este archivo y no encuentra filas
+        datos = pa.Table.from_pandas(df.drop(columns=[columna_particion]), preserve_index=False)
+        _escribir(datos, os.path.join(temporal, FORMATOS[formato]), formato)
+
+    anterior = destino + '.old'
+    shutil.rmtree(anterior, ignore_errors=True)
+    if os.path.exists(destino):
+        os.rename(destino, anterior)
+    os.rename(temporal, destino)
+    shutil.rmtree(anterior, ignore_errors=True)
+    return len(df), meses
+
+
+def exportar_gold(modelos=None, carpeta=RUTA_SALIDA, formato='arrow', esquema='public'):
+    modelos = modelos or MODELOS_GOLD
+    os.makedirs(carpeta, exist_ok=True)
+    omitidos = []
+    with get_db_connection(stream_results=True) as conn:
+        for modelo in modelos:
+            inicio = time.perf_counter()
+            try:
+                filas, meses = exportar_modelo(conn, modelo, carpeta, formato, esquema)
+            except ModeloInexistente as e:
+                # Un modelo que todavía no se materializó no impide exportar el resto
+                print(f"⚠️ {e}: se omite")
+                omitidos.append(modelo)
+                continue
+            except Exception as e:
+                print(f"❌ Error exportando {modelo}: {e}")
+                raise
+            if filas:
+                print(f"--> {modelo}: {filas:,} filas en {meses} meses ({time.perf_counter() - inicio:.2f} s)")
+            else:
+                print(f"⚠️ {modelo} no tiene filas: se exportó vacío, con sus columnas")
+    if omitidos:
+        print(f"\n⚠️ Modelos omitidos por no existir en {esquema}: {', '.join(omitidos)}")
+    print(f"\n✅ Capa gold exportada en {os.path.abspath(carpeta)} ({formato}).\n")
+    return omitidos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta los modelos gold a archivos Arrow/Parquet particionados por mes.")
+    parser.add_argument('--modelos', nargs='+', help="Modelos a exportar (por defecto el reporte y los agg_*).")
+    parser.add_argument('--salida', default=RUTA_SALIDA, help="Carpeta de destino.")
+    parser.add_argument('--formato', choices=list(FORMATOS), default='arrow',
+                        help="'arrow' se lee mapeado en memoria desde el dashboard; 'parquet' comprime más.")
+    parser.add_argument('--esquema', default='public', help="Esquema donde dbt materializó los modelos.")
+    args = parser.parse_args()
+
+    exportar_gold(args.modelos, args.salida, args.formato, args.esquema)
@@ -0,0 +1,355 @@
+import os
+import gzip
+import time
+import zlib
+import argparse
+import numpy as np
+import pandas as pd
+from db_conector import get_db_connection, Base
+from carga_copy import ajustar_secuencias, formatear_metricas
+from particiones import TABLAS_PARTICIONADAS, tablas_particionadas, asegurar_particiones
+from modelo_tablas import (Usuarios, Categorias, Productos, Ordenes, DetalleOrdenes, DireccionesEnvio,
+                           Carrito, MetodosPago, OrdenesMetodosPago, ReseñasProductos, HistorialPagos)
+
+# Generador de datos sintéticos con integridad referencial para pruebas de carga y benchmarks.
+# Con escala 1 produce volúmenes parecidos a los scripts de orm/sql; cada tabla se genera en
+# bloques de TAMANO_BLOQUE filas con un generador propio derivado de la semilla, por lo que
+# la misma semilla y escala producen siempre los mismos datos.
+ESCALAS = (1, 10, 100, 1000)
+TAMANO_BLOQUE = 100_000
+RUTA_SALIDA = os.path.join(os.path.dirname(__file__), 'datos_sinteticos')
+
+FECHA_INICIO = pd.Timestamp('2024-07-01')
+MESES = 12
+
+# Filas con escala 1. Categorías y métodos de pago son catálogos fijos y no escalan.
+TAMANOS_BASE = {
+    'usuarios': 1000,
+    'productos': 36,
+    'ordenes': 10000,
+    'carrito': 5000,
+    'reseñas_productos': 10000
+}
+
+# Líneas de detalle por orden y su probabilidad (1,25 líneas por orden en promedio)
+LINEAS_POR_ORDEN = ([1, 2, 3], [0.8, 0.15, 0.05])
+
+# Numeración de los archivos igual a la de orm/sql, para cargarlos con cargar_datos.py --modo copy
+ARCHIVOS = {
+    Usuarios: 2,
+    Categorias: 3,
+    Productos: 4,
+    Ordenes: 5,
+    DetalleOrdenes: 6,
+    DireccionesEnvio: 7,
+    Carrito: 8,
+    MetodosPago: 9,
+    OrdenesMetodosPago: 10,
+    ReseñasProductos: 11,
+    HistorialPagos: 12
+}
+
+CATEGORIAS = [
+    'Electrónica', 'Moda', 'Hogar y Cocina', 'Deportes y Aire Libre', 'Belleza y Cuidado Personal',
+    'Juguetes y Juegos', 'Automotriz', 'Libros', 'Música y Películas', 'Salud', 'Mascotas', 'Oficina'
+]
+METODOS_PAGO = [
+    'Tarjeta de Crédito', 'Tarjeta de Débito', 'Transferencia Bancaria', 'PayPal',
+    'Efectivo contra Entrega', 'Mercado Pago', 'Criptomonedas'
+]
+NOMBRES = ['Ana', 'Carlos', 'Lucía', 'Jorge', 'Sofía', 'Martín', 'Valentina', 'Diego', 'Camila', 'Pablo']
+APELLIDOS = ['García', 'Fernández', 'López', 'Martínez', 'Gómez', 'Díaz', 'Pérez', 'Romero', 'Sosa', 'Torres']
+CIUDADES = ['Buenos Aires', 'Córdoba', 'Rosario', 'Mendoza', 'La Plata', 'Salta', 'Neuquén', 'Rawson']
+ESTADOS_ORDEN = ['Pendiente', 'Enviado', 'Completado', 'Cancelado']
+ESTADOS_PAGO = ['Procesando', 'Pagado', 'Fallido', 'Reembolsado']
+COMENTARIOS = {
+    1: 'Mala calidad, no lo recomiendo.',
+    2: 'No cumplió mis expectativas.',
+    3: 'El producto es aceptable por el precio.',
+    4: 'Buen producto, llegó a tiempo.',
+    5: 'Excelente, lo volvería a comprar.'
+}
+
+
+def columnas(modelo):
+    return [columna.name for columna in modelo.__table__.columns]
+
+
+def _marco(modelo, datos):
+    """Arma el DataFrame de un bloque con las columnas del modelo, en su orden."""
+    faltantes = set(columnas(modelo)) - set(datos)
+    if faltantes:
+        raise ValueError(f"Faltan columnas para {modelo.__tablename__}: {sorted(faltantes)}")
+    return pd.DataFrame(datos, columns=columnas(modelo))
+
+
+def _rng(semilla, tabla, bloque):
+    # Un generador independiente por tabla y bloque: el resultado no depende del orden de generación
+    return np.random.default_rng([semilla, zlib.crc32(tabla.encode('utf-8')), bloque])
+
+
+def _bloques(total):
+    """Recorre 1..total en rangos de ids (primero, cantidad) de hasta TAMANO_BLOQUE filas."""
+    for numero, inicio in enumerate(range(0, total, TAMANO_BLOQUE)):
+        yield numero, inicio + 1, min(TAMANO_BLOQUE, total - inicio)
+
+
+def _fechas(rng, cantidad, desde, hasta):
+    segundos = int((hasta - desde).total_seconds())
+    return desde + pd.to_timedelta(rng.integers(0, segundos, cantidad), unit='s')
+
+
+class GeneradorDatos:
+    """Genera, tabla por tabla y en bloques, un conjunto de datos consistente a la escala indicada."""
+
+    def __init__(self, escala=1, semilla=42, meses=MESES):
+        if escala not in ESCALAS:
+            raise ValueError(f"Escala no soportada: {escala}. Opciones: {ESCALAS}")
+        self.escala = escala
+        self.semilla = semilla
+        self.desde = FECHA_INICIO
+        self.hasta = FECHA_INICIO + pd.DateOffset(months=meses)
+        self.tamanos = {tabla: filas * escala for tabla, filas in TAMANOS_BASE.items()}
+        self.precios = None
+
+    def generar(self):
+        """Devuelve (modelo, DataFrame) en un orden que respeta las claves foráneas."""
+        yield from self._categorias()
+        yield from self._metodos_pago()
+        yield from self._productos()
+        yield from self._usuarios()
+        yield from self._ordenes()
+        yield from self._carrito()
+        yield from self._reseñas()
+
+    def _categorias(self):
+        yield Categorias, _marco(Categorias, {
+            'categoria_id': np.arange(1, len(CATEGORIAS) + 1),
+            'nombre': CATEGORIAS,
+            'descripcion': [f"Productos de {nombre.lower()}" for nombre in CATEGORIAS]
+        })
+
+    def _metodos_pago(self):
+        yield MetodosPago, _marco(MetodosPago, {
+            'metodo_pago_id': np.arange(1, len(METODOS_PAGO) + 1),
+            'nombre': METODOS_PAGO,
+            'descripcion': [f"Pago con {nombre.lower()}" for nombre in METODOS_PAGO]
+        })
+
+    def _productos(self):
+        # Los precios quedan en memoria: el detalle de las órdenes los usa como precio unitario
+        total = self.tamanos['productos']
+        rng = _rng(self.semilla, 'productos', 0)
+        ids = np.arange(1, total + 1)
+        self.precios = np.round(rng.uniform(5, 1500, total), 2)
+        yield Productos, _marco(Productos, {
+            'producto_id': ids,
+            'nombre': 'Producto ' + pd.Series(ids).astype(str),
+            'descripcion': 'Descripción del producto ' + pd.Series(ids).astype(str),
+            'precio': self.precios,
+            'stock': rng.integers(0, 500, total),
+            'categoria_id': rng.integers(1, len(CATEGORIAS) + 1, total)
+        })
+
+    def _usuarios(self):
+        for bloque, primero, cantidad in _bloques(self.tamanos['usuarios']):
+            rng = _rng(self.semilla, 'usuarios', bloque)
+            ids = np.arange(primero, primero + cantidad)
+            texto_ids = pd.Series(ids).astype(str)
+            yield Usuarios, _marco(Usuarios, {
+                'usuario_id': ids,
+                'nombre': rng.choice(NOMBRES, cantidad),
+                'apellido': rng.choice(APELLIDOS, cantidad),
+                'dni': (20_000_000 + pd.Series(ids)).astype(str),
+                'email': 'usuario' + texto_ids + '@correo.com',
+                'contraseña': 'Contraseña123',
+                'fecha_registro': _fechas(rng, cantidad, self.desde - pd.DateOffset(years=1), self.desde)
+            })
+            # Una dirección de envío por usuario
+            yield DireccionesEnvio, _marco(DireccionesEnvio, {
+                'direccion_id': ids,
+                'usuario_id': ids,
+                'calle': 'Calle ' + pd.Series(rng.integers(1, 200, cantidad)).astype(str)
+                         + ' N° ' + pd.Series(rng.integers(1, 5000, cantidad)).astype(str),
+                'ciudad': rng.choice(CIUDADES, cantidad),
+                'departamento': None,
+                'provincia': rng.choice(CIUDADES, cantidad),
+                'distrito': None,
+                'estado': None,
+                'codigo_postal': pd.Series(rng.integers(1000, 9999, cantidad)).astype(str),
+                'pais': 'Argentina'
+            })
+
+    def _ordenes(self):
+        """Órdenes con su detalle, método de pago e historial de pago, con totales consistentes."""
+        siguiente_detalle = 1
+        for bloque, primero, cantidad in _bloques(self.tamanos['ordenes']):
+            rng = _rng(self.semilla, 'ordenes', bloque)
+            ids = np.arange(primero, primero + cantidad)
+            fechas = _fechas(rng, cantidad, self.desde, self.hasta)
+            estados = rng.choice(ESTADOS_ORDEN, cantidad)
+
+            lineas = rng.choice(LINEAS_POR_ORDEN[0], cantidad, p=LINEAS_POR_ORDEN[1])
+            orden_de_linea = np.repeat(ids, lineas)
+            total_lineas = len(orden_de_linea)
+            productos = rng.integers(1, self.tamanos['productos'] + 1, total_lineas)
+            cantidades = rng.integers(1, 6, total_lineas)
+            precios = self.precios[productos - 1]
+            totales = np.round(np.bincount(orden_de_linea - primero, weights=cantidades * precios, minlength=cantidad), 2)
+
+            yield Ordenes, _marco(Ordenes, {
+                'orden_id': ids,
+                'usuario_id': rng.integers(1, self.tamanos['usuarios'] + 1, cantidad),
+                'fecha_orden': fechas,
+                'total': totales,
+                'estado': estados
+            })
+            yield DetalleOrdenes, _marco(DetalleOrdenes, {
+                'detalle_id': np.arange(siguiente_detalle, siguiente_detalle + total_lineas),
+                'orden_id': orden_de_linea,
+                'producto_id': productos,
+                'cantidad': cantidades,
+                'precio_unitario': precios
+            })
+            siguiente_detalle += total_lineas
+
+            metodos = rng.integers(1, len(METODOS_PAGO) + 1, cantidad)
+            yield OrdenesMetodosPago, _marco(OrdenesMetodosPago, {
+                'orden_metodo_id': ids,
+                'orden_id': ids,
+                'metodo_pago_id': metodos,
+                'monto_pagado': totales
+            })
+            # Las órdenes canceladas terminan con el pago fallido o reembolsado
+            estados_pago = rng.choice(ESTADOS_PAGO, cantidad)
+            canceladas = estados == 'Cancelado'
+            estados_pago[canceladas] = rng.choice(['Fallido', 'Reembolsado'], canceladas.sum())
+            yield HistorialPagos, _marco(HistorialPagos, {
+                'pago_id': ids,
+                'orden_id': ids,
+                'metodo_pago_id': metodos,
+                'monto': totales,
+                'fecha_pago': fechas + pd.to_timedelta(rng.integers(0, 3 * 86400, cantidad), unit='s'),
+                'estado_pago': estados_pago
+            })
+
+    def _carrito(self):
+        for bloque, primero, cantidad in _bloques(self.tamanos['carrito']):
+            rng = _rng(self.semilla, 'carrito', bloque)
+            yield Carrito, _marco(Carrito, {
+                'carrito_id': np.arange(primero, primero + cantidad),
+                'usuario_id': rng.integers(1, self.tamanos['usuarios'] + 1, cantidad),
+                'producto_id': rng.integers(1, self.tamanos['productos'] + 1, cantidad),
+                'cantidad': rng.integers(1, 6, cantidad),
+                'fecha_agregado': _fechas(rng, cantidad, self.desde, self.hasta)
+            })
+
+    def _reseñas(self):
+        for bloque, primero, cantidad in _bloques(self.tamanos['reseñas_productos']):
+            rng = _rng(self.semilla, 'reseñas_productos', bloque)
+            calificaciones = rng.integers(1, 6, cantidad)
+            yield ReseñasProductos, _marco(ReseñasProductos, {
+                'reseña_id': np.arange(primero, primero + cantidad),
+                'usuario_id': rng.integers(1, self.tamanos['usuarios'] + 1, cantidad),
+                'producto_id': rng.integers(1, self.tamanos['productos'] + 1, cantidad),
+                'calificacion': calificaciones,
+                'comentario': pd.Series(calificaciones).map(COMENTARIOS),
+                'fecha': _fechas(rng, cantidad, self.desde, self.hasta)
+            })
+
+
+def _a_csv(df, encabezado):
+    return df.to_csv(header=encabezado, index=False, float_format='%.2f', lineterminator='\n')
+
+
+def exportar_csv(generador, carpeta):
+    """Escribe un archivo <n>.<tabla>.csv.gz por tabla, cargable con cargar_datos.py --modo copy."""
+    os.makedirs(carpeta, exist_ok=True)
+    archivos = {}
+    filas = {}
+    inicio = time.perf_counter()
+    try:
+        for modelo, df in generador.generar():
+            tabla = modelo.__tablename__
+            if tabla not in archivos:
+                ruta = os.path.join(carpeta, f"{ARCHIVOS[modelo]}.{tabla}.csv.gz")
+                archivos[tabla] = gzip.open(ruta, 'wt', encoding='utf-8', newline='', compresslevel=6)
+            archivos[tabla].write(_a_csv(df, encabezado=tabla not in filas))
+            filas[tabla] = filas.get(tabla, 0) + len(df)
+    finally:
+        for archivo in archivos.values():
+            archivo.close()
+    segundos = time.perf_counter() - inicio
+    for tabla, cantidad in filas.items():
+        print(f"    {tabla}: {cantidad:,} filas")
+    print(f"\n✅ Datos escritos en {carpeta} en {segundos:.1f} s.\n")
+    return filas
+
+
+def _copiar_marco(conn, tabla, df):
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(
+            f"COPY {tabla} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv)",
+            stream=[_a_csv(df, encabezado=False)]
+        )
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def cargar_en_base(generador, vaciar=False):
+    """
+    Envía los datos generados directamente a la base con COPY, en una sola transacción.
+    Los ids son explícitos, así que al final se ajustan las secuencias de las claves primarias.
+    En las tablas particionadas se crean antes de cada COPY las particiones de los meses del bloque.
+    """
+    conn = get_db_connection()
+    trans = conn.begin()
+    metricas = {}
+    try:
+        if vaciar:
+            tablas = ', '.join(tabla.name for tabla in Base.metadata.sorted_tables)
+            conn.exec_driver_sql(f"TRUNCATE {tablas} RESTART IDENTITY CASCADE")
+        particionadas = tablas_particionadas(conn)
+        for modelo, df in generador.generar():
+            tabla = modelo.__tablename__
+            inicio = time.perf_counter()
+            if tabla in particionadas:
+                asegurar_particiones(conn, tabla, df[TABLAS_PARTICIONADAS[tabla]].dt.to_period('M').unique())
+            filas = _copiar_marco(conn, tabla, df)
+            filas_previas, segundos_previos = metricas.get(tabla, (0, 0.0))
+            metricas[tabla] = (filas_previas + filas, segundos_previos + time.perf_counter() - inicio)
+        ajustar_secuencias(conn, metricas)
+        trans.commit()
+        for tabla, (filas, segundos) in metricas.items():
+            print(f"    {formatear_metricas(tabla, filas, segundos)}")
+        print("\n✅ Datos sintéticos cargados correctamente.\n")
+        return metricas
+    except Exception as e:
+        trans.rollback()
+        print(f"❌ Error cargando datos sintéticos: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos consistentes para pruebas de carga.")
+    parser.add_argument('--escala', type=int, choices=ESCALAS, default=1,
+                        help="Factor sobre el volumen de los scripts de orm/sql (1 = ~10.000 órdenes).")
+    parser.add_argument('--semilla', type=int, default=42, help="Semilla de los generadores aleatorios.")
+    parser.add_argument('--meses', type=int, default=MESES, help=f"Meses de historia desde {FECHA_INICIO.date()}.")
+    parser.add_argument('--destino', choices=['csv', 'base'], default='csv',
+                        help="'csv' escribe archivos .csv.gz; 'base' los copia directamente a la base de datos.")
+    parser.add_argument('--salida', help="Carpeta de los .csv.gz (por defecto datos_sinteticos/x<escala>).")
+    parser.add_argument('--vaciar', action='store_true',
+                        help="Con destino 'base', vacía las tablas antes de cargar.")
+    args = parser.parse_args()
+
+    generador = GeneradorDatos(args.escala, args.semilla, args.meses)
+    print(f"--> Generando datos con escala {args.escala}x y semilla {args.semilla}")
+    if args.destino == 'base':
+        cargar_en_base(generador, args.vaciar)
+    else:
+        exportar_csv(generador, args.salida or os.path.join(RUTA_SALIDA, f"x{args.escala}"))
@@ -0,0 +1,205 @@
+import hashlib
+import numpy as np
+
+# HyperLogLog: estima la cantidad de valores distintos de un conjunto con un arreglo fijo de
+# 2^p registros de un byte, sin guardar los valores. Dos sketches del mismo p se unen tomando
+# el máximo de cada registro, y el resultado es el sketch de la unión de ambos conjuntos: los
+# sketches diarios se combinan en meses, trimestres o categorías sin volver a leer los hechos.
+#
+# Con p = 14 (16.384 registros) el error estándar relativo es 1,04 / sqrt(2^14) ≈ 0,81%: cerca
+# del 95% de las estimaciones queda dentro de ±1,6% del valor real y casi todas dentro de
+# ±2,5%. Con pocos valores (hasta ~40.000) se usa el conteo lineal de registros vacíos, que es
+# prácticamente exacto.
+P = 14
+
+# Formatos de serialización: los sketches con pocos valores guardan solo los registros no nulos
+FORMATO_DENSO = 1
+FORMATO_DISPERSO = 2
+
+_MASCARA_64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def _mezclar(valores):
+    """Hash de 64 bits de enteros (finalizador de MurmurHash3), vectorizado con NumPy."""
+    h = valores.astype(np.uint64)
+    with np.errstate(over='ignore'):
+        h ^= h >> np.uint64(33)
+        h *= np.uint64(0xFF51AFD7ED558CCD)
+        h ^= h >> np.uint64(33)
+        h *= np.uint64(0xC4CEB93FE53B9A63)
+        h ^= h >> np.uint64(33)
+    return h & _MASCARA_64
+
+
+def hashear(valores):
+    """Hash de 64 bits de cada valor: enteros con _mezclar, el resto con blake2b."""
+    arreglo = np.asarray(valores)
+    if arreglo.dtype.kind in 'iub':
+        return _mezclar(arreglo.astype(np.int64).view(np.uint64))
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(str(valor).encode('utf-8'), digest_size=8).digest(), 'little')
+         for valor in arreglo.ravel()],
+        dtype=np.uint64
+    )
+
+
+def _largo_en_bits(valores):
+    """Cantidad de bits significativos de cada uint64 (0 para el 0), sin perder precisión."""
+    altos = (valores >> np.uint64(32)).astype(np.float64)
+    bajos = (valores & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    # frexp es exacto con enteros de hasta 53 bits: se aplica a cada mitad de 32 bits
+    return np.where(altos > 0, np.frexp(altos)[1] + 32, np.frexp(bajos)[1])
+
+
+def registros_de(hashes, p=P):
+    """
+    Índice de registro y rango de cada hash: los primeros p bits eligen el registro y el rango
+    es la posición del primer 1 en los bits restantes (1 si el primero ya es 1).
+    """
+    indices = (hashes >> np.uint64(64 - p)).astype(np.int64)
+    resto = (hashes << np.uint64(p)) & _MASCARA_64
+    rangos = np.where(resto == 0, 64 - p + 1, 64 - _largo_en_bits(resto) + 1).astype(np.uint8)
+    return indices, rangos
+
+
+def _alfa(m):
+    return 0.7213 / (1 + 1.079 / m)
+
+
+class HyperLogLog:
+    """Sketch de valores distintos con 2^p registros."""
+
+    def __init__(self, p=P, registros=None):
+        self.p = p
+        self.m = 1 << p
+        self.registros = np.zeros(self.m, dtype=np.uint8) if registros is None else registros
+
+    @classmethod
+    def de_valores(cls, valores, p=P):
+        sketch = cls(p)
+        sketch.agregar(valores)
+        return sketch
+
+    def agregar(self, valores):
+        """Agrega un iterable (o arreglo) de valores."""
+        hashes = hashear(valores if hasattr(valores, '__len__') else list(valores))
+        if len(hashes) == 0:
+            return self
+        indices, rangos = registros_de(hashes, self.p)
+        np.maximum.at(self.registros, indices, rangos)
+        return self
+
+    def unir(self, otro):
+        """Une `otro` a este sketch (en el lugar) y lo devuelve."""
+        if otro.p != self.p:
+            raise ValueError(f"No se pueden unir sketches con p distinto ({self.p} y {otro.p})")
+        np.maximum(self.registros, otro.registros, out=self.registros)
+        return self
+
+    def estimar(self):
+        """Cantidad estimada de valores distintos."""
+        no_nulos = self.registros[self.registros > 0]
+        return float(estimar(np.sum(np.ldexp(1.0, -no_nulos.astype(np.int64))), self.m - len(no_nulos), self.p))
+
+    def __len__(self):
+        return int(round(self.estimar()))
+
+    def a_bytes(self):
+        """Serializa el sketch en el formato más chico (denso o solo registros no nulos)."""
+        indices = np.flatnonzero(self.registros)
+        return a_bytes(indices, self.registros[indices], self.p)
+
+    @classmethod
+    def desde_bytes(cls, datos):
+        indices, rangos, p = pares(datos)
+        sketch = cls(p)
+        sketch.registros[indices] = rangos
+        return sketch
+
+
+def a_bytes(indices, rangos, p=P):
+    """
+    Serializa un sketch dado por sus registros no nulos (índices sin repetir y su rango), sin
+    armar el arreglo completo: dispersos si ocupan menos que los 2^p bytes del formato denso.
+    """
+    indices = np.asarray(indices)
+    if 3 * len(indices) < (1 << p):
+        return (bytes([FORMATO_DISPERSO, p])
+                + indices.astype('<u2').tobytes()
+                + np.asarray(rangos, dtype=np.uint8).tobytes())
+    registros = np.zeros(1 << p, dtype=np.uint8)
+    registros[indices] = rangos
+    return bytes([FORMATO_DENSO, p]) + registros.tobytes()
+
+
+def pares(datos):
+    """Registros no nulos de un sketch serializado: (índices, rangos, p)."""
+    datos = bytes(datos)
+    formato, p = datos[0], datos[1]
+    if formato == FORMATO_DENSO:
+        registros = np.frombuffer(datos, dtype=np.uint8, offset=2)
+        indices = np.flatnonzero(registros)
+        return indices, registros[indices], p
+    if formato == FORMATO_DISPERSO:
+        cantidad = (len(datos) - 2) // 3
+        indices = np.frombuffer(datos, dtype='<u2', count=cantidad, offset=2).astype(np.int64)
+        return indices, np.frombuffer(datos, dtype=np.uint8, offset=2 + 2 * cantidad), p
+    raise ValueError(f"Formato de sketch desconocido: {formato}")
+
+
+def estimar(suma_no_nulos, vacios, p=P):
+    """
+    Estimación a partir de la suma de 2^-rango de los registros no nulos y la cantidad de
+    registros vacíos (cada uno aporta 2^0 = 1 a la suma). Acepta arreglos, para estimar muchos
+    sketches unidos a la vez.
+    """
+    m = 1 << p
+    suma_no_nulos, vacios = np.asarray(suma_no_nulos, dtype=np.float64), np.asarray(vacios, dtype=np.float64)
+    general = _alfa(m) * m ** 2 / (suma_no_nulos + vacios)
+    with np.errstate(divide='ignore'):
+        # Conteo lineal: con pocos valores es más preciso que la fórmula general
+        lineal = m * np.log(m / vacios)
+    return np.where((general <= 2.5 * m) & (vacios > 0), lineal, general)
+
+
+def unir_bytes(sketches, p=P):
+    """Une una secuencia de sketches serializados y devuelve el sketch resultante."""
+    total = HyperLogLog(p)
+    for datos in sketches:
+        total.unir(HyperLogLog.desde_bytes(datos))
+    return total
+
+
+def maximos_por_grupo(grupos, indices, rangos, p=P):
+    """
+    Registros no nulos de la unión de cada grupo a partir de pares (grupo, índice, rango) sin
+    repetir ni ordenar: el máximo rango de cada (grupo, índice). Devuelve los tres arreglos
+    ordenados por grupo e índice.
+    """
+    claves = np.asarray(grupos, dtype=np.int64) * (1 << p) + np.asarray(indices, dtype=np.int64)
+    if len(claves) == 0:
+        return claves, claves.copy(), np.empty(0, dtype=np.uint8)
+    orden = np.lexsort((np.asarray(rangos), claves))
+    claves, rangos = claves[orden], np.asarray(rangos)[orden]
+    # Con el rango como segundo criterio, la última fila de cada clave tiene el máximo
+    ultimas = np.append(claves[1:] != claves[:-1], True)
+    claves, rangos = claves[ultimas], rangos[ultimas]
+    return claves >> p, claves & ((1 << p) - 1), rangos
+
+
+def estimar_por_grupo(grupos, sketches, cantidad_grupos, p=P):
+    """
+    Estimación de la unión de los sketches serializados de cada grupo (códigos 0..cantidad_grupos-1),
+    sin armar un arreglo de 2^p registros por sketch: se trabaja solo con los registros no nulos.
+    """
+    todos = [pares(datos) for datos in sketches]
+    if any(p_sketch != p for _, _, p_sketch in todos):
+        raise ValueError(f"Todos los sketches deben tener p = {p}")
+    largos = [len(indices) for indices, _, _ in todos]
+    codigos = np.repeat(np.asarray(grupos, dtype=np.int64), largos)
+    indices = np.concatenate([indices for indices, _, _ in todos]) if todos else np.empty(0, dtype=np.int64)
+    rangos = np.concatenate([rangos for _, rangos, _ in todos]) if todos else np.empty(0, dtype=np.uint8)
+    codigos, _, rangos = maximos_por_grupo(codigos, indices, rangos, p)
+    sumas = np.bincount(codigos, weights=np.ldexp(1.0, -rangos.astype(np.int64)), minlength=cantidad_grupos)
+    no_nulos = np.bincount(codigos, minlength=cantidad_grupos)
+    return estimar(sumas, (1 << p) - no_nulos, p)
@@ -0,0 +1,320 @@
+import os
+import glob
+import argparse
+from itertools import chain
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.dialects.postgresql import insert as insert_pg
+from db_conector import get_db_connection, Base
+from carga_copy import ajustar_secuencias, copiar_filas, es_archivo_tabular, leer_filas_tabulares, tabla_de_archivo
+from particiones import TABLAS_PARTICIONADAS, tablas_particionadas, asegurar_particiones
+from modelo_tablas import MarcasAgua, LotesCarga
+from instrumentacion import imprimir_resumen
+
+# Ingesta incremental: en lugar de volver a ejecutar los scripts completos de sql/, aplica solo
+# las filas nuevas o modificadas de un origen delta y registra cada lote en control_lotes_carga.
+# Por tabla se guarda una marca de agua (control_marcas_agua): el mayor id y, en las tablas de
+# hechos, la mayor fecha ya cargados. Los orígenes soportados son:
+#   * csv: archivos .csv/.tsv(.gz) dejados en una carpeta, con la primera fila de encabezado y
+#     el nombre de la tabla en el nombre del archivo (p. ej. 'ordenes.2025-06-01T10.csv.gz').
+#     Cada archivo ya es un delta; se aplica una sola vez salvo que se pida reprocesarlo.
+#   * staging: un esquema local con las mismas tablas que public; se leen las filas con id o
+#     fecha mayores a la marca de agua. Las modificaciones de filas ya cargadas que no cambian
+#     su fecha no se detectan: para aplicarlas hay que dejarlas en un archivo del origen csv.
+# Las filas se aplican con INSERT ... ON CONFLICT DO UPDATE sobre la clave primaria, así que
+# la duración de una carga depende del tamaño del delta y no de toda la historia.
+ESQUEMA_STAGING = os.getenv("INGESTA_ESQUEMA_STAGING", "staging")
+CARPETA_ENTRADAS = os.getenv("INGESTA_CARPETA", os.path.join(os.path.dirname(__file__), 'entradas'))
+
+# Columnas de fecha que, además del id, marcan hasta dónde se cargó cada tabla de hechos
+COLUMNAS_FECHA = {
+    'ordenes': 'fecha_orden',
+    'carrito': 'fecha_agregado',
+    'historial_pagos': 'fecha_pago'
+}
+
+TABLAS_CONTROL = {MarcasAgua.__tablename__, LotesCarga.__tablename__}
+
+# Tablas de datos en orden de dependencias (las referenciadas primero)
+TABLAS_INGESTA = [tabla.name for tabla in Base.metadata.sorted_tables if tabla.name not in TABLAS_CONTROL]
+
+
+def columna_id(tabla):
+    """Columna autoincremental de la clave primaria del modelo."""
+    return next(columna.name for columna in Base.metadata.tables[tabla].primary_key.columns)
+
+
+def columnas_clave(conn, tabla):
+    """
+    Columnas de la clave primaria tal como está creada en la base: en las tablas
+    particionadas incluye la fecha, y el ON CONFLICT tiene que usar esa misma clave.
+    """
+    filas = conn.execute(text("""
+        SELECT a.attname
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+        WHERE i.indrelid = to_regclass(:tabla) AND i.indisprimary
+        ORDER BY array_position(i.indkey::SMALLINT[], a.attnum)
+    """), {'tabla': tabla})
+    return [fila.attname for fila in filas]
+
+
+def leer_marca(conn, tabla):
+    """Devuelve (ultimo_id, ultima_fecha) de la tabla, o (None, None) si nunca se cargó."""
+    fila = conn.execute(
+        select(MarcasAgua.ultimo_id, MarcasAgua.ultima_fecha).where(MarcasAgua.tabla == tabla)
+    ).first()
+    return tuple(fila) if fila else (None, None)
+
+
+def _crear_delta(conn, tabla):
+    delta = f"delta_{tabla}"
+    conn.exec_driver_sql(f"CREATE TEMP TABLE {delta} (LIKE {tabla}) ON COMMIT DROP")
+    return delta
+
+
+def cargar_delta_csv(conn, tabla, delta, ruta):
+    """Copia el archivo a la tabla temporal del delta. Devuelve las columnas del archivo."""
+    filas = leer_filas_tabulares(ruta)
+    primera = next(filas, None)
+    if primera is None:
+        return []
+    _, columnas, valores = primera
+    copiar_filas(conn, delta, columnas, chain([valores], (valores for _, _, valores in filas)))
+    return list(columnas)
+
+
+def cargar_delta_staging(conn, tabla, delta, esquema=ESQUEMA_STAGING):
+    """
+    Copia a la tabla temporal las filas de `esquema`.`tabla` posteriores a la marca de agua:
+    id mayor al último cargado o, en las tablas de hechos, fecha mayor a la última.
+    Devuelve las columnas copiadas.
+    """
+    columnas = [columna.name for columna in Base.metadata.tables[tabla].columns]
+    ultimo_id, ultima_fecha = leer_marca(conn, tabla)
+    condiciones = []
+    parametros = {}
+    if ultimo_id is not None:
+        condiciones.append(f"{columna_id(tabla)} > :ultimo_id")
+        parametros['ultimo_id'] = ultimo_id
+    if tabla in COLUMNAS_FECHA and ultima_fecha is not None:
+        condiciones.append(f"{COLUMNAS_FECHA[tabla]} > :ultima_fecha")
+        parametros['ultima_fecha'] = ultima_fecha
+    # Sin marca de agua es la primera carga y se copia todo
+    filtro = f"WHERE {' OR '.join(condiciones)}" if condiciones else ""
+    lista = ', '.join(columnas)
+    conn.execute(text(f"INSERT INTO {delta} ({lista}) SELECT {lista} FROM {esquema}.{tabla} {filtro}"), parametros)
+    return columnas
+
+
+def aplicar_delta(conn, tabla, delta, columnas):
+    """
+    Aplica las filas de la tabla temporal `delta` sobre `tabla` con un upsert por clave primaria.
+    Las filas idénticas a las existentes no se reescriben. Si un id aparece varias veces en
+    el delta gana la última. Devuelve (filas_leidas, insertadas, actualizadas).
+
+    En las tablas particionadas la clave incluye la fecha: una fila cuya fecha cambió no choca
+    con la anterior, así que antes del upsert se borra la versión guardada con otra fecha (que
+    puede estar en otra partición) y la fila nueva cuenta como actualizada.
+    """
+    clave = columnas_clave(conn, tabla)
+    faltantes = set(clave) - set(columnas)
+    if faltantes:
+        raise ValueError(f"El delta de {tabla} no trae las columnas de la clave: {', '.join(sorted(faltantes))}")
+
+    leidas = conn.exec_driver_sql(f"SELECT count(*) FROM {delta}").scalar()
+    if not leidas:
+        return 0, 0, 0
+
+    particionada = tabla in tablas_particionadas(conn)
+    if particionada:
+        meses = conn.exec_driver_sql(
+            f"SELECT DISTINCT date_trunc('month', {TABLAS_PARTICIONADAS[tabla]}) FROM {delta}"
+        ).scalars().all()
+        asegurar_particiones(conn, tabla, meses)
+
+    lista = ', '.join(columnas)
+    lista_clave = ', '.join(clave)
+    # Filas distintas del delta: por id, aunque en las particionadas la clave también tenga la fecha
+    unicas = [columna_id(tabla)] if particionada else clave
+    lista_unicas = ', '.join(unicas)
+    distintas, existentes = conn.exec_driver_sql(f"""
+        SELECT count(*),
+               count(*) FILTER (WHERE EXISTS (SELECT 1 FROM {tabla} t WHERE {' AND '.join(f't.{c} = d.{c}' for c in unicas)}))
+        FROM (SELECT DISTINCT {lista_unicas} FROM {delta}) d
+    """).one()
+
+    if particionada:
+        fecha = TABLAS_PARTICIONADAS[tabla]
+        conn.exec_driver_sql(f"""
+            DELETE FROM {tabla} t
+            USING (SELECT DISTINCT ON ({lista_unicas}) {lista_clave} FROM {delta} ORDER BY {lista_unicas}, ctid DESC) d
+            WHERE {' AND '.join(f't.{c} = d.{c}' for c in unicas)} AND t.{fecha} IS DISTINCT FROM d.{fecha}
+        """)
+
+    resto = [columna for columna in columnas if columna not in clave]
+    if resto:
+        accion = (
+            f"DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in resto)} "
+            f"WHERE ({', '.join(f'{tabla}.{c}' for c in resto)}) "
+            f"IS DISTINCT FROM ({', '.join(f'EXCLUDED.{c}' for c in resto)})"
+        )
+    else:
+        accion = "DO NOTHING"
+    # ctid sigue el orden en que se copiaron las filas a la tabla temporal
+    aplicadas = conn.exec_driver_sql(f"""
+        INSERT INTO {tabla} ({lista})
+        SELECT DISTINCT ON ({lista_unicas}) {lista} FROM {delta} ORDER BY {lista_unicas}, ctid DESC
+        ON CONFLICT ({lista_clave}) {accion}
+    """).rowcount
+
+    insertadas = distintas - existentes
+    ajustar_secuencias(conn, [tabla])
+    return leidas, insertadas, aplicadas - insertadas
+
+
+def _avanzar_marca(conn, tabla, delta):
+    """Lleva la marca de agua al mayor id y fecha del delta (nunca la hace retroceder)."""
+    fecha = COLUMNAS_FECHA.get(tabla)
+    ultimo_id, ultima_fecha = conn.exec_driver_sql(
+        f"SELECT MAX({columna_id(tabla)}), {f'MAX({fecha})' if fecha else 'NULL::TIMESTAMP'} FROM {delta}"
+    ).one()
+    sentencia = insert_pg(MarcasAgua).values(tabla=tabla, ultimo_id=ultimo_id, ultima_fecha=ultima_fecha)
+    conn.execute(sentencia.on_conflict_do_update(
+        index_elements=[MarcasAgua.tabla],
+        set_={
+            'ultimo_id': func.greatest(MarcasAgua.ultimo_id, sentencia.excluded.ultimo_id),
+            'ultima_fecha': func.greatest(MarcasAgua.ultima_fecha, sentencia.excluded.ultima_fecha),
+            'fecha_actualizacion': func.now()
+        }
+    ))
+    return leer_marca(conn, tabla)
+
+
+def ingerir_lote(tabla, origen, cargar_delta, archivo=None):
+    """
+    Aplica un lote sobre `tabla` en su propia transacción: `cargar_delta(conn, tabla, delta)`
+    llena la tabla temporal y devuelve sus columnas. El lote queda en control_lotes_carga
+    como 'ok' junto con los datos y la marca de agua, o como 'error' si falla.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.begin():
+            lote_id = conn.execute(
+                insert(LotesCarga).values(tabla=tabla, origen=origen, archivo=archivo).returning(LotesCarga.lote_id)
+            ).scalar_one()
+
+        try:
+            with conn.begin():
+                delta = _crear_delta(conn, tabla)
+                columnas = cargar_delta(conn, tabla, delta)
+                leidas, insertadas, actualizadas = aplicar_delta(conn, tabla, delta, columnas)
+                ultimo_id, ultima_fecha = _avanzar_marca(conn, tabla, delta) if leidas else leer_marca(conn, tabla)
+                conn.execute(update(LotesCarga).where(LotesCarga.lote_id == lote_id).values(
+                    fin=func.now(), estado='ok', filas_leidas=leidas, filas_insertadas=insertadas,
+                    filas_actualizadas=actualizadas, marca_id=ultimo_id, marca_fecha=ultima_fecha
+                ))
+        except Exception as e:
+            with conn.begin():
+                conn.execute(update(LotesCarga).where(LotesCarga.lote_id == lote_id).values(
+                    fin=func.now(), estado='error', error=str(getattr(e, 'orig', e))
+                ))
+            raise
+    finally:
+        conn.close()
+
+    print(f"    {tabla}: {leidas:,} filas leídas, {insertadas:,} insertadas, {actualizadas:,} actualizadas")
+    return leidas, insertadas, actualizadas
+
+
+def archivos_aplicados():
+    """Nombres de los archivos que ya se aplicaron sin error."""
+    consulta = select(LotesCarga.archivo).where(LotesCarga.origen == 'csv', LotesCarga.estado == 'ok')
+    with get_db_connection() as conn:
+        return set(conn.execute(consulta).scalars())
+
+
+def ingerir_csv(carpeta=CARPETA_ENTRADAS, reprocesar=False):
+    """
+    Aplica los archivos de `carpeta` que todavía no se cargaron, en el orden de dependencias
+    de sus tablas y, dentro de una tabla, por nombre de archivo.
+    """
+    archivos = [ruta for ruta in glob.glob(os.path.join(carpeta, '*')) if es_archivo_tabular(ruta)]
+    desconocidos = sorted(os.path.basename(ruta) for ruta in archivos if tabla_de_archivo(ruta) not in TABLAS_INGESTA)
+    if desconocidos:
+        raise ValueError(f"Archivos sin una tabla conocida en el nombre: {', '.join(desconocidos)}")
+    aplicados = set() if reprocesar else archivos_aplicados()
+    pendientes = sorted(
+        (ruta for ruta in archivos if os.path.basename(ruta) not in aplicados),
+        key=lambda ruta: (TABLAS_INGESTA.index(tabla_de_archivo(ruta)), os.path.basename(ruta))
+    )
+    if not pendientes:
+        print("✅ No hay archivos nuevos para cargar.")
+        return
+    for ruta in pendientes:
+        print(f"--> Aplicando: {os.path.basename(ruta)}")
+        ingerir_lote(tabla_de_archivo(ruta), 'csv',
+                     lambda conn, tabla, delta, ruta=ruta: cargar_delta_csv(conn, tabla, delta, ruta),
+                     archivo=os.path.basename(ruta))
+    print(f"\n✅ {len(pendientes)} archivos aplicados.\n")
+
+
+def ingerir_staging(esquema=ESQUEMA_STAGING, tablas=None):
+    """Aplica las filas nuevas de cada tabla del esquema de staging que exista."""
+    with get_db_connection() as conn:
+        presentes = [
+            tabla for tabla in (tablas or TABLAS_INGESTA)
+            if conn.execute(text("SELECT to_regclass(:tabla)"), {'tabla': f"{esquema}.{tabla}"}).scalar()
+        ]
+    for tabla in presentes:
+        print(f"--> Aplicando: {esquema}.{tabla}")
+        ingerir_lote(tabla, 'staging',
+                     lambda conn, tabla, delta: cargar_delta_staging(conn, tabla, delta, esquema),
+                     archivo=esquema)
+    print(f"\n✅ {len(presentes)} tablas aplicadas desde {esquema}.\n")
+
+
+def mostrar_estado(ultimos=10):
+    with get_db_connection() as conn:
+        print("--> Marcas de agua")
+        for marca in conn.execute(select(MarcasAgua).order_by(MarcasAgua.tabla)):
+            fecha = f", fecha {marca.ultima_fecha}" if marca.ultima_fecha else ""
+            print(f"    {marca.tabla}: id {marca.ultimo_id}{fecha} (actualizada {marca.fecha_actualizacion})")
+        print(f"--> Últimos {ultimos} lotes")
+        for lote in conn.execute(select(LotesCarga).order_by(LotesCarga.lote_id.desc()).limit(ultimos)):
+            segundos = (lote.fin - lote.inicio).total_seconds() if lote.fin else None
+            detalle = (f"{lote.filas_insertadas:,} insertadas, {lote.filas_actualizadas:,} actualizadas"
+                       if lote.estado == 'ok' else (lote.error or '')[:120])
+            duracion = f" en {segundos:.1f} s" if segundos is not None else ""
+            print(f"    #{lote.lote_id} {lote.tabla} ({lote.origen} {lote.archivo or ''}) {lote.estado}{duracion}: {detalle}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingesta incremental con marcas de agua por tabla.")
+    subparsers = parser.add_subparsers(dest='origen', required=True)
+
+    parser_csv = subparsers.add_parser('csv', help="Aplica los archivos CSV/TSV nuevos de una carpeta.")
+    parser_csv.add_argument('--carpeta', default=CARPETA_ENTRADAS)
+    parser_csv.add_argument('--reprocesar', action='store_true',
+                            help="Vuelve a aplicar también los archivos ya cargados.")
+
+    parser_staging = subparsers.add_parser(
+        'staging',
+        help="Aplica las filas nuevas de un esquema de staging: solo las de id o fecha mayores a la marca de "
+             "agua. Los cambios sobre filas ya cargadas que no mueven su fecha NO se aplican; para esos, "
+             "usar un archivo del origen csv."
+    )
+    parser_staging.add_argument('--esquema', default=ESQUEMA_STAGING)
+    parser_staging.add_argument('--tablas', nargs='+', choices=TABLAS_INGESTA)
+
+    parser_estado = subparsers.add_parser('estado', help="Muestra las marcas de agua y los últimos lotes.")
+    parser_estado.add_argument('--ultimos', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.origen == 'csv':
+        ingerir_csv(args.carpeta, args.reprocesar)
+    elif args.origen == 'staging':
+        ingerir_staging(args.esquema, args.tablas)
+    else:
+        mostrar_estado(args.ultimos)
+    if args.origen != 'estado':
+        imprimir_resumen()
@@ -0,0 +1,241 @@
+import os
+import sys
+import json
+import time
+import sysconfig
+import threading
+import contextvars
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from sqlalchemy import event
+
+# Instrumentación de consultas para los scripts de orm/ y el dashboard. Con eventos del engine
+# de SQLAlchemy mide cada sentencia (latencia, filas, bytes enviados y desde dónde se llamó;
+# las lecturas que lo informan con medir_recibidos() agregan el tamaño del resultado recibido),
+# acumula un resumen por proceso y escribe las sentencias lentas, una por línea en JSON, en
+# logs/consultas_lentas.jsonl. El dashboard además agrupa sus tiempos por etapa (consulta,
+# transformación, dibujo) en un Diagnostico para mostrarlos en la barra lateral.
+RUTA_LOG = os.getenv(
+    "DB_LOG_CONSULTAS_LENTAS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs', 'consultas_lentas.jsonl')
+)
+# Sentencias que tardan al menos esto (ms) se escriben en el log; 0 = todas
+UMBRAL_LENTA_MS = float(os.getenv("DB_UMBRAL_LENTA_MS", "500"))
+# Largo máximo del SQL guardado en el log y en el diagnóstico
+LARGO_SQL = 500
+
+_RUTAS_LIBRERIAS = tuple(
+    os.path.normcase(os.path.abspath(ruta))
+    for ruta in {sysconfig.get_paths()['stdlib'], sysconfig.get_paths()['purelib'], sysconfig.get_paths()['platlib']}
+)
+_ESTE_ARCHIVO = os.path.normcase(os.path.abspath(__file__))
+_rutas_proyecto = {}
+
+_lock_log = threading.Lock()
+_lock_resumen = threading.Lock()
+_resumen = {'sentencias': 0, 'ms_total': 0.0, 'filas': 0, 'bytes_enviados': 0, 'bytes_recibidos': 0,
+            'lentas': 0, 'mas_lenta': None}
+
+# Diagnóstico de la ejecución actual (una por corrida del script de Streamlit); los hilos que
+# la heredan con contextvars.copy_context() registran en el mismo
+_diagnostico_actual = contextvars.ContextVar('diagnostico_actual', default=None)
+# Lectura en curso de medir_recibidos(): junta sus sentencias hasta conocer el tamaño del resultado
+_lectura_actual = contextvars.ContextVar('lectura_actual', default=None)
+
+
+class Diagnostico:
+    """Tiempos por etapa y sentencias ejecutadas durante una corrida del dashboard."""
+
+    def __init__(self):
+        self.etapas = []
+        self.sentencias = []
+        self._lock = threading.Lock()
+        self._ultimo_hito = time.perf_counter()
+
+    def registrar_etapa(self, etapa, nombre, ms, **extra):
+        with self._lock:
+            self.etapas.append({'etapa': etapa, 'nombre': nombre, 'ms': round(ms, 2), **extra})
+
+    def registrar_sentencia(self, registro):
+        with self._lock:
+            self.sentencias.append(registro)
+
+    def hito(self, nombre, etapa='dibujo'):
+        """Registra el tiempo transcurrido desde el hito anterior (p. ej. dibujar una sección)."""
+        ahora = time.perf_counter()
+        self.registrar_etapa(etapa, nombre, (ahora - self._ultimo_hito) * 1000)
+        self._ultimo_hito = ahora
+
+
+def usar_diagnostico(diagnostico):
+    """Hace que las mediciones del contexto actual se registren en `diagnostico`."""
+    return _diagnostico_actual.set(diagnostico)
+
+
+def diagnostico_actual():
+    return _diagnostico_actual.get()
+
+
+@contextmanager
+def medir(etapa, nombre, **extra):
+    """Mide un bloque y lo registra en el diagnóstico activo; sin diagnóstico no hace nada."""
+    diagnostico = _diagnostico_actual.get()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        if diagnostico is not None:
+            diagnostico.registrar_etapa(etapa, nombre, (time.perf_counter() - inicio) * 1000, **extra)
+
+
+@contextmanager
+def medir_recibidos():
+    """
+    Bloque que lee un resultado: el bloque informa su tamaño en bytes en `lectura['bytes_recibidos']`
+    (p. ej. el del DataFrame armado) y al salir se anota en la última sentencia ejecutada dentro
+    del bloque, junto a sus bytes enviados. Las sentencias lentas del bloque se escriben en el log
+    al salir, ya con ese dato.
+    """
+    lectura = {'sentencias': [], 'bytes_recibidos': None}
+    token = _lectura_actual.set(lectura)
+    try:
+        yield lectura
+    finally:
+        _lectura_actual.reset(token)
+        if lectura['sentencias'] and lectura['bytes_recibidos'] is not None:
+            registro, _ = lectura['sentencias'][-1]
+            registro['bytes_recibidos'] = int(lectura['bytes_recibidos'])
+            with _lock_resumen:
+                _resumen['bytes_recibidos'] += registro['bytes_recibidos']
+        for registro, lenta in lectura['sentencias']:
+            if lenta:
+                _escribir_lenta(registro)
+
+
+def _es_del_proyecto(ruta):
+    """Si el archivo pertenece al proyecto; se calcula una vez por archivo."""
+    resultado = _rutas_proyecto.get(ruta)
+    if resultado is None:
+        normalizada = os.path.normcase(os.path.abspath(ruta))
+        resultado = not (normalizada == _ESTE_ARCHIVO or normalizada.startswith(_RUTAS_LIBRERIAS) or ruta.startswith('<'))
+        _rutas_proyecto[ruta] = resultado
+    return resultado
+
+
+def origen_llamada():
+    """
+    Primer marco de la pila que pertenece al proyecto (no a SQLAlchemy, pandas, el driver ni
+    la biblioteca estándar), como 'archivo.py:línea función'. Se prefieren las funciones
+    públicas sobre los ayudantes privados (`_leer`) para mostrar qué panel o paso consultó.
+    Recorre los marcos directamente, sin leer el código fuente, porque corre en cada sentencia.
+    """
+    elegido = None
+    marco = sys._getframe(1)
+    while marco is not None:
+        codigo = marco.f_code
+        if _es_del_proyecto(codigo.co_filename):
+            elegido = (codigo.co_filename, marco.f_lineno, codigo.co_name)
+            if not codigo.co_name.startswith('_'):
+                break
+        marco = marco.f_back
+    if elegido is None:
+        return None
+    archivo, linea, funcion = elegido
+    return f"{os.path.basename(archivo)}:{linea} {funcion}"
+
+
+def _tamano_parametros(parametros):
+    if not parametros:
+        return 0
+    # En un executemany se estima con la primera fila: medir todas las filas en cada
+    # sentencia de un lote de varios miles costaría más que la propia inserción
+    if isinstance(parametros, list):
+        return len(repr(parametros[0]).encode('utf-8')) * len(parametros)
+    return len(repr(parametros).encode('utf-8'))
+
+
+def _escribir_lenta(registro):
+    os.makedirs(os.path.dirname(RUTA_LOG), exist_ok=True)
+    linea = json.dumps(registro, ensure_ascii=False, default=str)
+    with _lock_log:
+        with open(RUTA_LOG, 'a', encoding='utf-8') as log:
+            log.write(linea + '\n')
+
+
+def _acumular(registro, lenta):
+    with _lock_resumen:
+        _resumen['sentencias'] += 1
+        _resumen['ms_total'] += registro['ms']
+        _resumen['filas'] += max(registro['filas'] or 0, 0)
+        _resumen['bytes_enviados'] += registro['bytes_enviados']
+        _resumen['lentas'] += int(lenta)
+        if _resumen['mas_lenta'] is None or registro['ms'] > _resumen['mas_lenta']['ms']:
+            _resumen['mas_lenta'] = registro
+
+
+def instrumentar_engine(engine, umbral_ms=None):
+    """Registra los eventos que miden cada sentencia ejecutada por `engine`."""
+    umbral_ms = UMBRAL_LENTA_MS if umbral_ms is None else umbral_ms
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('instrumentacion_inicios', []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get('instrumentacion_inicios')
+        if not inicios:
+            return
+        ms = (time.perf_counter() - inicios.pop()) * 1000
+        registro = {
+            'fecha': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'ms': round(ms, 2),
+            # pg8000 trae el resultado completo al ejecutar, así que rowcount ya son las filas devueltas
+            'filas': cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None,
+            'bytes_enviados': len(statement.encode('utf-8')) + _tamano_parametros(parameters),
+            'bytes_recibidos': None,
+            'origen': origen_llamada(),
+            'hilo': threading.current_thread().name,
+            'sql': ' '.join(statement.split())[:LARGO_SQL]
+        }
+        lenta = ms >= umbral_ms
+        _acumular(registro, lenta)
+        lectura = _lectura_actual.get()
+        if lectura is not None:
+            # Se escribe al terminar la lectura, cuando ya se conoce el tamaño del resultado
+            lectura['sentencias'].append((registro, lenta))
+        elif lenta:
+            _escribir_lenta(registro)
+        diagnostico = _diagnostico_actual.get()
+        if diagnostico is not None:
+            diagnostico.registrar_sentencia(registro)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(contexto):
+        # La sentencia falló: after_cursor_execute no corre, se descarta su inicio
+        if contexto.connection is not None:
+            inicios = contexto.connection.info.get('instrumentacion_inicios')
+            if inicios:
+                inicios.pop()
+
+    return engine
+
+
+def resumen():
+    """Copia del resumen acumulado de todas las sentencias del proceso."""
+    with _lock_resumen:
+        return dict(_resumen)
+
+
+def imprimir_resumen():
+    datos = resumen()
+    if not datos['sentencias']:
+        return
+    print(f"--> Consultas: {datos['sentencias']:,} sentencias en {datos['ms_total'] / 1000:,.2f} s, "
+          f"{datos['filas']:,} filas, {datos['bytes_enviados'] / 1_048_576:,.1f} MB enviados, "
+          f"{datos['bytes_recibidos'] / 1_048_576:,.1f} MB recibidos, "
+          f"{datos['lentas']:,} lentas (>= {UMBRAL_LENTA_MS:g} ms)")
+    mas_lenta = datos['mas_lenta']
+    print(f"    más lenta: {mas_lenta['ms']:,.1f} ms desde {mas_lenta['origen']}: {mas_lenta['sql'][:120]}")
+    if datos['lentas']:
+        print(f"    detalle de las lentas en {os.path.abspath(RUTA_LOG)}")
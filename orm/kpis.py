@@ -0,0 +1,335 @@
+import time
+import argparse
+import statistics
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from db_conector import get_db_connection
+
+# Cálculo en pandas/NumPy de los KPIs de la capa gold a partir de los hechos fact_ordenes y
+# fact_carritos, con la misma lógica que los modelos dbt:
+#   agg_ingresos_productos            -> ingresos_productos()
+#   agg_crecimiento_ventas_productos  -> crecimiento_ventas()
+#   agg_intencion_compra_productos    -> intencion_compra()
+#   rpt_analisis_productos_kpis       -> reporte_kpis()
+# Todas las funciones aceptan un rango de fechas [desde, hasta) y el grano 'mes' o 'semana',
+# para análisis puntuales sin correr `dbt run`. Con el grano 'mes' y sin rango el resultado
+# es el mismo que el de dbt; validar_contra_dbt() lo comprueba sobre la base.
+
+GRANOS = {
+    'mes': 'mes_orden',
+    'semana': 'semana_orden'
+}
+
+COLUMNAS_ORDENES = ['detalle_id', 'producto_id', 'subtotal_linea', 'fecha_orden',
+                    'nombre_producto_final', 'nombre_categoria_final']
+COLUMNAS_CARRITOS = ['carrito_id', 'usuario_id', 'producto_id', 'cantidad_agregada_carrito',
+                     'fecha_agregado_carrito', 'nombre_producto_final', 'nombre_categoria_final']
+
+COLUMNAS_RANKING = {
+    'rank_ingresos_totales': 'ingresos_totales',
+    'rank_crecimiento_ventas': 'crecimiento_porcentual_ventas',
+    'rank_veces_agregado_carrito': 'veces_agregado_al_carrito'
+}
+
+# Diferencia máxima aceptada al comparar con dbt (NUMERIC en la base, float64 aquí)
+TOLERANCIA = 1e-6
+
+
+def truncar_fechas(fechas, grano='mes'):
+    """
+    Equivalente vectorizado de DATE_TRUNC('month' | 'week', fecha)::DATE: el primer día del
+    mes o el lunes de la semana, como datetime64.
+    """
+    dias = pd.to_datetime(fechas).to_numpy(dtype='datetime64[D]')
+    if grano == 'mes':
+        return dias.astype('datetime64[M]').astype('datetime64[ns]')
+    if grano == 'semana':
+        # El día 0 (1970-01-01) fue jueves: se corre 3 días para que las semanas empiecen en lunes
+        numeros = dias.astype(np.int64)
+        return ((numeros + 3) // 7 * 7 - 3).astype('datetime64[D]').astype('datetime64[ns]')
+    raise ValueError(f"Grano no soportado: {grano}. Opciones: {list(GRANOS)}")
+
+
+def _claves(grano):
+    return ['producto_id', 'nombre_producto', 'nombre_categoria', GRANOS[grano]]
+
+
+def _preparar(hechos, columna_fecha, metricas, grano, desde, hasta):
+    """
+    Filtra los hechos al rango [desde, hasta), agrega la columna del periodo y deja los
+    nombres como categóricos para que los groupby trabajen sobre códigos enteros.
+    """
+    fechas = pd.to_datetime(hechos[columna_fecha])
+    mascara = fechas.notna()
+    if desde is not None:
+        mascara &= fechas >= pd.Timestamp(desde)
+    if hasta is not None:
+        mascara &= fechas < pd.Timestamp(hasta)
+    mascara = mascara.to_numpy()
+
+    base = pd.DataFrame({
+        'producto_id': hechos['producto_id'].to_numpy()[mascara],
+        'nombre_producto': pd.Categorical(hechos['nombre_producto_final'].to_numpy()[mascara]),
+        'nombre_categoria': pd.Categorical(hechos['nombre_categoria_final'].to_numpy()[mascara]),
+        GRANOS[grano]: truncar_fechas(fechas.to_numpy()[mascara], grano)
+    })
+    for origen, destino in metricas.items():
+        base[destino] = hechos[origen].to_numpy()[mascara]
+    return base
+
+
+def _agrupar(base, grano, agregaciones):
+    resultado = (base
+                 .groupby(_claves(grano), dropna=False, observed=True, sort=False)
+                 .agg(**agregaciones)
+                 .reset_index())
+    # Los nombres vuelven a ser texto común para que el resultado se combine con cualquier otro
+    for columna in ('nombre_producto', 'nombre_categoria'):
+        resultado[columna] = resultado[columna].astype(object).where(resultado[columna].notna(), None)
+    return resultado
+
+
+def ingresos_productos(ordenes, grano='mes', desde=None, hasta=None):
+    """Ingresos totales por producto (con su nombre histórico) y periodo."""
+    base = _preparar(ordenes, 'fecha_orden', {'subtotal_linea': 'ingresos_totales'}, grano, desde, hasta)
+    return _agrupar(base, grano, {'ingresos_totales': ('ingresos_totales', 'sum')})
+
+
+def crecimiento_ventas(ordenes, grano='mes', desde=None, hasta=None):
+    """
+    Crecimiento porcentual de las ventas de cada producto contra su periodo anterior con
+    ventas (LAG), NaN cuando ese periodo no existe o vendió 0. Dentro de un rango, el primer
+    periodo no tiene anterior.
+    """
+    columna_periodo = GRANOS[grano]
+    ventas = ingresos_productos(ordenes, grano, desde, hasta).rename(columns={'ingresos_totales': 'ventas_mensuales'})
+    ventas = ventas.sort_values(['producto_id', columna_periodo], kind='stable', ignore_index=True)
+
+    anterior = ventas.groupby('producto_id', sort=False)['ventas_mensuales'].shift(1).fillna(0).to_numpy()
+    actual = ventas['ventas_mensuales'].to_numpy(dtype='float64')
+    ventas['ventas_mes_anterior'] = anterior
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ventas['crecimiento_porcentual'] = np.where(anterior == 0, np.nan, (actual - anterior) * 100.0 / anterior)
+    return ventas[actual > 0].reset_index(drop=True)
+
+
+def intencion_compra(carritos, grano='mes', desde=None, hasta=None):
+    """Veces y unidades agregadas al carrito y usuarios distintos por producto y periodo."""
+    base = _preparar(carritos, 'fecha_agregado_carrito', {
+        'carrito_id': 'carrito_id',
+        'usuario_id': 'usuario_id',
+        'cantidad_agregada_carrito': 'cantidad_agregada_carrito'
+    }, grano, desde, hasta)
+    return _agrupar(base, grano, {
+        'veces_agregado_al_carrito': ('carrito_id', 'nunique'),
+        'cantidad_total_agregada_carrito': ('cantidad_agregada_carrito', 'sum'),
+        'usuarios_con_intencion': ('usuario_id', 'nunique')
+    })
+
+
+def reporte_kpis(ordenes, carritos, grano='mes', desde=None, hasta=None):
+    """
+    Reporte combinado como rpt_analisis_productos_kpis: una fila por producto, nombres
+    históricos y periodo presentes en alguna agregación, con las métricas unidas por
+    (producto_id, periodo) (métricas ausentes en 0), y cada métrica rankeada por periodo.
+    """
+    claves = _claves(grano)
+    columna_periodo = GRANOS[grano]
+    agregaciones = [
+        ingresos_productos(ordenes, grano, desde, hasta)[claves + ['ingresos_totales']],
+        crecimiento_ventas(ordenes, grano, desde, hasta)[claves + ['crecimiento_porcentual']]
+        .rename(columns={'crecimiento_porcentual': 'crecimiento_porcentual_ventas'}),
+        intencion_compra(carritos, grano, desde, hasta)[claves + ['veces_agregado_al_carrito',
+                                                                   'cantidad_total_agregada_carrito']]
+    ]
+
+    # Cada variante de nombres del producto en el periodo recibe las métricas de todas las variantes
+    reporte = pd.concat([agregacion[claves] for agregacion in agregaciones], ignore_index=True).drop_duplicates()
+    union = ['producto_id', columna_periodo]
+    for agregacion in agregaciones:
+        # Valores distintos de la métrica por producto y periodo (NULL como 0): así cada
+        # combinación del cruce ya es única y no hace falta deduplicar el reporte completo
+        metricas = agregacion.drop(columns=['nombre_producto', 'nombre_categoria']).fillna(0).drop_duplicates()
+        reporte = reporte.merge(metricas, on=union, how='left')
+    reporte = reporte.reset_index(drop=True)
+    reporte[['ingresos_totales', 'crecimiento_porcentual_ventas']] = (
+        reporte[['ingresos_totales', 'crecimiento_porcentual_ventas']].astype('float64').fillna(0))
+    for columna in ('veces_agregado_al_carrito', 'cantidad_total_agregada_carrito'):
+        reporte[columna] = reporte[columna].fillna(0).astype('int64')
+
+    por_periodo = reporte.groupby(columna_periodo, sort=False)
+    for rank, metrica in COLUMNAS_RANKING.items():
+        reporte[rank] = por_periodo[metrica].rank(method='min', ascending=False).astype('int64')
+
+    return reporte.sort_values(
+        [columna_periodo, 'ingresos_totales', 'crecimiento_porcentual_ventas', 'veces_agregado_al_carrito'],
+        ascending=False, kind='stable', ignore_index=True
+    )
+
+
+def _a_numero(df, columnas):
+    # pg8000 entrega NUMERIC como Decimal
+    for columna in columnas:
+        if columna in df.columns:
+            df[columna] = pd.to_numeric(df[columna], errors='coerce')
+    return df
+
+
+def leer_hechos(desde=None, hasta=None, esquema='public'):
+    """Lee de la base las columnas de fact_ordenes y fact_carritos que usan los KPIs."""
+    consultas = {
+        'fact_ordenes': (COLUMNAS_ORDENES, 'fecha_orden'),
+        'fact_carritos': (COLUMNAS_CARRITOS, 'fecha_agregado_carrito')
+    }
+    hechos = {}
+    with get_db_connection() as conn:
+        for tabla, (columnas, columna_fecha) in consultas.items():
+            filtros, parametros = ["TRUE"], {}
+            if desde is not None:
+                filtros.append(f"{columna_fecha} >= :desde")
+                parametros['desde'] = pd.Timestamp(desde).to_pydatetime()
+            if hasta is not None:
+                filtros.append(f"{columna_fecha} < :hasta")
+                parametros['hasta'] = pd.Timestamp(hasta).to_pydatetime()
+            query = f"SELECT {', '.join(columnas)} FROM {esquema}.{tabla} WHERE {' AND '.join(filtros)}"
+            df = pd.read_sql_query(text(query), conn, params=parametros)
+            hechos[tabla] = _a_numero(df, ['subtotal_linea'])
+    return hechos['fact_ordenes'], hechos['fact_carritos']
+
+
+def comparar(calculado, esperado, claves, metricas, tolerancia=TOLERANCIA):
+    """
+    Compara dos resultados por sus claves. Devuelve (faltantes, sobrantes, diferencias):
+    filas solo en `esperado`, filas solo en `calculado` y filas con alguna métrica distinta.
+    Las claves repetidas (un producto con varios nombres en el mes, en el reporte) se emparejan
+    en el orden de sus métricas.
+    """
+    def numerar(df):
+        df = df[claves + metricas].sort_values(claves + metricas, kind='stable')
+        return df.assign(_posicion=df.groupby(claves, dropna=False, sort=False).cumcount())
+
+    cruce = numerar(calculado).merge(
+        numerar(esperado), on=claves + ['_posicion'], how='outer', suffixes=('', '_esperado'), indicator=True)
+    faltantes = int((cruce['_merge'] == 'right_only').sum())
+    sobrantes = int((cruce['_merge'] == 'left_only').sum())
+    ambos = cruce[cruce['_merge'] == 'both']
+    distintas = np.zeros(len(ambos), dtype=bool)
+    for metrica in metricas:
+        actual = pd.to_numeric(ambos[metrica], errors='coerce').to_numpy(dtype='float64')
+        referencia = pd.to_numeric(ambos[f"{metrica}_esperado"], errors='coerce').to_numpy(dtype='float64')
+        iguales = np.isclose(actual, referencia, rtol=tolerancia, atol=tolerancia, equal_nan=True)
+        distintas |= ~iguales
+    return faltantes, sobrantes, int(distintas.sum())
+
+
+def validar_contra_dbt(esquema='public'):
+    """Recalcula los modelos gold desde los hechos y los compara con lo que materializó dbt."""
+    ordenes, carritos = leer_hechos(esquema=esquema)
+    claves = _claves('mes')
+    modelos = {
+        'agg_ingresos_productos': (ingresos_productos(ordenes), ['ingresos_totales']),
+        'agg_crecimiento_ventas_productos': (crecimiento_ventas(ordenes),
+                                             ['ventas_mensuales', 'ventas_mes_anterior', 'crecimiento_porcentual']),
+        'agg_intencion_compra_productos': (intencion_compra(carritos),
+                                           ['veces_agregado_al_carrito', 'cantidad_total_agregada_carrito',
+                                            'usuarios_con_intencion']),
+        'rpt_analisis_productos_kpis': (reporte_kpis(ordenes, carritos),
+                                        ['ingresos_totales', 'crecimiento_porcentual_ventas',
+                                         'veces_agregado_al_carrito', 'cantidad_total_agregada_carrito']
+                                        + list(COLUMNAS_RANKING))
+    }
+
+    correcto = True
+    with get_db_connection() as conn:
+        for modelo, (calculado, metricas) in modelos.items():
+            esperado = pd.read_sql_query(
+                text(f"SELECT {', '.join(claves + metricas)} FROM {esquema}.{modelo}"), conn)
+            esperado = _a_numero(esperado, metricas)
+            esperado['mes_orden'] = pd.to_datetime(esperado['mes_orden']).dt.normalize()
+            faltantes, sobrantes, diferencias = comparar(calculado, esperado, claves, metricas)
+            if faltantes == sobrantes == diferencias == 0:
+                print(f"✅ {modelo}: {len(calculado):,} filas idénticas a dbt")
+            else:
+                correcto = False
+                print(f"❌ {modelo}: {faltantes} filas faltantes, {sobrantes} sobrantes y "
+                      f"{diferencias} con métricas distintas ({len(calculado):,} calculadas, {len(esperado):,} en dbt)")
+    return correcto
+
+
+def hechos_sinteticos(escala=1, semilla=42):
+    """
+    Arma fact_ordenes y fact_carritos en memoria a partir de generar_datos.py (nombres
+    vigentes, solo órdenes Completado/Enviado), para medir el módulo sin base de datos.
+    """
+    from generar_datos import GeneradorDatos
+    from modelo_tablas import Categorias, Productos, Ordenes, DetalleOrdenes, Carrito
+
+    tablas = {modelo: [] for modelo in (Categorias, Productos, Ordenes, DetalleOrdenes, Carrito)}
+    for modelo, df in GeneradorDatos(escala, semilla).generar():
+        if modelo in tablas:
+            tablas[modelo].append(df)
+    categorias, productos, ordenes, detalle, carrito = (pd.concat(marcos, ignore_index=True)
+                                                        for marcos in tablas.values())
+
+    nombres = productos.merge(categorias, on='categoria_id', suffixes=('_producto_final', '_categoria_final'))
+    nombres = nombres[['producto_id', 'nombre_producto_final', 'nombre_categoria_final']]
+
+    ordenes = ordenes[ordenes['estado'].isin(['Completado', 'Enviado'])]
+    fact_ordenes = detalle.merge(ordenes[['orden_id', 'fecha_orden']], on='orden_id').merge(nombres, on='producto_id')
+    fact_ordenes['subtotal_linea'] = fact_ordenes['cantidad'] * fact_ordenes['precio_unitario']
+    fact_ordenes['fecha_orden'] = pd.to_datetime(fact_ordenes['fecha_orden']).dt.normalize()
+
+    fact_carritos = carrito.rename(columns={'cantidad': 'cantidad_agregada_carrito',
+                                            'fecha_agregado': 'fecha_agregado_carrito'}).merge(nombres, on='producto_id')
+    fact_carritos['fecha_agregado_carrito'] = pd.to_datetime(fact_carritos['fecha_agregado_carrito']).dt.normalize()
+    return fact_ordenes[COLUMNAS_ORDENES], fact_carritos[COLUMNAS_CARRITOS]
+
+
+def ejecutar_benchmark(escalas=(1, 10), repeticiones=3, semilla=42):
+    """Mide cada función sobre hechos sintéticos de cada escala, por mes y por semana."""
+    print(f"{'escala':>6} {'grano':<7} {'función':<20} {'filas hechos':>13} {'mediana s':>10} {'filas/s':>14}")
+    for escala in escalas:
+        ordenes, carritos = hechos_sinteticos(escala, semilla)
+        funciones = {
+            'ingresos_productos': (ingresos_productos, (ordenes,)),
+            'crecimiento_ventas': (crecimiento_ventas, (ordenes,)),
+            'intencion_compra': (intencion_compra, (carritos,)),
+            'reporte_kpis': (reporte_kpis, (ordenes, carritos))
+        }
+        for grano in GRANOS:
+            for nombre, (funcion, argumentos) in funciones.items():
+                tiempos = []
+                for _ in range(repeticiones):
+                    inicio = time.perf_counter()
+                    funcion(*argumentos, grano=grano)
+                    tiempos.append(time.perf_counter() - inicio)
+                filas = sum(len(df) for df in argumentos)
+                mediana = statistics.median(tiempos)
+                print(f"{escala:>6} {grano:<7} {nombre:<20} {filas:>13,} {mediana:>10.3f} {filas / mediana:>14,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="KPIs de la capa gold calculados en pandas a partir de los hechos.")
+    parser.add_argument('accion', choices=['validar', 'benchmark', 'reporte'],
+                        help="'validar' compara con los modelos de dbt; 'benchmark' mide sobre datos sintéticos; "
+                             "'reporte' calcula el reporte desde la base y lo guarda en --salida.")
+    parser.add_argument('--grano', choices=list(GRANOS), default='mes', help="Periodo de agregación del reporte.")
+    parser.add_argument('--desde', help="Primera fecha incluida (AAAA-MM-DD).")
+    parser.add_argument('--hasta', help="Fecha final, excluida (AAAA-MM-DD).")
+    parser.add_argument('--salida', default='reporte_kpis.csv', help="Archivo CSV del reporte.")
+    parser.add_argument('--esquema', default='public', help="Esquema donde dbt materializó los modelos.")
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1, 10], help="Escalas del benchmark.")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Ejecuciones por función en el benchmark.")
+    args = parser.parse_args()
+
+    if args.accion == 'validar':
+        if not validar_contra_dbt(args.esquema):
+            raise SystemExit(1)
+    elif args.accion == 'benchmark':
+        ejecutar_benchmark(args.escalas, args.repeticiones)
+    else:
+        ordenes, carritos = leer_hechos(args.desde, args.hasta, args.esquema)
+        reporte = reporte_kpis(ordenes, carritos, args.grano, args.desde, args.hasta)
+        reporte.to_csv(args.salida, index=False)
+        print(f"✅ Reporte de {len(reporte):,} filas guardado en {args.salida}")
@@ -0,0 +1,114 @@
+import os
+from collections import namedtuple
+from itertools import islice
+
+# Cantidad de sentencias que se envían juntas al servidor
+TAMANO_LOTE = 500
+
+# Cada cuántas sentencias se informa el avance de un archivo
+PROGRESO_CADA = 10000
+
+Sentencia = namedtuple('Sentencia', ['texto', 'linea'])
+
+
+class ErrorScriptSQL(Exception):
+    """Error al ejecutar una sentencia de un script, con el archivo y la línea donde comienza."""
+
+    def __init__(self, archivo, linea, causa):
+        self.archivo = archivo
+        self.linea = linea
+        self.causa = causa
+        super().__init__(f"{archivo}, línea {linea}: {causa}")
+
+
+def leer_sentencias(ruta):
+    """
+    Recorre un script .sql línea a línea y devuelve cada sentencia completa junto con
+    la línea donde comienza, ignorando comentarios '--' y respetando los ';' dentro de
+    literales. La memoria usada depende del tamaño de una sentencia, no del archivo.
+    """
+    partes = []
+    linea_inicio = None
+    en_literal = False
+    with open(ruta, 'r', encoding='utf-8') as archivo:
+        for numero, linea in enumerate(archivo, start=1):
+            inicio = 0
+            i = 0
+            while i < len(linea):
+                caracter = linea[i]
+                if en_literal:
+                    if caracter == "'":
+                        en_literal = False
+                elif caracter == "'":
+                    en_literal = True
+                elif caracter == '-' and linea.startswith('--', i):
+                    partes.append(linea[inicio:i] + '\n')
+                    inicio = len(linea)
+                    break
+                elif caracter == ';':
+                    partes.append(linea[inicio:i])
+                    sentencia = ''.join(partes).strip()
+                    if sentencia:
+                        yield Sentencia(sentencia, linea_inicio or numero)
+                    partes = []
+                    linea_inicio = None
+                    inicio = i + 1
+                elif linea_inicio is None and not caracter.isspace():
+                    linea_inicio = numero
+                i += 1
+            partes.append(linea[inicio:])
+    sentencia = ''.join(partes).strip()
+    if sentencia:
+        yield Sentencia(sentencia, linea_inicio)
+
+
+def lotes(iterable, tamano_lote):
+    """Agrupa un iterable en listas de hasta `tamano_lote` elementos."""
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano_lote))
+        if not lote:
+            return
+        yield lote
+
+
+def _ejecutar_lote(conn, lote):
+    # Sin parámetros, pg8000 usa el protocolo simple y acepta varias sentencias por envío
+    conn.exec_driver_sql(';\n'.join(sentencia.texto for sentencia in lote))
+
+
+def ejecutar_script_por_lotes(conn, ruta, tamano_lote=TAMANO_LOTE, omitir_errores=False, progreso_cada=PROGRESO_CADA):
+    """
+    Ejecuta un script .sql enviando sus sentencias en lotes, cada uno protegido por un SAVEPOINT.
+    Si un lote falla se reintenta sentencia a sentencia para ubicar la línea del error:
+    con `omitir_errores` las sentencias fallidas se informan y se saltan, de lo contrario
+    se lanza ErrorScriptSQL. Debe llamarse dentro de una transacción abierta.
+
+    Devuelve (sentencias_ejecutadas, errores) donde errores es una lista de ErrorScriptSQL.
+    """
+    archivo = os.path.basename(ruta)
+    ejecutadas = 0
+    errores = []
+    siguiente_aviso = progreso_cada
+    for lote in lotes(leer_sentencias(ruta), tamano_lote):
+        try:
+            with conn.begin_nested():
+                _ejecutar_lote(conn, lote)
+            ejecutadas += len(lote)
+        except Exception:
+            for sentencia in lote:
+                try:
+                    with conn.begin_nested():
+                        _ejecutar_lote(conn, [sentencia])
+                    ejecutadas += 1
+                except Exception as e:
+                    error = ErrorScriptSQL(archivo, sentencia.linea, getattr(e, 'orig', e))
+                    if not omitir_errores:
+                        raise error from e
+                    errores.append(error)
+                    print(f"    ⚠️  Omitida: {error}")
+
+        if progreso_cada and ejecutadas >= siguiente_aviso:
+            print(f"    {archivo}: {ejecutadas:,} sentencias (línea {lote[-1].linea:,})")
+            siguiente_aviso += progreso_cada
+    return ejecutadas, errores
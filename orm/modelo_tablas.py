@@ -1,5 +1,6 @@
 from sqlalchemy import (Column, 
                         Integer, 
+                        BigInteger, 
                         String, 
                         DateTime, 
                         ForeignKey, 
@@ -46,7 +47,7 @@ class Productos(Base):
     descripcion = Column(Text)
     precio = Column(Numeric(10, 2), nullable=False)
     stock = Column(Integer, nullable=False)
-    categoria_id = Column(Integer, ForeignKey('categorias.categoria_id'))
+    categoria_id = Column(Integer, ForeignKey('categorias.categoria_id'), index=True)
 
     categoria = relationship('Categorias', back_populates='productos')
     detalle_ordenes = relationship('DetalleOrdenes', back_populates='producto')
@@ -58,10 +59,10 @@ class Ordenes(Base):
     __tablename__ = 'ordenes'
 
     orden_id = Column(Integer, primary_key=True, autoincrement=True)
-    usuario_id = Column(Integer, ForeignKey('usuarios.usuario_id'))
-    fecha_orden = Column(DateTime, default=func.now())
+    usuario_id = Column(Integer, ForeignKey('usuarios.usuario_id'), index=True)
+    fecha_orden = Column(DateTime, default=func.now(), index=True)
     total = Column(Numeric(10, 2), nullable=False)
-    estado = Column(String(50), default='Pendiente')
+    estado = Column(String(50), default='Pendiente', index=True)
 
     usuario = relationship('Usuarios', back_populates='ordenes')
     detalles = relationship('DetalleOrdenes', back_populates='orden')
@@ -73,8 +74,8 @@ class DetalleOrdenes(Base):
     __tablename__ = 'detalle_ordenes'
 
     detalle_id = Column(Integer, primary_key=True, autoincrement=True)
-    orden_id = Column(Integer, ForeignKey('ordenes.orden_id'))
-    producto_id = Column(Integer, ForeignKey('productos.producto_id'))
+    orden_id = Column(Integer, ForeignKey('ordenes.orden_id'), index=True)
+    producto_id = Column(Integer, ForeignKey('productos.producto_id'), index=True)
     cantidad = Column(Integer, nullable=False)
     precio_unitario = Column(Numeric(10, 2), nullable=False)
 
@@ -86,7 +87,7 @@ class DireccionesEnvio(Base):
     __tablename__ = 'direcciones_envio'
 
     direccion_id = Column(Integer, primary_key=True, autoincrement=True)
-    usuario_id = Column(Integer, ForeignKey('usuarios.usuario_id'))
+    usuario_id = Column(Integer, ForeignKey('usuarios.usuario_id'), index=True)
     calle = Column(String(255), nullable=False)
     ciudad = Column(String(100), nullable=False)
     departamento = Column(String(100))
@@ -103,10 +104,10 @@ class Carrito(Base):
     __tablename__ = 'carrito'
 
     carrito_id = Column(Integer, primary_key=True, autoincrement=True)
-    usuario_id = Column(Integer, ForeignKey('usuarios.usuario_id'))
-    producto_id = Column(Integer, ForeignKey('productos.producto_id'))
+    usuario_id = Column(Integer, ForeignKey('usuarios.usuario_id'), index=True)
+    producto_id = Column(Integer, ForeignKey('productos.producto_id'), index=True)
     cantidad = Column(Integer, nullable=False)
-    fecha_agregado = Column(DateTime, default=func.now())
+    fecha_agregado = Column(DateTime, default=func.now(), index=True)
 
     usuario = relationship('Usuarios', back_populates='carrito')
     producto = relationship('Productos', back_populates='carrito')
@@ -127,8 +128,8 @@ class OrdenesMetodosPago(Base):
     __tablename__ = 'ordenes_metodos_pago'
 
     orden_metodo_id = Column(Integer, primary_key=True, autoincrement=True)
-    orden_id = Column(Integer, ForeignKey('ordenes.orden_id'))
-    metodo_pago_id = Column(Integer, ForeignKey('metodos_pago.metodo_pago_id'))
+    orden_id = Column(Integer, ForeignKey('ordenes.orden_id'), index=True)
+    metodo_pago_id = Column(Integer, ForeignKey('metodos_pago.metodo_pago_id'), index=True)
     monto_pagado = Column(Numeric(10, 2), nullable=False)
 
     orden = relationship('Ordenes', back_populates='pagos')
@@ -139,8 +140,8 @@ class ReseñasProductos(Base):
     __tablename__ = 'reseñas_productos'
 
     reseña_id = Column(Integer, primary_key=True, autoincrement=True)
-    usuario_id = Column(Integer, ForeignKey('usuarios.usuario_id'))
-    producto_id = Column(Integer, ForeignKey('productos.producto_id'))
+    usuario_id = Column(Integer, ForeignKey('usuarios.usuario_id'), index=True)
+    producto_id = Column(Integer, ForeignKey('productos.producto_id'), index=True)
     calificacion = Column(Integer, nullable=False)
     comentario = Column(Text)
     fecha = Column(DateTime, default=func.now())
@@ -153,11 +154,38 @@ class HistorialPagos(Base):
     __tablename__ = 'historial_pagos'
 
     pago_id = Column(Integer, primary_key=True, autoincrement=True)
-    orden_id = Column(Integer, ForeignKey('ordenes.orden_id'))
-    metodo_pago_id = Column(Integer, ForeignKey('metodos_pago.metodo_pago_id'))
+    orden_id = Column(Integer, ForeignKey('ordenes.orden_id'), index=True)
+    metodo_pago_id = Column(Integer, ForeignKey('metodos_pago.metodo_pago_id'), index=True)
     monto = Column(Numeric(10, 2), nullable=False)
     fecha_pago = Column(DateTime, default=func.now())
     estado_pago = Column(String(50), default='Procesando')
 
     orden = relationship('Ordenes', back_populates='historial_pagos')
     metodo_pago = relationship('MetodosPago', back_populates='historial_pagos')
+
+# Tabla control_marcas_agua: hasta dónde llegó la ingesta incremental de cada tabla
+class MarcasAgua(Base):
+    __tablename__ = 'control_marcas_agua'
+
+    tabla = Column(String(100), primary_key=True)
+    ultimo_id = Column(BigInteger)
+    ultima_fecha = Column(DateTime)
+    fecha_actualizacion = Column(DateTime, default=func.now(), onupdate=func.now())
+
+# Tabla control_lotes_carga: cada lote aplicado por la ingesta incremental
+class LotesCarga(Base):
+    __tablename__ = 'control_lotes_carga'
+
+    lote_id = Column(Integer, primary_key=True, autoincrement=True)
+    tabla = Column(String(100), nullable=False, index=True)
+    origen = Column(String(20), nullable=False)
+    archivo = Column(String(255), index=True)
+    inicio = Column(DateTime, default=func.now(), nullable=False)
+    fin = Column(DateTime)
+    filas_leidas = Column(Integer)
+    filas_insertadas = Column(Integer)
+    filas_actualizadas = Column(Integer)
+    marca_id = Column(BigInteger)
+    marca_fecha = Column(DateTime)
+    estado = Column(String(20), default='en_curso', nullable=False)
+    error = Column(Text)
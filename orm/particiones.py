@@ -0,0 +1,245 @@
+import re
+import argparse
+from datetime import date
+from sqlalchemy import MetaData, PrimaryKeyConstraint, ForeignKeyConstraint, text
+from db_conector import get_db_connection, Base
+import modelo_tablas  # Registra las tablas en Base.metadata
+
+# Almacenamiento particionado por mes de las tablas de hechos de mayor volumen. Los modelos de
+# dbt y las consultas que filtran o agrupan por mes solo leen las particiones de ese rango, y la
+# historia vieja se quita con DETACH PARTITION sin borrar fila por fila.
+#
+# Cada tabla tiene una partición por mes ({tabla}_pAAAA_MM) y una partición DEFAULT que recibe
+# las filas de meses que todavía no tienen la suya (p. ej. inserciones de la aplicación). Las
+# cargas crean las particiones que faltan antes de copiar, o mueven al final las filas que
+# quedaron en la DEFAULT.
+
+# Tabla: columna de fecha por la que se particiona. detalle_ordenes no tiene fecha propia
+# (la toma de su orden), así que queda como tabla común.
+TABLAS_PARTICIONADAS = {
+    'ordenes': 'fecha_orden',
+    'carrito': 'fecha_agregado',
+    'historial_pagos': 'fecha_pago',
+    'reseñas_productos': 'fecha'
+}
+
+PATRON_PARTICION = re.compile(r'_p(\d{4})_(\d{2})$')
+
+
+def _q(nombre):
+    """Identificador entre comillas (los nombres con ñ las necesitan)."""
+    return '"' + nombre.replace('"', '""') + '"'
+
+
+def nombre_particion(tabla, mes):
+    return f"{tabla}_p{mes.year:04d}_{mes.month:02d}"
+
+
+def nombre_default(tabla):
+    return f"{tabla}_default"
+
+
+def _inicio_mes(fecha):
+    return date(fecha.year, fecha.month, 1)
+
+
+def _mes_siguiente(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def metadata_particionada(metadata=Base.metadata):
+    """
+    Copia de `metadata` en la que las tablas de TABLAS_PARTICIONADAS se crean con
+    PARTITION BY RANGE sobre su fecha. PostgreSQL exige que la clave primaria incluya la
+    columna de partición, así que pasa a ser (id, fecha) y la fecha deja de admitir NULL.
+    Por lo mismo las claves foráneas hacia ordenes(orden_id) no se crean: orden_id solo ya
+    no tiene una restricción única en la que apoyarse.
+    """
+    copia = MetaData()
+    for tabla in metadata.sorted_tables:
+        tabla.to_metadata(copia)
+
+    for nombre, columna_fecha in TABLAS_PARTICIONADAS.items():
+        tabla = copia.tables[nombre]
+        tabla.dialect_options['postgresql']['partition_by'] = f"RANGE ({columna_fecha})"
+        fecha = tabla.c[columna_fecha]
+        fecha.nullable = False
+        fecha.primary_key = True
+        clave = list(tabla.primary_key.columns)
+        for columna in clave:
+            # Con la clave compuesta el id sigue siendo SERIAL
+            columna.autoincrement = True
+        tabla.append_constraint(PrimaryKeyConstraint(*clave, fecha))
+
+    particionadas = {copia.tables[nombre] for nombre in TABLAS_PARTICIONADAS}
+    for tabla in copia.tables.values():
+        for restriccion in list(tabla.constraints):
+            if isinstance(restriccion, ForeignKeyConstraint) and restriccion.referred_table in particionadas:
+                tabla.constraints.remove(restriccion)
+                for columna in restriccion.columns:
+                    columna.foreign_keys.difference_update(restriccion.elements)
+                tabla.foreign_keys.difference_update(restriccion.elements)
+    return copia
+
+
+def tablas_particionadas(conn):
+    """Tablas de TABLAS_PARTICIONADAS que en esta base están creadas como particionadas."""
+    filas = conn.execute(text("""
+        SELECT c.relname
+        FROM pg_partitioned_table p
+        JOIN pg_class c ON c.oid = p.partrelid
+        WHERE c.relnamespace = current_schema()::regnamespace
+    """))
+    return {fila.relname for fila in filas} & set(TABLAS_PARTICIONADAS)
+
+
+def crear_particiones_default(conn):
+    """
+    Crea la partición DEFAULT de cada tabla particionada. Devuelve las tablas de
+    TABLAS_PARTICIONADAS que existían de antes como tablas comunes y no se particionaron.
+    """
+    particionadas = tablas_particionadas(conn)
+    for tabla in particionadas:
+        conn.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {_q(nombre_default(tabla))} PARTITION OF {_q(tabla)} DEFAULT"
+        )
+    return sorted(set(TABLAS_PARTICIONADAS) - particionadas)
+
+
+def particiones(conn, tabla):
+    """Lista de (partición, límites, filas estimadas) de `tabla`, ordenada por nombre."""
+    filas = conn.execute(text("""
+        SELECT c.relname AS particion,
+               pg_get_expr(c.relpartbound, c.oid) AS limites,
+               c.reltuples::BIGINT AS filas
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:tabla)
+        ORDER BY c.relname
+    """), {'tabla': _q(tabla)})
+    return [tuple(fila) for fila in filas]
+
+
+def asegurar_particiones(conn, tabla, meses):
+    """
+    Crea las particiones mensuales de `tabla` que faltan para las fechas de `meses` (cualquier
+    objeto con year y month: date, Timestamp, Period). Si la partición DEFAULT ya tiene filas
+    de ese mes, PostgreSQL no deja crearla directamente: se crea aparte, se mueven las filas y
+    se adjunta. Devuelve los nombres de las particiones creadas.
+    """
+    meses = sorted({_inicio_mes(mes) for mes in meses})
+    if not meses:
+        return []
+    columna = TABLAS_PARTICIONADAS[tabla]
+    # Dos cargas que crean la misma partición a la vez se esperan hasta el commit de la primera
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:tabla))"), {'tabla': tabla})
+    existentes = {particion for particion, _, _ in particiones(conn, tabla)}
+
+    creadas = []
+    for mes in meses:
+        particion = nombre_particion(tabla, mes)
+        if particion in existentes:
+            continue
+        desde, hasta = mes.isoformat(), _mes_siguiente(mes).isoformat()
+        rango = f"FROM ('{desde}') TO ('{hasta}')"
+        filtro = f"{columna} >= '{desde}' AND {columna} < '{hasta}'"
+        en_default = conn.exec_driver_sql(
+            f"SELECT EXISTS (SELECT 1 FROM {_q(nombre_default(tabla))} WHERE {filtro})"
+        ).scalar()
+        if not en_default:
+            conn.exec_driver_sql(f"CREATE TABLE {_q(particion)} PARTITION OF {_q(tabla)} FOR VALUES {rango}")
+        else:
+            conn.exec_driver_sql(f"CREATE TABLE {_q(particion)} (LIKE {_q(tabla)} INCLUDING DEFAULTS)")
+            conn.exec_driver_sql(f"""
+                WITH movidas AS (DELETE FROM {_q(nombre_default(tabla))} WHERE {filtro} RETURNING *)
+                INSERT INTO {_q(particion)} SELECT * FROM movidas
+            """)
+            conn.exec_driver_sql(f"ALTER TABLE {_q(tabla)} ATTACH PARTITION {_q(particion)} FOR VALUES {rango}")
+        creadas.append(particion)
+    return creadas
+
+
+def reorganizar_default(conn, tablas=None):
+    """
+    Mueve a su partición mensual las filas que quedaron en la partición DEFAULT de `tablas`
+    (todas las particionadas si es None). Las tablas no particionadas en esta base se ignoran,
+    así que se puede llamar después de cualquier carga. Devuelve las particiones creadas.
+    """
+    candidatas = tablas_particionadas(conn)
+    if tablas is not None:
+        candidatas &= set(tablas)
+    creadas = []
+    for tabla in sorted(candidatas):
+        columna = TABLAS_PARTICIONADAS[tabla]
+        meses = conn.exec_driver_sql(
+            f"SELECT DISTINCT date_trunc('month', {columna}) FROM {_q(nombre_default(tabla))}"
+        ).scalars().all()
+        creadas += asegurar_particiones(conn, tabla, meses)
+    return creadas
+
+
+def desacoplar_particiones(conn, tabla, antes_de, eliminar=False):
+    """
+    Separa de `tabla` las particiones mensuales anteriores a `antes_de`. Quedan como tablas
+    independientes (para archivarlas o consultarlas aparte) salvo que se pida `eliminar`.
+    Devuelve los nombres de las particiones separadas.
+    """
+    limite = _inicio_mes(antes_de)
+    separadas = []
+    for particion, _, _ in particiones(conn, tabla):
+        coincidencia = PATRON_PARTICION.search(particion)
+        if not coincidencia or date(int(coincidencia[1]), int(coincidencia[2]), 1) >= limite:
+            continue
+        conn.exec_driver_sql(f"ALTER TABLE {_q(tabla)} DETACH PARTITION {_q(particion)}")
+        if eliminar:
+            conn.exec_driver_sql(f"DROP TABLE {_q(particion)}")
+        separadas.append(particion)
+    return separadas
+
+
+def _ejecutar(accion):
+    conn = get_db_connection()
+    trans = conn.begin()
+    try:
+        resultado = accion(conn)
+        trans.commit()
+        return resultado
+    except Exception:
+        trans.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Administra las particiones mensuales de las tablas de hechos.")
+    subparsers = parser.add_subparsers(dest='accion', required=True)
+
+    subparsers.add_parser('listar', help="Muestra las particiones de cada tabla con sus límites y filas estimadas.")
+    subparsers.add_parser('reorganizar', help="Mueve a su partición mensual las filas que quedaron en la DEFAULT.")
+
+    parser_desacoplar = subparsers.add_parser('desacoplar', help="Separa las particiones anteriores a un mes.")
+    parser_desacoplar.add_argument('--antes-de', type=date.fromisoformat, required=True,
+                                   help="Se separan las particiones de meses anteriores a esta fecha (AAAA-MM-DD).")
+    parser_desacoplar.add_argument('--tablas', nargs='+', choices=list(TABLAS_PARTICIONADAS),
+                                   default=list(TABLAS_PARTICIONADAS))
+    parser_desacoplar.add_argument('--eliminar', action='store_true',
+                                   help="Elimina las particiones separadas en lugar de conservarlas como tablas.")
+    args = parser.parse_args()
+
+    if args.accion == 'listar':
+        def listar(conn):
+            for tabla in sorted(tablas_particionadas(conn)):
+                print(f"--> {tabla}")
+                for particion, limites, filas in particiones(conn, tabla):
+                    print(f"    {particion}: {limites} (~{max(filas, 0):,} filas)")
+        _ejecutar(listar)
+    elif args.accion == 'reorganizar':
+        creadas = _ejecutar(reorganizar_default)
+        print(f"✅ {len(creadas)} particiones creadas desde la DEFAULT.")
+    else:
+        def desacoplar(conn):
+            return {tabla: desacoplar_particiones(conn, tabla, args.antes_de, args.eliminar) for tabla in args.tablas}
+        for tabla, separadas in _ejecutar(desacoplar).items():
+            print(f"✅ {tabla}: {len(separadas)} particiones {'eliminadas' if args.eliminar else 'separadas'}"
+                  + (f" ({', '.join(separadas)})" if separadas else ""))
@@ -0,0 +1,106 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from db_conector import get_db_engine, Base
+import modelo_tablas  # Registra las tablas en Base.metadata
+
+
+def grafo_dependencias(tablas, metadata=Base.metadata):
+    """
+    Construye el grafo de dependencias {tabla: {tablas de las que depende}} a partir
+    de las claves foráneas declaradas en `metadata`, restringido a las tablas a cargar.
+    """
+    grafo = {}
+    for tabla in tablas:
+        padres = {
+            fk.column.table.name
+            for fk in metadata.tables[tabla].foreign_keys
+        }
+        grafo[tabla] = {padre for padre in padres if padre in tablas and padre != tabla}
+    return grafo
+
+
+def ruta_critica(grafo, duraciones):
+    """Devuelve (segundos, [tablas]) de la cadena de dependencias más larga según las duraciones medidas."""
+    memo = {}
+
+    def costo(tabla):
+        if tabla not in memo:
+            mejor = max((costo(padre) for padre in grafo[tabla]), default=(0.0, []))
+            memo[tabla] = (mejor[0] + duraciones.get(tabla, 0.0), mejor[1] + [tabla])
+        return memo[tabla]
+
+    return max((costo(tabla) for tabla in grafo), default=(0.0, []))
+
+
+def _cargar_tabla(engine, cargar):
+    """Ejecuta la carga de una tabla en su propia conexión y transacción."""
+    inicio = time.perf_counter()
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            cargar(conn)
+            trans.commit()
+        except Exception:
+            trans.rollback()
+            raise
+    return time.perf_counter() - inicio
+
+
+def cargar_en_paralelo(tareas, max_hilos=4, engine=None):
+    """
+    Carga las tablas de `tareas` ({tabla: funcion(conn)}) respetando el orden parcial
+    que imponen las claves foráneas: cada tabla se lanza en cuanto terminan las tablas
+    de las que depende, con commit o rollback independiente.
+
+    Si una tabla falla, las que dependen de ella se omiten. Devuelve un diccionario
+    {tabla: segundos} con las tablas cargadas y lanza un RuntimeError al final si hubo errores.
+    """
+    engine = engine or get_db_engine()
+    grafo = grafo_dependencias(set(tareas))
+    pendientes = dict(grafo)
+    completadas = {}
+    errores = {}
+    omitidas = set()
+    en_curso = {}
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_hilos) as ejecutor:
+        while pendientes or en_curso:
+            hubo_cambios = True
+            while hubo_cambios:
+                hubo_cambios = False
+                for tabla, padres in list(pendientes.items()):
+                    if padres & (set(errores) | omitidas):
+                        omitidas.add(tabla)
+                        print(f"⏭️  Omitida {tabla}: depende de una tabla que no se cargó")
+                    elif padres <= set(completadas):
+                        print(f"--> Cargando tabla: {tabla}")
+                        en_curso[ejecutor.submit(_cargar_tabla, engine, tareas[tabla])] = tabla
+                    else:
+                        continue
+                    del pendientes[tabla]
+                    hubo_cambios = True
+
+            if not en_curso:
+                if pendientes:
+                    raise ValueError(f"Dependencias circulares entre: {', '.join(sorted(pendientes))}")
+                break
+
+            terminadas, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in terminadas:
+                tabla = en_curso.pop(futuro)
+                try:
+                    completadas[tabla] = futuro.result()
+                    print(f"✅ {tabla} cargada en {completadas[tabla]:.2f} s")
+                except Exception as e:
+                    errores[tabla] = e
+                    print(f"❌ Error cargando {tabla}: {e}")
+
+    total = time.perf_counter() - inicio
+    segundos_critica, tablas_critica = ruta_critica(grafo, completadas)
+    print(f"\nTiempo total: {total:.2f} s | Ruta crítica: {segundos_critica:.2f} s ({' -> '.join(tablas_critica)})")
+
+    if errores:
+        raise RuntimeError(f"Fallaron {len(errores)} tabla(s): {', '.join(errores)}; omitidas: {', '.join(sorted(omitidas)) or 'ninguna'}")
+    return completadas
@@ -0,0 +1,26 @@
+-- Macros de apoyo para los modelos incrementales de la capa gold.
+
+-- Marca de tiempo de la corrida actual de dbt: se guarda en cada fila (re)calculada.
+{% macro marca_actualizacion() %}
+    '{{ run_started_at }}'::TIMESTAMPTZ
+{% endmacro %}
+
+-- Meses (DATE) con filas nuevas en un modelo de hechos: filas cuyo id supera el mayor id
+-- ya procesado, guardado en la columna `columna_marca` del modelo incremental actual.
+{% macro meses_con_datos_nuevos(relacion, columna_id, columna_fecha, columna_marca) %}
+    SELECT DISTINCT DATE_TRUNC('month', {{ columna_fecha }})::DATE AS mes_orden
+    FROM {{ relacion }}
+    WHERE {{ columna_id }} > (SELECT COALESCE(MAX({{ columna_marca }}), 0) FROM {{ this }})
+      AND {{ columna_fecha }} IS NOT NULL
+{% endmacro %}
+
+-- Meses (DATE) con filas recalculadas en alguno de los modelos indicados después
+-- de la última actualización del modelo incremental actual.
+{% macro meses_actualizados(modelos) %}
+    {%- for modelo in modelos %}
+    SELECT mes_orden::DATE AS mes_orden
+    FROM {{ ref(modelo) }}
+    WHERE fecha_actualizacion > (SELECT COALESCE(MAX(fecha_actualizacion), '-infinity'::TIMESTAMPTZ) FROM {{ this }})
+    {% if not loop.last %}UNION{% endif %}
+    {%- endfor %}
+{% endmacro %}
@@ -0,0 +1,28 @@
+-- Crea un índice btree sobre las columnas indicadas del modelo actual, si todavía no existe uno
+-- con esas mismas columnas. El nombre lo elige PostgreSQL: en un --full-refresh la tabla anterior
+-- todavía conserva sus índices cuando corre el post_hook, y un nombre fijo chocaría con ellos.
+-- Las columnas del índice se comparan por nombre en el catálogo (pg_index.indkey): en indexdef
+-- PostgreSQL escribe entre comillas los nombres con caracteres no ASCII, como "reseña_id".
+{% macro crear_indice(columnas) %}
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1
+            FROM pg_index AS i
+            JOIN pg_class AS t ON t.oid = i.indrelid
+            JOIN pg_namespace AS n ON n.oid = t.relnamespace
+            WHERE n.nspname = '{{ this.schema }}'
+              AND t.relname = '{{ this.identifier }}'
+              AND i.indpred IS NULL
+              AND ARRAY(
+                  SELECT a.attname::TEXT
+                  FROM unnest(i.indkey::INT2[]) WITH ORDINALITY AS k(attnum, posicion)
+                  JOIN pg_attribute AS a ON a.attrelid = t.oid AND a.attnum = k.attnum
+                  ORDER BY k.posicion
+              ) = ARRAY[{% for columna in columnas %}'{{ columna }}'{% if not loop.last %}, {% endif %}{% endfor %}]::TEXT[]
+        ) THEN
+            CREATE INDEX ON {{ this }} ({{ columnas | join(', ') }});
+        END IF;
+    END
+    $$
+{% endmacro %}
@@ -0,0 +1,39 @@
+-- Macros de apoyo para los snapshots con detección de cambios por hash.
+
+-- Hash de las columnas indicadas de una fila. ROW(...)::TEXT distingue NULL de cadena vacía,
+-- así que dos filas tienen el mismo hash solo si todas esas columnas son iguales.
+{% macro hash_fila(columnas) %}
+    md5(ROW({{ columnas | join(', ') }})::TEXT)
+{% endmacro %}
+
+-- SELECT de un snapshot con estrategia 'timestamp': agrega `updated_at` a las columnas de
+-- `relacion`, derivado de su `hash_fila`. Si el hash coincide con el de la versión vigente del
+-- snapshot se repite su dbt_updated_at (dbt no ve cambios); si difiere, o el registro es nuevo,
+-- vale la hora actual. Así dbt solo compara una marca de tiempo por fila y escribe solo las
+-- filas que cambiaron. La versión vigente se busca por (clave, dbt_valid_to), que tiene índice.
+-- En la primera corrida, o si el snapshot todavía no tiene hash_fila, todas las filas son nuevas.
+-- Con la estrategia 'check' (solo para comparar en el benchmark) no hace falta buscar la versión.
+{% macro seleccionar_con_updated_at(relacion, clave, columnas) %}
+    {%- set actual = adapter.get_relation(database=this.database, schema=this.schema, identifier=this.identifier) -%}
+    {%- set con_hash = config.get('strategy') == 'timestamp' and actual is not none
+        and 'hash_fila' in (adapter.get_columns_in_relation(actual) | map(attribute='name') | map('lower') | list) -%}
+    SELECT
+        {%- for columna in columnas %}
+        origen.{{ columna }},
+        {%- endfor %}
+        origen.hash_fila,
+        {% if con_hash -%}
+        CASE
+            WHEN vigente.hash_fila = origen.hash_fila THEN vigente.dbt_updated_at
+            ELSE LOCALTIMESTAMP
+        END AS updated_at
+        {%- else -%}
+        LOCALTIMESTAMP AS updated_at
+        {%- endif %}
+    FROM {{ relacion }} origen
+    {%- if con_hash %}
+    LEFT JOIN {{ actual }} vigente
+        ON vigente.{{ clave }} = origen.{{ clave }}
+        AND vigente.dbt_valid_to IS NULL
+    {%- endif %}
+{% endmacro %}
@@ -0,0 +1,16 @@
+-- Registra que el modelo actual se reconstruyó en esta corrida de dbt. El dashboard consulta
+-- esta tabla (una fila por modelo) para saber si sus datos cambiaron y recién entonces
+-- volver a leer la capa gold; entre corridas no vuelve a consultar los modelos.
+-- Se usa como post_hook, que dbt solo ejecuta si el modelo se construyó sin errores.
+{% macro registrar_version_datos() %}
+    CREATE TABLE IF NOT EXISTS {{ this.schema }}.dbt_version_datos (
+        modelo TEXT PRIMARY KEY,
+        invocation_id TEXT NOT NULL,
+        fecha_actualizacion TIMESTAMPTZ NOT NULL
+    );
+    INSERT INTO {{ this.schema }}.dbt_version_datos (modelo, invocation_id, fecha_actualizacion)
+    VALUES ('{{ this.identifier }}', '{{ invocation_id }}', {{ marca_actualizacion() }})
+    ON CONFLICT (modelo) DO UPDATE
+    SET invocation_id = EXCLUDED.invocation_id,
+        fecha_actualizacion = EXCLUDED.fecha_actualizacion
+{% endmacro %}
@@ -0,0 +1,9 @@
+-- Las vistas materializadas de la capa gold (mv_*) se actualizan sin bloquear las lecturas del
+-- dashboard. dbt-postgres las refresca con un REFRESH MATERIALIZED VIEW simple, que toma un
+-- bloqueo exclusivo hasta terminar; esta versión del proyecto tiene prioridad sobre la del
+-- adaptador y usa CONCURRENTLY, que calcula el resultado aparte y aplica solo las diferencias.
+-- Requiere un índice único sobre la vista (configurado en cada modelo con `indexes`) y que la
+-- vista ya tenga datos, cosa que dbt garantiza porque la crea con ellos.
+{% macro postgres__refresh_materialized_view(relation) %}
+    REFRESH MATERIALIZED VIEW CONCURRENTLY {{ relation }}
+{% endmacro %}
@@ -1,5 +1,7 @@
 SELECT
     categoria_id,
     nombre,
-    descripcion
-FROM {{ source('ecommerce_db', 'categorias') }}
\ No newline at end of file
+    descripcion,
+    -- Detecta cambios en el snapshot categorias_historico, que solo versiona el nombre
+    {{ hash_fila(['nombre']) }} AS hash_fila
+FROM {{ source('ecommerce_db', 'categorias') }}
@@ -4,5 +4,7 @@ SELECT
     descripcion,
     precio,
     stock,
-    categoria_id
-FROM {{ source('ecommerce_db', 'productos') }}
\ No newline at end of file
+    categoria_id,
+    -- Detecta cambios en el snapshot productos_historico
+    {{ hash_fila(['nombre', 'descripcion', 'precio', 'stock', 'categoria_id']) }} AS hash_fila
+FROM {{ source('ecommerce_db', 'productos') }}
@@ -1,19 +1,52 @@
+{{ config(
+    materialized='incremental',
+    unique_key=['producto_id', 'mes_orden'],
+    incremental_strategy='delete+insert',
+    post_hook="{{ crear_indice(['producto_id', 'mes_orden']) }}"
+) }}
+
 -- Modelo de agregación para calcular el crecimiento de ventas mensual de los productos.
 -- Ideal para responder al KPI "¿Qué productos están creciendo más rápidamente en ventas?".
+-- Incremental: se recalculan los meses con líneas de orden nuevas y, para cada producto, el mes
+-- con ventas que les sigue (su LAG cambia). Las ventas de los demás meses se leen del propio modelo.
+-- Con --full-refresh se reconstruye todo el historial.
 
-WITH ventas_mensuales AS (
+WITH
+{% if is_incremental() %}
+meses_nuevos AS (
+    {{ meses_con_datos_nuevos(ref('fact_ordenes'), 'detalle_id', 'fecha_orden', 'max_detalle_id') }}
+),
+{% endif %}
+ventas_mensuales AS (
     SELECT
         DATE_TRUNC('month', fo.fecha_orden) AS mes_orden,
         fo.producto_id,
         fo.nombre_producto_final AS nombre_producto,
         fo.nombre_categoria_final AS nombre_categoria,
-        SUM(fo.subtotal_linea) AS ventas_mensuales
+        SUM(fo.subtotal_linea) AS ventas_mensuales,
+        MAX(fo.detalle_id) AS max_detalle_id
     FROM {{ ref('fact_ordenes') }} fo
+    {% if is_incremental() %}
+    WHERE DATE_TRUNC('month', fo.fecha_orden)::DATE IN (SELECT mes_orden FROM meses_nuevos)
+    {% endif %}
     GROUP BY
         1,
         fo.producto_id,
         fo.nombre_producto_final, -- Agrupar por el nombre final
         fo.nombre_categoria_final -- Agrupar por el nombre final
+    {% if is_incremental() %}
+    UNION ALL
+    -- Meses ya calculados que no cambian: solo aportan las ventas del mes anterior al LAG
+    SELECT
+        mes_orden,
+        producto_id,
+        nombre_producto,
+        nombre_categoria,
+        ventas_mensuales,
+        max_detalle_id
+    FROM {{ this }}
+    WHERE mes_orden::DATE NOT IN (SELECT mes_orden FROM meses_nuevos)
+    {% endif %}
 ),
 ventas_con_periodo_anterior AS (
     -- Paso 2: Calcular ventas del mes anterior para cada producto
@@ -23,7 +56,9 @@ ventas_con_periodo_anterior AS (
         vm.nombre_producto,
         vm.nombre_categoria,
         vm.ventas_mensuales,
-        LAG(vm.ventas_mensuales, 1) OVER (PARTITION BY vm.producto_id ORDER BY vm.mes_orden) AS ventas_mes_anterior
+        vm.max_detalle_id,
+        LAG(vm.ventas_mensuales, 1) OVER (PARTITION BY vm.producto_id ORDER BY vm.mes_orden) AS ventas_mes_anterior,
+        LAG(vm.mes_orden, 1) OVER (PARTITION BY vm.producto_id ORDER BY vm.mes_orden) AS mes_anterior
     FROM ventas_mensuales vm
 )
 SELECT
@@ -36,11 +71,18 @@ SELECT
     CASE
         WHEN COALESCE(vpa.ventas_mes_anterior, 0) = 0 THEN NULL
         ELSE ((vpa.ventas_mensuales - vpa.ventas_mes_anterior) * 100.0) / vpa.ventas_mes_anterior
-    END AS crecimiento_porcentual
+    END AS crecimiento_porcentual,
+    vpa.max_detalle_id,
+    {{ marca_actualizacion() }} AS fecha_actualizacion
 FROM ventas_con_periodo_anterior vpa
 WHERE vpa.mes_orden IS NOT NULL
   AND vpa.ventas_mensuales > 0
+{% if is_incremental() %}
+  AND (
+      vpa.mes_orden::DATE IN (SELECT mes_orden FROM meses_nuevos)
+      OR vpa.mes_anterior::DATE IN (SELECT mes_orden FROM meses_nuevos)
+  )
+{% endif %}
 ORDER BY
     vpa.mes_orden DESC,
     crecimiento_porcentual DESC
-    
\ No newline at end of file
@@ -1,13 +1,29 @@
+{{ config(
+    materialized='incremental',
+    unique_key=['producto_id', 'mes_orden'],
+    incremental_strategy='delete+insert',
+    post_hook="{{ crear_indice(['producto_id', 'mes_orden']) }}"
+) }}
+
 -- Modelo de agregación para calcular los ingresos totales generados por cada producto y MES.
 -- Ideal para responder al KPI "¿Qué producto genera más ingresos totales por mes?".
+-- Incremental: en cada corrida solo se recalculan los meses con líneas de orden nuevas
+-- (detalle_id mayor a max_detalle_id); con --full-refresh se reconstruye todo el historial.
 SELECT
     fo.producto_id,
     fo.nombre_producto_final AS nombre_producto, -- Usamos el nombre histórico del producto
     fo.nombre_categoria_final AS nombre_categoria, -- Usamos el nombre histórico de la categoría
     DATE_TRUNC('month', fo.fecha_orden)::DATE AS mes_orden,
 
-    SUM(fo.subtotal_linea) AS ingresos_totales
+    SUM(fo.subtotal_linea) AS ingresos_totales,
+    MAX(fo.detalle_id) AS max_detalle_id,
+    {{ marca_actualizacion() }} AS fecha_actualizacion
 FROM {{ ref('fact_ordenes') }} fo
+{% if is_incremental() %}
+WHERE DATE_TRUNC('month', fo.fecha_orden)::DATE IN (
+    {{ meses_con_datos_nuevos(ref('fact_ordenes'), 'detalle_id', 'fecha_orden', 'max_detalle_id') }}
+)
+{% endif %}
 GROUP BY
     fo.producto_id,
     fo.nombre_producto_final,
@@ -15,4 +31,4 @@ GROUP BY
     DATE_TRUNC('month', fo.fecha_orden)::DATE
 ORDER BY
     mes_orden DESC,
-    ingresos_totales DESC
\ No newline at end of file
+    ingresos_totales DESC
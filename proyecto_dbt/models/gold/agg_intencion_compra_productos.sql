@@ -1,5 +1,14 @@
+{{ config(
+    materialized='incremental',
+    unique_key=['producto_id', 'mes_orden'],
+    incremental_strategy='delete+insert',
+    post_hook="{{ crear_indice(['producto_id', 'mes_orden']) }}"
+) }}
+
 -- Modelo de agregación para identificar la intención de compra de productos basada en el carrito y MES.
 -- Ideal para responder al KPI "¿Qué producto muestra mayor intención de compra por mes?".
+-- Incremental: en cada corrida solo se recalculan los meses con registros de carrito nuevos
+-- (carrito_id mayor a max_carrito_id); con --full-refresh se reconstruye todo el historial.
 SELECT
     fc.producto_id,
     fc.nombre_producto_final AS nombre_producto, -- Usamos el nombre histórico del producto
@@ -8,8 +17,15 @@ SELECT
 
     COUNT(DISTINCT fc.carrito_id) AS veces_agregado_al_carrito,
     SUM(fc.cantidad_agregada_carrito) AS cantidad_total_agregada_carrito,
-    COUNT(DISTINCT fc.usuario_id) AS usuarios_con_intencion
+    COUNT(DISTINCT fc.usuario_id) AS usuarios_con_intencion,
+    MAX(fc.carrito_id) AS max_carrito_id,
+    {{ marca_actualizacion() }} AS fecha_actualizacion
 FROM {{ ref('fact_carritos') }} fc
+{% if is_incremental() %}
+WHERE DATE_TRUNC('month', fc.fecha_agregado_carrito)::DATE IN (
+    {{ meses_con_datos_nuevos(ref('fact_carritos'), 'carrito_id', 'fecha_agregado_carrito', 'max_carrito_id') }}
+)
+{% endif %}
 GROUP BY
     fc.producto_id,
     fc.nombre_producto_final,
@@ -18,4 +34,4 @@ GROUP BY
 ORDER BY
     mes_orden DESC,
     veces_agregado_al_carrito DESC,
-    cantidad_total_agregada_carrito DESC
\ No newline at end of file
+    cantidad_total_agregada_carrito DESC
@@ -0,0 +1,39 @@
+{{ config(
+    materialized='incremental',
+    unique_key=['metodo_pago_id', 'mes_pago'],
+    incremental_strategy='delete+insert',
+    post_hook="{{ crear_indice(['mes_pago', 'metodo_pago_id']) }}"
+) }}
+
+-- Modelo de agregación de pagos por método de pago y MES del pago: cantidad y monto por estado
+-- y latencia desde la orden (promedio y percentiles 50 y 90, en horas).
+-- Responde "¿Cómo se reparten los pagos entre métodos y cuánto tardan en procesarse?".
+-- Incremental: solo se recalculan los meses con pagos nuevos (pago_id mayor a max_pago_id).
+SELECT
+    fp.metodo_pago_id,
+    fp.nombre_metodo_pago,
+    DATE_TRUNC('month', fp.fecha_pago)::DATE AS mes_pago,
+
+    COUNT(*) AS pagos,
+    COUNT(DISTINCT fp.orden_id) AS ordenes,
+    SUM(fp.monto) AS monto_total,
+    COALESCE(SUM(fp.monto) FILTER (WHERE fp.estado_pago = 'Pagado'), 0) AS monto_pagado,
+    COUNT(*) FILTER (WHERE fp.estado_pago = 'Pagado') AS pagos_aprobados,
+    COUNT(*) FILTER (WHERE fp.estado_pago = 'Fallido') AS pagos_fallidos,
+    COUNT(*) FILTER (WHERE fp.estado_pago = 'Reembolsado') AS pagos_reembolsados,
+    COUNT(*) FILTER (WHERE fp.estado_pago = 'Procesando') AS pagos_en_proceso,
+    AVG(fp.horas_hasta_pago) AS horas_hasta_pago_promedio,
+    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY fp.horas_hasta_pago) AS horas_hasta_pago_p50,
+    PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY fp.horas_hasta_pago) AS horas_hasta_pago_p90,
+    MAX(fp.pago_id) AS max_pago_id,
+    {{ marca_actualizacion() }} AS fecha_actualizacion
+FROM {{ ref('fact_pagos') }} fp
+{% if is_incremental() %}
+WHERE DATE_TRUNC('month', fp.fecha_pago)::DATE IN (
+    {{ meses_con_datos_nuevos(ref('fact_pagos'), 'pago_id', 'fecha_pago', 'max_pago_id') }}
+)
+{% endif %}
+GROUP BY
+    fp.metodo_pago_id,
+    fp.nombre_metodo_pago,
+    DATE_TRUNC('month', fp.fecha_pago)::DATE
@@ -0,0 +1,37 @@
+{{ config(
+    materialized='incremental',
+    unique_key=['producto_id', 'mes_reseña'],
+    incremental_strategy='delete+insert',
+    post_hook="{{ crear_indice(['producto_id', 'mes_reseña']) }}"
+) }}
+
+-- Modelo de agregación de reseñas por producto y MES: cantidad, promedio y distribución de las
+-- calificaciones. suma_calificaciones permite promediar varios meses sin volver a los hechos.
+-- Responde "¿Cómo evoluciona la calificación de cada producto?".
+-- Incremental: solo se recalculan los meses con reseñas nuevas (reseña_id mayor a max_reseña_id).
+SELECT
+    fr.producto_id,
+    fr.nombre_producto_final AS nombre_producto, -- Usamos el nombre histórico del producto
+    fr.nombre_categoria_final AS nombre_categoria, -- Usamos el nombre histórico de la categoría
+    DATE_TRUNC('month', fr.fecha_reseña)::DATE AS mes_reseña,
+
+    COUNT(*) AS reseñas,
+    SUM(fr.calificacion) AS suma_calificaciones,
+    ROUND(AVG(fr.calificacion), 2) AS calificacion_promedio,
+    {%- for estrellas in range(1, 6) %}
+    COUNT(*) FILTER (WHERE fr.calificacion = {{ estrellas }}) AS calificaciones_{{ estrellas }},
+    {%- endfor %}
+    COUNT(DISTINCT fr.usuario_id) AS usuarios,
+    MAX(fr.reseña_id) AS max_reseña_id,
+    {{ marca_actualizacion() }} AS fecha_actualizacion
+FROM {{ ref('fact_reseñas') }} fr
+{% if is_incremental() %}
+WHERE DATE_TRUNC('month', fr.fecha_reseña)::DATE IN (
+    {{ meses_con_datos_nuevos(ref('fact_reseñas'), 'reseña_id', 'fecha_reseña', 'max_reseña_id') }}
+)
+{% endif %}
+GROUP BY
+    fr.producto_id,
+    fr.nombre_producto_final,
+    fr.nombre_categoria_final,
+    DATE_TRUNC('month', fr.fecha_reseña)::DATE
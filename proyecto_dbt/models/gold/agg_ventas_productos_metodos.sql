@@ -0,0 +1,72 @@
+{{ config(
+    materialized='incremental',
+    unique_key=['producto_id', 'mes_orden', 'metodo_pago_id'],
+    incremental_strategy='delete+insert',
+    post_hook="{{ crear_indice(['mes_orden', 'metodo_pago_id']) }}"
+) }}
+
+-- Modelo de agregación de ingresos por producto, MES y método de pago. Una orden pagada con
+-- varios métodos reparte el subtotal de cada línea en proporción a lo pagado con cada uno
+-- (ordenes_metodos_pago). Responde "¿Con qué métodos se pagan los ingresos de cada producto?".
+-- Incremental: se recalculan los meses con líneas de orden nuevas (detalle_id mayor a
+-- max_detalle_id) y los meses de las órdenes que recibieron pagos nuevos (orden_metodo_id mayor
+-- a max_orden_metodo_id), porque un pago puede registrarse después de procesar las líneas de su
+-- orden. Solo se leen los pagos de las órdenes de esos meses.
+WITH
+{% if is_incremental() %}
+meses_a_reprocesar AS (
+    {{ meses_con_datos_nuevos(ref('fact_ordenes'), 'detalle_id', 'fecha_orden', 'max_detalle_id') }}
+    UNION
+    SELECT DISTINCT DATE_TRUNC('month', fo.fecha_orden)::DATE AS mes_orden
+    FROM {{ ref('stg_ordenes_metodos_pago') }} omp
+    JOIN {{ ref('fact_ordenes') }} fo ON fo.orden_id = omp.orden_id
+    WHERE omp.orden_metodo_id > (SELECT COALESCE(MAX(max_orden_metodo_id), 0) FROM {{ this }})
+      AND fo.fecha_orden IS NOT NULL
+),
+{% endif %}
+lineas AS (
+    SELECT *
+    FROM {{ ref('fact_ordenes') }} fo
+    {% if is_incremental() %}
+    WHERE DATE_TRUNC('month', fo.fecha_orden)::DATE IN (SELECT mes_orden FROM meses_a_reprocesar)
+    {% endif %}
+),
+pagos_orden AS (
+    -- Parte de cada orden pagada con cada método
+    SELECT
+        omp.orden_id,
+        omp.metodo_pago_id,
+        MAX(omp.orden_metodo_id) AS max_orden_metodo_id,
+        SUM(omp.monto_pagado) / NULLIF(SUM(SUM(omp.monto_pagado)) OVER (PARTITION BY omp.orden_id), 0) AS proporcion
+    FROM {{ ref('stg_ordenes_metodos_pago') }} omp
+    WHERE omp.monto_pagado > 0
+    {% if is_incremental() %}
+      AND omp.orden_id IN (SELECT orden_id FROM lineas)
+    {% endif %}
+    GROUP BY
+        omp.orden_id,
+        omp.metodo_pago_id
+)
+SELECT
+    l.producto_id,
+    l.nombre_producto_final AS nombre_producto,
+    l.nombre_categoria_final AS nombre_categoria,
+    DATE_TRUNC('month', l.fecha_orden)::DATE AS mes_orden,
+    po.metodo_pago_id,
+    mp.nombre AS nombre_metodo_pago,
+
+    SUM(l.subtotal_linea * po.proporcion) AS ingresos_atribuidos,
+    SUM(l.cantidad * po.proporcion) AS unidades_atribuidas,
+    MAX(l.detalle_id) AS max_detalle_id,
+    MAX(po.max_orden_metodo_id) AS max_orden_metodo_id,
+    {{ marca_actualizacion() }} AS fecha_actualizacion
+FROM lineas l
+JOIN pagos_orden po ON l.orden_id = po.orden_id
+LEFT JOIN {{ ref('stg_metodos_pago') }} mp ON po.metodo_pago_id = mp.metodo_pago_id
+GROUP BY
+    l.producto_id,
+    l.nombre_producto_final,
+    l.nombre_categoria_final,
+    DATE_TRUNC('month', l.fecha_orden)::DATE,
+    po.metodo_pago_id,
+    mp.nombre
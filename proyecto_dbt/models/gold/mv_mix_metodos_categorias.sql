@@ -0,0 +1,33 @@
+{{ config(
+    materialized='materialized_view',
+    indexes=[{'columns': ['mes_orden', 'categoria', 'metodo_pago_id'], 'unique': True}],
+    post_hook="{{ registrar_version_datos() }}"
+) }}
+
+-- Vista materializada del mix de métodos de pago por mes y categoría ('__todas__' = todas las
+-- categorías, como en rpt_paneles_kpis): ingresos atribuidos a cada método y su participación
+-- en la celda. El dashboard filtra por (mes_orden, categoria) sobre el índice único, que también
+-- permite el REFRESH ... CONCURRENTLY.
+WITH celdas AS (
+    SELECT ventas.*, nombre_categoria AS categoria
+    FROM {{ ref('agg_ventas_productos_metodos') }} ventas
+    WHERE nombre_categoria IS NOT NULL
+    UNION ALL
+    SELECT ventas.*, '__todas__' AS categoria
+    FROM {{ ref('agg_ventas_productos_metodos') }} ventas
+)
+SELECT
+    mes_orden,
+    categoria,
+    metodo_pago_id,
+    MAX(nombre_metodo_pago) AS nombre_metodo_pago,
+    SUM(ingresos_atribuidos) AS ingresos_atribuidos,
+    SUM(unidades_atribuidas) AS unidades_atribuidas,
+    COUNT(DISTINCT producto_id) AS productos,
+    ROUND(SUM(ingresos_atribuidos) * 100.0
+          / NULLIF(SUM(SUM(ingresos_atribuidos)) OVER (PARTITION BY mes_orden, categoria), 0), 2) AS participacion_ingresos
+FROM celdas
+GROUP BY
+    mes_orden,
+    categoria,
+    metodo_pago_id
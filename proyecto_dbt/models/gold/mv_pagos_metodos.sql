@@ -0,0 +1,26 @@
+{{ config(
+    materialized='materialized_view',
+    indexes=[{'columns': ['mes_pago', 'metodo_pago_id'], 'unique': True}],
+    post_hook="{{ registrar_version_datos() }}"
+) }}
+
+-- Vista materializada del panel de pagos del dashboard: por mes y método, la participación en
+-- el monto del mes, la tasa de pagos fallidos y reembolsados y la latencia desde la orden.
+-- Se actualiza con REFRESH MATERIALIZED VIEW CONCURRENTLY (macro vistas_materializadas.sql),
+-- que necesita el índice único: el dashboard la sigue leyendo mientras se recalcula.
+SELECT
+    mes_pago,
+    metodo_pago_id,
+    nombre_metodo_pago,
+    pagos,
+    ordenes,
+    monto_total,
+    monto_pagado,
+    ROUND(monto_total * 100.0 / NULLIF(SUM(monto_total) OVER (PARTITION BY mes_pago), 0), 2) AS participacion_monto,
+    ROUND(pagos_aprobados * 100.0 / NULLIF(pagos, 0), 2) AS tasa_aprobacion,
+    ROUND(pagos_fallidos * 100.0 / NULLIF(pagos, 0), 2) AS tasa_fallo,
+    ROUND(pagos_reembolsados * 100.0 / NULLIF(pagos, 0), 2) AS tasa_reembolso,
+    ROUND(horas_hasta_pago_promedio::NUMERIC, 1) AS horas_hasta_pago_promedio,
+    ROUND(horas_hasta_pago_p50::NUMERIC, 1) AS horas_hasta_pago_p50,
+    ROUND(horas_hasta_pago_p90::NUMERIC, 1) AS horas_hasta_pago_p90
+FROM {{ ref('agg_pagos_metodos') }}
@@ -0,0 +1,31 @@
+{{ config(
+    materialized='materialized_view',
+    indexes=[{'columns': ['mes_reseña', 'producto_id', 'nombre_producto', 'nombre_categoria'], 'unique': True}],
+    post_hook="{{ registrar_version_datos() }}"
+) }}
+
+-- Vista materializada del panel de calificaciones: por producto y mes, el promedio del mes, el
+-- promedio acumulado hasta ese mes y la variación contra el mes anterior con reseñas. El
+-- dashboard filtra por mes (y categoría) sobre el índice único, que empieza por mes_reseña y
+-- también permite el REFRESH ... CONCURRENTLY.
+SELECT
+    mes_reseña,
+    producto_id,
+    nombre_producto,
+    nombre_categoria,
+    reseñas,
+    calificacion_promedio,
+    {%- for estrellas in range(1, 6) %}
+    calificaciones_{{ estrellas }},
+    {%- endfor %}
+    ROUND(SUM(suma_calificaciones) OVER historial * 1.0 / SUM(reseñas) OVER historial, 2) AS calificacion_acumulada,
+    SUM(reseñas) OVER historial AS reseñas_acumuladas,
+    calificacion_promedio - LAG(calificacion_promedio) OVER (
+        PARTITION BY producto_id ORDER BY mes_reseña, nombre_producto, nombre_categoria
+    ) AS variacion_calificacion
+FROM {{ ref('agg_reseñas_productos') }}
+WINDOW historial AS (
+    PARTITION BY producto_id
+    ORDER BY mes_reseña, nombre_producto, nombre_categoria
+    ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+)
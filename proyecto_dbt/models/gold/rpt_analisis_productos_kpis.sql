@@ -1,62 +1,117 @@
 {{ config(
-    materialized='table'
+    materialized='incremental',
+    unique_key=['mes_orden'],
+    incremental_strategy='delete+insert',
+    post_hook=[
+        "{{ crear_indice(['mes_orden', 'nombre_categoria']) }}",
+        "{{ registrar_version_datos() }}"
+    ]
 ) }}
 
 -- Modelo combinado que une las métricas de ingresos, crecimiento e intención de compra por producto.
 -- Ideal para análisis cruzados de KPIs y para dashboards de alto nivel.
-WITH base_productos_mensual AS (
-    -- Obtener una lista única de productos y meses con sus nombres históricos
-    -- de todos los modelos de agregación para asegurar que se incluyan todos los productos que aparecen en cualquier métrica.
+-- Cada modelo agg_* se lee una sola vez y sus filas se apilan con la métrica que aporta cada uno.
+-- Como en la versión anterior, las métricas se combinan por (producto_id, mes_orden): cada nombre
+-- histórico del producto en el mes (fila del reporte) recibe las métricas de todas sus variantes.
+-- Incremental: los rankings son por mes, así que se reemplazan completos solo los meses que
+-- alguno de los modelos agg_* recalculó desde la última actualización de este reporte.
+WITH
+{% if is_incremental() %}
+meses_a_reprocesar AS (
+    {{ meses_actualizados(['agg_ingresos_productos', 'agg_crecimiento_ventas_productos', 'agg_intencion_compra_productos']) }}
+),
+{% endif %}
+metricas_por_modelo AS (
+    -- Las filas de cada modelo de agregación con la métrica que aporta (NULL como 0, igual que
+    -- en el reporte); las métricas de los otros modelos quedan en NULL
     SELECT
+        'ingresos' AS fuente,
         producto_id,
         nombre_producto,
         nombre_categoria,
-        mes_orden
+        mes_orden,
+        COALESCE(ingresos_totales, 0) AS ingresos_totales,
+        NULL::NUMERIC AS crecimiento_porcentual,
+        NULL::BIGINT AS veces_agregado_al_carrito,
+        NULL::BIGINT AS cantidad_total_agregada_carrito
     FROM {{ ref('agg_ingresos_productos') }}
+    {% if is_incremental() %}
+    WHERE mes_orden::DATE IN (SELECT mes_orden FROM meses_a_reprocesar)
+    {% endif %}
     UNION ALL
     SELECT
+        'crecimiento',
         producto_id,
         nombre_producto,
         nombre_categoria,
-        mes_orden
+        mes_orden,
+        NULL::NUMERIC,
+        COALESCE(crecimiento_porcentual, 0),
+        NULL::BIGINT,
+        NULL::BIGINT
     FROM {{ ref('agg_crecimiento_ventas_productos') }}
+    {% if is_incremental() %}
+    WHERE mes_orden::DATE IN (SELECT mes_orden FROM meses_a_reprocesar)
+    {% endif %}
     UNION ALL
     SELECT
+        'intencion',
         producto_id,
         nombre_producto,
         nombre_categoria,
-        mes_orden
+        mes_orden,
+        NULL::NUMERIC,
+        NULL::NUMERIC,
+        COALESCE(veces_agregado_al_carrito, 0),
+        COALESCE(cantidad_total_agregada_carrito, 0)
     FROM {{ ref('agg_intencion_compra_productos') }}
-    GROUP BY 1,2,3,4 -- Asegurar unicidad de producto_id, nombre_producto, nombre_categoria, mes_orden
+    {% if is_incremental() %}
+    WHERE mes_orden::DATE IN (SELECT mes_orden FROM meses_a_reprocesar)
+    {% endif %}
+),
+variantes AS (
+    -- Una fila por producto, nombres históricos y mes que aparezca en alguno de los modelos
+    SELECT DISTINCT
+        producto_id,
+        nombre_producto,
+        nombre_categoria,
+        mes_orden
+    FROM metricas_por_modelo
+),
+metricas_distintas AS (
+    -- Valores distintos de cada métrica por producto y mes, sin los nombres: al unirlos a las
+    -- variantes cada combinación ya es única y no hace falta deduplicar el resultado completo
+    SELECT DISTINCT
+        fuente,
+        producto_id,
+        mes_orden,
+        ingresos_totales,
+        crecimiento_porcentual,
+        veces_agregado_al_carrito,
+        cantidad_total_agregada_carrito
+    FROM metricas_por_modelo
 ),
--- NUEVA CTE: Asegura la unicidad de la combinación de todas las métricas antes del SELECT final
-final_unique_data AS (
+productos_mensual AS (
+    -- Las métricas se unen solo por (producto_id, mes_orden), como en la versión anterior; si un
+    -- modelo tiene valores distintos para el producto en el mes, cada combinación queda como una fila
     SELECT
-        bpm.producto_id,
-        bpm.nombre_producto,
-        bpm.nombre_categoria,
-        bpm.mes_orden,
-        COALESCE(ingresos_productos.ingresos_totales, 0) AS ingresos_totales,
-        COALESCE(crecimiento_productos.crecimiento_porcentual, 0) AS crecimiento_porcentual_ventas,
-        COALESCE(intencion_compra.veces_agregado_al_carrito, 0) AS veces_agregado_al_carrito,
-        COALESCE(intencion_compra.cantidad_total_agregada_carrito, 0) AS cantidad_total_agregada_carrito,
-        RANK() OVER (PARTITION BY bpm.mes_orden ORDER BY COALESCE(ingresos_productos.ingresos_totales, 0) DESC) AS rank_ingresos_totales,
-        RANK() OVER (PARTITION BY bpm.mes_orden ORDER BY COALESCE(crecimiento_productos.crecimiento_porcentual, 0) DESC) AS rank_crecimiento_ventas,
-        RANK() OVER (PARTITION BY bpm.mes_orden ORDER BY COALESCE(intencion_compra.veces_agregado_al_carrito, 0) DESC) AS rank_veces_agregado_carrito
-    FROM base_productos_mensual bpm
-    LEFT JOIN {{ ref('agg_crecimiento_ventas_productos') }} crecimiento_productos
-        ON bpm.producto_id = crecimiento_productos.producto_id
-        AND bpm.mes_orden = crecimiento_productos.mes_orden
-    LEFT JOIN {{ ref('agg_ingresos_productos') }} ingresos_productos
-        ON bpm.producto_id = ingresos_productos.producto_id
-        AND bpm.mes_orden = ingresos_productos.mes_orden
-    LEFT JOIN {{ ref('agg_intencion_compra_productos') }} intencion_compra
-        ON bpm.producto_id = intencion_compra.producto_id
-        AND bpm.mes_orden = intencion_compra.mes_orden
+        v.producto_id,
+        v.nombre_producto,
+        v.nombre_categoria,
+        v.mes_orden,
+        COALESCE(i.ingresos_totales, 0) AS ingresos_totales,
+        COALESCE(c.crecimiento_porcentual, 0) AS crecimiento_porcentual_ventas,
+        COALESCE(t.veces_agregado_al_carrito, 0) AS veces_agregado_al_carrito,
+        COALESCE(t.cantidad_total_agregada_carrito, 0) AS cantidad_total_agregada_carrito
+    FROM variantes v
+    LEFT JOIN metricas_distintas i
+        ON i.fuente = 'ingresos' AND i.producto_id = v.producto_id AND i.mes_orden = v.mes_orden
+    LEFT JOIN metricas_distintas c
+        ON c.fuente = 'crecimiento' AND c.producto_id = v.producto_id AND c.mes_orden = v.mes_orden
+    LEFT JOIN metricas_distintas t
+        ON t.fuente = 'intencion' AND t.producto_id = v.producto_id AND t.mes_orden = v.mes_orden
 )
-SELECT *
-FROM final_unique_data
-GROUP BY
+SELECT
     producto_id,
     nombre_producto,
     nombre_categoria,
@@ -65,11 +120,13 @@ GROUP BY
     crecimiento_porcentual_ventas,
     veces_agregado_al_carrito,
     cantidad_total_agregada_carrito,
-    rank_ingresos_totales,
-    rank_crecimiento_ventas,
-    rank_veces_agregado_carrito
+    RANK() OVER (PARTITION BY mes_orden ORDER BY ingresos_totales DESC) AS rank_ingresos_totales,
+    RANK() OVER (PARTITION BY mes_orden ORDER BY crecimiento_porcentual_ventas DESC) AS rank_crecimiento_ventas,
+    RANK() OVER (PARTITION BY mes_orden ORDER BY veces_agregado_al_carrito DESC) AS rank_veces_agregado_carrito,
+    {{ marca_actualizacion() }} AS fecha_actualizacion
+FROM productos_mensual
 ORDER BY
     mes_orden DESC,
     ingresos_totales DESC,
     crecimiento_porcentual_ventas DESC,
-    veces_agregado_al_carrito DESC
\ No newline at end of file
+    veces_agregado_al_carrito DESC
@@ -0,0 +1,114 @@
+{{ config(
+    materialized='incremental',
+    unique_key=['mes_orden'],
+    incremental_strategy='delete+insert',
+    post_hook=[
+        "{{ crear_indice(['mes_orden', 'categoria', 'panel']) }}",
+        "{{ registrar_version_datos() }}"
+    ]
+) }}
+
+-- Cubo de los paneles del dashboard: para cada (mes, categoría) guarda las listas top-N ya
+-- ordenadas de cada panel, con rankings calculados dentro de la categoría. La celda
+-- '__todas__' corresponde a "Todas las Categorías" y sus rankings son los del mes completo.
+-- El dashboard solo filtra por (mes_orden, categoria, panel) y ordena por posicion.
+-- Incremental: se reemplazan los meses que el reporte recalculó desde la última corrida.
+
+-- (panel, columna de posición, cantidad de productos)
+{% set paneles = [
+    ('ingresos', 'posicion_ingresos', 20),
+    ('crecimiento', 'posicion_crecimiento', 10),
+    ('intencion', 'posicion_intencion', 20),
+    ('estrella', 'posicion_estrella', 10),
+    ('potencial', 'posicion_potencial', 10)
+] %}
+
+WITH
+{% if is_incremental() %}
+meses_a_reprocesar AS (
+    {{ meses_actualizados(['rpt_analisis_productos_kpis']) }}
+),
+{% endif %}
+kpis AS (
+    SELECT
+        producto_id,
+        nombre_producto,
+        nombre_categoria,
+        mes_orden::DATE AS mes_orden,
+        ingresos_totales,
+        crecimiento_porcentual_ventas,
+        veces_agregado_al_carrito,
+        cantidad_total_agregada_carrito
+    FROM {{ ref('rpt_analisis_productos_kpis') }}
+    {% if is_incremental() %}
+    WHERE mes_orden::DATE IN (SELECT mes_orden FROM meses_a_reprocesar)
+    {% endif %}
+),
+celdas AS (
+    -- Cada producto cuenta en la celda de su categoría y en la de todas las categorías
+    SELECT kpis.*, nombre_categoria AS categoria
+    FROM kpis
+    WHERE nombre_categoria IS NOT NULL
+    UNION ALL
+    SELECT kpis.*, '__todas__' AS categoria
+    FROM kpis
+),
+rankings_celda AS (
+    SELECT
+        celdas.*,
+        RANK() OVER (PARTITION BY mes_orden, categoria ORDER BY ingresos_totales DESC) AS rank_ingresos_totales,
+        RANK() OVER (PARTITION BY mes_orden, categoria ORDER BY crecimiento_porcentual_ventas DESC) AS rank_crecimiento_ventas,
+        RANK() OVER (PARTITION BY mes_orden, categoria ORDER BY veces_agregado_al_carrito DESC) AS rank_veces_agregado_carrito
+    FROM celdas
+),
+posiciones AS (
+    -- Orden de cada panel dentro de la celda; producto_id desempata para que la lista sea estable.
+    -- Los productos sin crecimiento quedan al final de los paneles que lo usan y se descartan abajo.
+    SELECT
+        rankings_celda.*,
+        ROW_NUMBER() OVER (
+            PARTITION BY mes_orden, categoria
+            ORDER BY ingresos_totales DESC, producto_id
+        ) AS posicion_ingresos,
+        ROW_NUMBER() OVER (
+            PARTITION BY mes_orden, categoria
+            ORDER BY crecimiento_porcentual_ventas DESC NULLS LAST, producto_id
+        ) AS posicion_crecimiento,
+        ROW_NUMBER() OVER (
+            PARTITION BY mes_orden, categoria
+            ORDER BY cantidad_total_agregada_carrito DESC, producto_id
+        ) AS posicion_intencion,
+        ROW_NUMBER() OVER (
+            PARTITION BY mes_orden, categoria
+            ORDER BY crecimiento_porcentual_ventas IS NULL, rank_crecimiento_ventas, rank_ingresos_totales, producto_id
+        ) AS posicion_estrella,
+        ROW_NUMBER() OVER (
+            PARTITION BY mes_orden, categoria
+            ORDER BY crecimiento_porcentual_ventas IS NULL, rank_crecimiento_ventas, rank_veces_agregado_carrito, producto_id
+        ) AS posicion_potencial
+    FROM rankings_celda
+)
+{% for panel, posicion, limite in paneles %}
+SELECT
+    mes_orden,
+    categoria,
+    '{{ panel }}' AS panel,
+    {{ posicion }} AS posicion,
+    producto_id,
+    nombre_producto,
+    nombre_categoria,
+    ingresos_totales,
+    crecimiento_porcentual_ventas,
+    veces_agregado_al_carrito,
+    cantidad_total_agregada_carrito,
+    rank_ingresos_totales,
+    rank_crecimiento_ventas,
+    rank_veces_agregado_carrito,
+    {{ marca_actualizacion() }} AS fecha_actualizacion
+FROM posiciones
+WHERE {{ posicion }} <= {{ limite }}
+{% if panel != 'ingresos' and panel != 'intencion' %}
+  AND crecimiento_porcentual_ventas IS NOT NULL
+{% endif %}
+{% if not loop.last %}UNION ALL{% endif %}
+{% endfor %}
@@ -0,0 +1,96 @@
+{{ config(
+    materialized='table',
+    post_hook="{{ crear_indice(['producto_id', 'vigente_desde', 'vigente_hasta']) }}"
+) }}
+
+-- Versiones de cada producto con el nombre de producto y de categoría que tenían en cada tramo
+-- de días [vigente_desde, vigente_hasta). Combina los snapshots de productos y categorías y ya
+-- resuelve el respaldo con los nombres actuales, así los hechos hacen una sola búsqueda por rango:
+--     v.producto_id = x.producto_id AND v.vigente_desde <= fecha AND fecha < v.vigente_hasta
+-- Los tramos de un producto no se superponen: el día de un cambio vale la versión nueva (y si
+-- hubo varios cambios ese día, la última), en lugar de unir la fila con las dos versiones.
+
+WITH
+versiones_producto AS (
+    -- Tramos por día de cada versión del snapshot; las versiones que duraron menos de un día
+    -- quedan vacías (desde = hasta) y se descartan
+    SELECT
+        producto_id,
+        nombre,
+        categoria_id,
+        dbt_valid_from::DATE AS vigente_desde,
+        COALESCE(dbt_valid_to::DATE, 'infinity'::DATE) AS vigente_hasta
+    FROM {{ source('dbt_snapshots', 'productos_historico') }}
+    UNION ALL
+    -- Antes de la primera versión registrada no hay historial: se usan los nombres actuales
+    SELECT
+        producto_id,
+        NULL,
+        NULL,
+        '-infinity'::DATE,
+        MIN(dbt_valid_from)::DATE
+    FROM {{ source('dbt_snapshots', 'productos_historico') }}
+    GROUP BY producto_id
+),
+versiones_categoria AS (
+    SELECT
+        categoria_id,
+        nombre,
+        dbt_valid_from::DATE AS vigente_desde,
+        COALESCE(dbt_valid_to::DATE, 'infinity'::DATE) AS vigente_hasta
+    FROM {{ source('dbt_snapshots', 'categorias_historico') }}
+    UNION ALL
+    SELECT
+        categoria_id,
+        NULL,
+        '-infinity'::DATE,
+        MIN(dbt_valid_from)::DATE
+    FROM {{ source('dbt_snapshots', 'categorias_historico') }}
+    GROUP BY categoria_id
+),
+tramos AS (
+    -- Cada versión de producto se parte según las versiones de su categoría vigentes en ese lapso
+    SELECT
+        vp.producto_id,
+        vp.nombre AS nombre_producto_historico,
+        vc.nombre AS nombre_categoria_historico,
+        GREATEST(vp.vigente_desde, COALESCE(vc.vigente_desde, vp.vigente_desde)) AS vigente_desde,
+        LEAST(vp.vigente_hasta, COALESCE(vc.vigente_hasta, vp.vigente_hasta)) AS vigente_hasta
+    FROM versiones_producto vp
+    LEFT JOIN versiones_categoria vc
+        ON vp.categoria_id = vc.categoria_id
+        AND vc.vigente_desde < vp.vigente_hasta
+        AND vc.vigente_hasta > vp.vigente_desde
+    WHERE vp.vigente_desde < vp.vigente_hasta
+),
+productos_sin_historial AS (
+    -- Productos que todavía no están en el snapshot: siempre con sus nombres actuales
+    SELECT
+        dp.producto_id,
+        NULL AS nombre_producto_historico,
+        NULL AS nombre_categoria_historico,
+        '-infinity'::DATE AS vigente_desde,
+        'infinity'::DATE AS vigente_hasta
+    FROM {{ ref('dim_productos') }} dp
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM {{ source('dbt_snapshots', 'productos_historico') }} ps
+        WHERE ps.producto_id = dp.producto_id
+    )
+)
+SELECT
+    t.producto_id,
+    t.vigente_desde,
+    t.vigente_hasta,
+    -- Mismo respaldo que usaban los hechos: nombre histórico si existe, si no el actual
+    COALESCE(t.nombre_producto_historico, dp_actual.nombre_producto) AS nombre_producto_final,
+    COALESCE(t.nombre_categoria_historico, dc_actual.nombre_categoria) AS nombre_categoria_final
+FROM (
+    SELECT * FROM tramos WHERE vigente_desde < vigente_hasta
+    UNION ALL
+    SELECT * FROM productos_sin_historial
+) t
+LEFT JOIN {{ ref('dim_productos') }} AS dp_actual
+    ON t.producto_id = dp_actual.producto_id
+LEFT JOIN {{ ref('dim_categorias') }} AS dc_actual
+    ON dp_actual.categoria_id = dc_actual.categoria_id
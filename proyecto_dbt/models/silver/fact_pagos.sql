@@ -0,0 +1,38 @@
+{{ config(
+    materialized='incremental',
+    unique_key='pago_id',
+    incremental_strategy='delete+insert',
+    post_hook=[
+        "{{ crear_indice(['pago_id']) }}",
+        "{{ crear_indice(['fecha_pago']) }}"
+    ]
+) }}
+
+-- Tabla de hechos con cada movimiento del historial de pagos, su método y la demora desde la
+-- orden. A diferencia de los demás hechos de esta capa se materializa como tabla incremental:
+-- historial_pagos es de las tablas más grandes y la leen los agregados de pagos en cada corrida.
+-- Incremental: solo se agregan los pagos con pago_id mayor al último cargado; los cambios sobre
+-- pagos ya cargados se recogen con --full-refresh.
+SELECT
+    hp.pago_id,
+    hp.orden_id,
+    o.usuario_id,
+    hp.metodo_pago_id,
+    mp.nombre AS nombre_metodo_pago,
+    hp.monto,
+    TRIM(hp.estado_pago) AS estado_pago,
+    hp.fecha_pago,
+    o.fecha_orden,
+    -- Horas entre la orden y el movimiento de pago
+    EXTRACT(EPOCH FROM (hp.fecha_pago - o.fecha_orden)) / 3600.0 AS horas_hasta_pago
+FROM {{ ref('stg_historial_pagos') }} AS hp
+JOIN {{ ref('stg_ordenes') }} AS o ON hp.orden_id = o.orden_id
+LEFT JOIN {{ ref('stg_metodos_pago') }} AS mp ON hp.metodo_pago_id = mp.metodo_pago_id
+
+WHERE hp.pago_id IS NOT NULL
+  AND hp.metodo_pago_id IS NOT NULL
+  AND hp.fecha_pago IS NOT NULL
+  AND hp.monto >= 0
+{% if is_incremental() %}
+  AND hp.pago_id > (SELECT COALESCE(MAX(pago_id), 0) FROM {{ this }})
+{% endif %}
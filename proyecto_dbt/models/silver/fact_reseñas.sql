@@ -0,0 +1,36 @@
+{{ config(
+    materialized='incremental',
+    unique_key='reseña_id',
+    incremental_strategy='delete+insert',
+    post_hook=[
+        "{{ crear_indice(['reseña_id']) }}",
+        "{{ crear_indice(['fecha_reseña']) }}"
+    ]
+) }}
+
+-- Tabla de hechos con cada reseña de producto y los nombres de producto y categoría vigentes el
+-- día de la reseña. Tabla incremental, como fact_pagos: reseñas_productos es de las tablas más
+-- grandes. Solo se agregan las reseñas con reseña_id mayor a la última cargada.
+SELECT
+    r.reseña_id,
+    r.usuario_id,
+    r.producto_id,
+    r.calificacion,
+    r.fecha::DATE AS fecha_reseña,
+    -- Nombres vigentes el día de la reseña (históricos o, si no hay historial, los actuales)
+    v.nombre_producto_final,
+    v.nombre_categoria_final
+FROM {{ ref('stg_reseñas_productos') }} AS r
+
+LEFT JOIN {{ ref('dim_versiones_productos') }} AS v
+    ON r.producto_id = v.producto_id
+    AND v.vigente_desde <= r.fecha::DATE
+    AND r.fecha::DATE < v.vigente_hasta
+
+WHERE r.reseña_id IS NOT NULL
+  AND r.producto_id IS NOT NULL
+  AND r.fecha IS NOT NULL
+  AND r.calificacion BETWEEN 1 AND 5
+{% if is_incremental() %}
+  AND r.reseña_id > (SELECT COALESCE(MAX(reseña_id), 0) FROM {{ this }})
+{% endif %}
@@ -5,15 +5,15 @@
     config(
         target_schema='dbt_snapshots',
         unique_key='categoria_id',
-        strategy='check',
-        check_cols=['nombre']
+        strategy=var('estrategia_snapshots', 'timestamp'),
+        updated_at='updated_at',
+        check_cols=['nombre'],
+        post_hook="{{ crear_indice(['categoria_id', 'dbt_valid_to']) }}"
     )
 }}
 
--- Selecciona los datos base de tu tabla staging de categorías
-SELECT
-    categoria_id,
-    nombre
-FROM {{ ref('stg_categorias') }}
+-- Selecciona los datos base de tu tabla staging de categorías; los cambios se detectan por el
+-- hash de la fila que calcula stg_categorias (ver macros/snapshots.sql)
+{{ seleccionar_con_updated_at(ref('stg_categorias'), 'categoria_id', ['categoria_id', 'nombre']) }}
 
-{% endsnapshot %}
\ No newline at end of file
+{% endsnapshot %}
@@ -5,18 +5,16 @@
     config(
         target_schema='dbt_snapshots',
         unique_key='producto_id',
-        strategy='check',
-        check_cols=['nombre', 'descripcion', 'precio', 'stock', 'categoria_id']
+        strategy=var('estrategia_snapshots', 'timestamp'),
+        updated_at='updated_at',
+        check_cols=['nombre', 'descripcion', 'precio', 'stock', 'categoria_id'],
+        post_hook="{{ crear_indice(['producto_id', 'dbt_valid_to']) }}"
     )
 }}
 
-SELECT
-    producto_id,
-    nombre,
-    descripcion,
-    precio,
-    stock,
-    categoria_id
-FROM {{ ref('stg_productos') }}
+-- Los cambios se detectan por el hash de la fila que calcula stg_productos (ver macros/snapshots.sql).
+-- check_cols solo se usa con --vars '{estrategia_snapshots: check}', para comparar en el benchmark.
+{{ seleccionar_con_updated_at(ref('stg_productos'), 'producto_id',
+                              ['producto_id', 'nombre', 'descripcion', 'precio', 'stock', 'categoria_id']) }}
 
-{% endsnapshot %}
\ No newline at end of file
+{% endsnapshot %}
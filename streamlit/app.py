@@ -1,76 +1,84 @@
 import streamlit as st
-import pandas as pd
-import pg8000.dbapi
 import os
+import sys
+import time
 from dotenv import load_dotenv
 import altair as alt
+import pandas as pd
 
 # Cargar variables de entorno
 load_dotenv()
 
-# Obtener las credenciales de la base de datos
-DB_HOST = os.getenv("DB_HOST")
-DB_NAME = os.getenv("DB_NAME")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_PORT = os.getenv("DB_PORT")
+# El engine con pool de conexiones es el mismo que usan los scripts de la carpeta orm/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'orm'))
+
+# Origen de los datos: 'postgres' consulta la base; 'archivos' lee la exportación Arrow/Parquet
+# de la capa gold (orm/exportar_gold.py) y deja a la base fuera del camino de lectura.
+FUENTE_DATOS = os.getenv("DASHBOARD_FUENTE", "postgres")
+if FUENTE_DATOS == "archivos":
+    import consultas_archivos as consultas
+else:
+    import consultas
+
+from ejecutor_consultas import ejecutar_consultas
+from graficos import proyectar, reducir_dispersion, dibujar, COLUMNA_PRODUCTOS
+from instrumentacion import Diagnostico, medir, usar_diagnostico
+
+# Panel de diagnóstico en la barra lateral (tiempos de consulta, transformación y dibujo)
+DIAGNOSTICO_DISPONIBLE = os.getenv("DASHBOARD_DIAGNOSTICO", "false").lower() in ("1", "true", "si", "sí")
 
 # --- Configuración de la Página Streamlit ---
 st.set_page_config(layout="wide", page_title="Análisis de KPIs de Productos 📈")
 
 # --- Funciones de Carga de Datos ---
-@st.cache_data(ttl=600) # Cachea los datos por 10 minutos (600 segundos)
-def get_data_from_db():
+# Cada función consulta solo el mes y la categoría seleccionados; Streamlit cachea
+# el resultado por combinación de argumentos (mes, categoría, versión de los datos).
+# La versión la escribe dbt al reconstruir la capa gold: mientras no cambia, los paneles
+# salen de la caché sin tocar la base, y después de una corrida se leen de nuevo.
+TODAS_LAS_CATEGORIAS = 'Todas las Categorías'
+
+# Cada cuánto se vuelve a consultar la versión (una fila) y cuánto se conservan los datos
+SEGUNDOS_SONDEO_VERSION = int(os.getenv("DASHBOARD_SONDEO_VERSION", "30"))
+SEGUNDOS_CACHE_DATOS = 24 * 60 * 60
+
+@st.cache_data(ttl=SEGUNDOS_SONDEO_VERSION, show_spinner=False)
+def get_version_datos():
     """
-    Establece conexión con la base de datos PostgreSQL y carga
-    los datos del modelo rpt_analisis_productos_kpis.
+    Versión de los datos publicada por dbt. Si todavía no hay ninguna (o no se pudo
+    consultar), se usa el tramo de 10 minutos actual, como la caché anterior por tiempo.
     """
-    conn = None
     try:
-        with st.spinner("Cargando datos del almacén de datos..."): # Agrega un spinner de carga
-            conn = pg8000.dbapi.connect(
-                host=DB_HOST,
-                database=DB_NAME,
-                user=DB_USER,
-                password=DB_PASSWORD,
-                port=int(DB_PORT)
-            )
+        version = consultas.version_datos()
+    except Exception:
+        version = None
+    return version or f"tramo-{int(time.time() // 600)}"
 
-            query = """
-            SELECT
-                producto_id,
-                nombre_producto,
-                nombre_categoria,
-                mes_orden,
-                ingresos_totales,
-                crecimiento_porcentual_ventas,
-                veces_agregado_al_carrito,
-                cantidad_total_agregada_carrito,
-                rank_ingresos_totales,
-                rank_crecimiento_ventas,
-                rank_veces_agregado_carrito
-            FROM
-                rpt_analisis_productos_kpis
-            ORDER BY
-                mes_orden DESC, ingresos_totales DESC;
-            """
-            df = pd.read_sql_query(query, conn)
-            
-            # Asegurarse de que 'mes_orden' sea de tipo datetime para facilitar filtros
-            df['mes_orden'] = pd.to_datetime(df['mes_orden'])
-            
-            # Asegurarse de que 'crecimiento_porcentual_ventas' sea numérico.
-            # Los errores pueden aparecer como NaN o strings si hay problemas en la DB.
-            df['crecimiento_porcentual_ventas'] = pd.to_numeric(df['crecimiento_porcentual_ventas'], errors='coerce')
-            
-            return df
-    except Exception as e:
-        st.error(f"⚠️ Error al conectar o consultar la base de datos: {e}")
-        st.warning("No se pudieron cargar los datos del modelo `rpt_analisis_productos_kpis`. Asegúrate de que dbt se ejecutó correctamente y las credenciales son válidas.")
-        return pd.DataFrame()
-    finally:
-        if conn:
-            conn.close()
+@st.cache_data(ttl=SEGUNDOS_CACHE_DATOS, max_entries=8)
+def get_filtros_from_db(version):
+    """
+    Carga los meses y categorías disponibles en el modelo rpt_analisis_productos_kpis
+    para armar los filtros de la barra lateral.
+    """
+    with st.spinner("Cargando datos del almacén de datos..."): # Agrega un spinner de carga
+        return consultas.obtener_meses(), consultas.obtener_categorias()
+
+# Consultas de los paneles, todas independientes entre sí: se lanzan juntas en paralelo
+PANELES = [
+    'datos_dispersion',
+    'top_ingresos',
+    'top_crecimiento',
+    'top_intencion',
+    'productos_estrella',
+    'productos_potencial',
+    'pagos_metodos',
+    'mix_metodos',
+    'mejor_calificados'
+]
+
+@st.cache_data(ttl=SEGUNDOS_CACHE_DATOS, max_entries=512, show_spinner=False)
+def get_panel_from_db(panel, mes, categoria, version):
+    """Ejecuta la consulta de un panel (función de consultas.py) para el mes y la categoría dados."""
+    return getattr(consultas, panel)(mes, categoria)
 
 # --- Título Principal y Descripción ---
 st.title("📊 Análisis Estratégico de KPIs de Productos")
@@ -82,19 +90,29 @@ Bienvenido al panel de control de rendimiento de productos. Aquí podrás explor
 col_reload, _ = st.columns([0.2, 0.8])
 with col_reload:
     if st.button('🔄 Recargar Datos del Dashboard', help="Haz clic para actualizar los datos desde la base de datos."):
-        st.cache_data.clear() # Limpia la caché de la función get_data_from_db
+        get_version_datos.clear() # Solo vuelve a consultar la versión: si dbt corrió, se leen los datos nuevos
         st.rerun() # Fuerza a Streamlit a volver a ejecutar la aplicación desde cero
 
 # --- Cargar Datos ---
-df = get_data_from_db()
-
-if not df.empty:
+# Todo lo que se mide en esta corrida (también desde los hilos de las consultas) va a este diagnóstico
+diagnostico = Diagnostico()
+usar_diagnostico(diagnostico)
+mostrar_diagnostico = DIAGNOSTICO_DISPONIBLE and st.sidebar.checkbox("🩺 Mostrar diagnóstico de rendimiento")
+
+version_datos = get_version_datos()
+try:
+    available_months, available_categories = get_filtros_from_db(version_datos)
+except Exception as e:
+    # Los errores no se cachean: el próximo intento vuelve a consultar la base
+    st.error(f"⚠️ Error al conectar o consultar la base de datos: {e}")
+    st.warning("No se pudieron cargar los datos del modelo `rpt_analisis_productos_kpis`. Asegúrate de que dbt se ejecutó correctamente y las credenciales son válidas.")
+    available_months, available_categories = [], []
+
+if available_months:
     # --- Sidebar para Filtros ---
     st.sidebar.header("🔍 Filtros de Análisis")
 
-    # Filtro por Mes
-    available_months = sorted(df['mes_orden'].unique(), reverse=True)
-    
+    # Filtro por Mes (ya vienen ordenados del más reciente al más antiguo)
     # Establecer el mes más reciente como valor por defecto
     default_month_index = 0
     if len(available_months) > 0:
@@ -108,20 +126,44 @@ if not df.empty:
     )
 
     # Filtro por Categoría
-    available_categories = ['Todas las Categorías'] + sorted(df['nombre_categoria'].unique().tolist())
     selected_category = st.sidebar.selectbox(
         "Filtrar por Categoría de Producto",
-        available_categories
+        [TODAS_LAS_CATEGORIAS] + available_categories
     )
-
-    # Filtrar el DataFrame por el mes y categoría seleccionados
-    df_filtered_by_month = df[df['mes_orden'] == selected_month].copy()
-    if selected_category != 'Todas las Categorías':
-        df_filtered_by_month = df_filtered_by_month[df_filtered_by_month['nombre_categoria'] == selected_category].copy()
-
-
-    # Asegurarse de que el DataFrame filtrado no esté vacío antes de continuar
-    if df_filtered_by_month.empty:
+    categoria_filtro = None if selected_category == TODAS_LAS_CATEGORIAS else selected_category
+
+    # Todas las consultas de los paneles a la vez; las que fallan o vencen se informan en su
+    # propio panel y el resto se muestra igual
+    def consultar_panel(panel):
+        # Incluye los aciertos de caché: una consulta de ~0 ms sin sentencias salió de la caché
+        with medir('consulta', panel):
+            return get_panel_from_db(panel, selected_month, categoria_filtro, version_datos)
+
+    diagnostico.hito('filtros', etapa='preparación')
+    with st.spinner("Consultando los paneles..."):
+        paneles, errores_paneles = ejecutar_consultas({
+            panel: (lambda panel=panel: consultar_panel(panel)) for panel in PANELES
+        })
+    diagnostico.hito('todos los paneles (en paralelo)', etapa='espera')
+    if not paneles:
+        st.error(f"⚠️ Error al consultar la base de datos: {next(iter(errores_paneles.values()))}")
+        st.stop()
+
+    def mostrar_error_panel(panel):
+        st.warning(f"⚠️ No se pudo cargar este panel: {errores_paneles[panel]}")
+
+    df_filtered_by_month = paneles.get('datos_dispersion')
+    df_top_20_ingresos = paneles.get('top_ingresos')
+    df_crecimiento = paneles.get('top_crecimiento')
+    df_top_20_intencion = paneles.get('top_intencion')
+    df_high_growth_high_revenue = paneles.get('productos_estrella')
+    df_high_growth_high_intencion = paneles.get('productos_potencial')
+    df_pagos_metodos = paneles.get('pagos_metodos')
+    df_mix_metodos = paneles.get('mix_metodos')
+    df_mejor_calificados = paneles.get('mejor_calificados')
+
+    # Asegurarse de que haya datos antes de continuar
+    if all(df.empty for df in paneles.values()):
         st.info(f"No hay datos disponibles para el mes de **{selected_month.strftime('%B %Y')}** y categoría **{selected_category}**. Por favor, ajusta tus filtros.")
     else:
         st.markdown(f"### Datos para **{selected_month.strftime('%B %Y')}** {f'en la categoría **{selected_category}**' if selected_category != 'Todas las Categorías' else ''}")
@@ -131,24 +173,30 @@ if not df.empty:
         st.header("📋 Resumen de Datos (Top Productos por Ingresos)")
         st.markdown("Tabla resumen de los productos con mayor rendimiento en el periodo seleccionado.")
         
-        # Ordenar y mostrar el top 20 por ingresos
-        df_top_20_ingresos = df_filtered_by_month.sort_values(by='ingresos_totales', ascending=False).head(20)
-        st.dataframe(df_top_20_ingresos.style.format({
-            'ingresos_totales': "${:,.2f}",
-            'crecimiento_porcentual_ventas': "{:,.2f}%",
-            'veces_agregado_al_carrito': "{:,.0f}",
-            'cantidad_total_agregada_carrito': "{:,.0f}"
-        }), use_container_width=True)
+        # Top 20 por ingresos (ordenado y limitado en la base de datos)
+        if df_top_20_ingresos is None:
+            mostrar_error_panel('top_ingresos')
+        else:
+            st.dataframe(df_top_20_ingresos.style.format({
+                'ingresos_totales': "${:,.2f}",
+                'crecimiento_porcentual_ventas': "{:,.2f}%",
+                'veces_agregado_al_carrito': "{:,.0f}",
+                'cantidad_total_agregada_carrito': "{:,.0f}"
+            }), use_container_width=True)
 
         st.markdown("---")
         st.header("📈 Visualizaciones Clave y Análisis Profundo")
 
+        diagnostico.hito('resumen')
+
         # --- PREGUNTA 1: ¿Qué producto genera más ingresos totales? ---
         st.subheader("1. 💰 Productos con Mayores Ingresos Totales")
         st.markdown("Identifica los productos que son los pilares de tus ingresos. Un alto ingreso puede indicar popularidad, buen precio o alta demanda.")
         
-        if not df_filtered_by_month.empty:
-            top_ingresos_product = df_filtered_by_month.sort_values(by='ingresos_totales', ascending=False).iloc[0]
+        if df_top_20_ingresos is None:
+            mostrar_error_panel('top_ingresos')
+        elif not df_top_20_ingresos.empty:
+            top_ingresos_product = df_top_20_ingresos.iloc[0]
             col1, col2 = st.columns(2)
             with col1:
                 st.metric(
@@ -163,7 +211,8 @@ if not df.empty:
                 )
             
             # Gráfico de barras de ingresos por producto (Top N para claridad)
-            chart_ingresos = alt.Chart(df_top_20_ingresos).mark_bar(color='#4CAF50').encode(
+            datos_ingresos = proyectar(df_top_20_ingresos, ['nombre_producto', 'nombre_categoria', 'ingresos_totales'])
+            chart_ingresos = alt.Chart(datos_ingresos).mark_bar(color='#4CAF50').encode(
                 x=alt.X('ingresos_totales', title='Ingresos Totales ($)', axis=alt.Axis(format='$,.0f')),
                 y=alt.Y('nombre_producto', sort='-x', title='Producto'),
                 tooltip=[
@@ -174,24 +223,22 @@ if not df.empty:
             ).properties(
                 title=f'Top 20 Productos por Ingresos en {selected_month.strftime("%B %Y")}'
             ).interactive()
-            st.altair_chart(chart_ingresos, use_container_width=True)
+            dibujar(chart_ingresos, 'ingresos', mostrar_diagnostico)
         else:
             st.info("No hay datos de ingresos disponibles para mostrar.")
 
         st.markdown("---")
 
+        diagnostico.hito('ingresos')
+
         # --- PREGUNTA 2: ¿Qué productos están creciendo más rápidamente en ventas? ---
         st.subheader("2. 🚀 Productos con Mayor Crecimiento en Ventas")
         st.markdown("Descubre qué productos están ganando tracción. Un alto crecimiento puede señalar tendencias emergentes o campañas exitosas.")
         
-        # Filtrar para productos con crecimiento real (no nulo ni infinito) y ordenar
-        df_crecimiento = df_filtered_by_month[
-            df_filtered_by_month['crecimiento_porcentual_ventas'].notna() & 
-            (df_filtered_by_month['crecimiento_porcentual_ventas'] != float('inf')) &
-            (df_filtered_by_month['crecimiento_porcentual_ventas'] != float('-inf'))
-        ].sort_values(by='crecimiento_porcentual_ventas', ascending=False).head(10)
-        
-        if not df_crecimiento.empty:
+        # Top 10 productos con crecimiento real (no nulo), ordenados en la base de datos
+        if df_crecimiento is None:
+            mostrar_error_panel('top_crecimiento')
+        elif not df_crecimiento.empty:
             top_crecimiento_product = df_crecimiento.iloc[0]
             st.metric(
                 label=f"Producto con mayor crecimiento",
@@ -233,19 +280,25 @@ if not df.empty:
 
         st.markdown("---")
 
+        diagnostico.hito('crecimiento')
+
         # --- PREGUNTA 3: ¿Qué producto muestra mayor intención de compra? ---
         st.subheader("3. 🛒 Productos con Mayor Intención de Compra")
         st.markdown("Comprende qué productos captan más la atención de los usuarios, incluso si aún no se han convertido en ventas. Esto puede indicar interés no concretado o productos para futuras campañas.")
         
-        if not df_filtered_by_month.empty:
-            top_intencion_product = df_filtered_by_month.sort_values(by='cantidad_total_agregada_carrito', ascending=False).iloc[0]
+        if df_top_20_intencion is None:
+            mostrar_error_panel('top_intencion')
+        elif not df_top_20_intencion.empty:
+            top_intencion_product = df_top_20_intencion.iloc[0]
             st.metric(
                 label=f"Producto más agregado al carrito",
                 value=f"{top_intencion_product['nombre_producto']}",
                 delta=f"{top_intencion_product['cantidad_total_agregada_carrito']:,.0f} veces"
             )
 
-            chart_intencion = alt.Chart(df_filtered_by_month.sort_values(by='cantidad_total_agregada_carrito', ascending=False).head(20)).mark_bar(color='#2196F3').encode(
+            datos_intencion = proyectar(df_top_20_intencion,
+                                        ['nombre_producto', 'nombre_categoria', 'cantidad_total_agregada_carrito'])
+            chart_intencion = alt.Chart(datos_intencion).mark_bar(color='#2196F3').encode(
                 x=alt.X('cantidad_total_agregada_carrito', title='Cantidad Agregada al Carrito'),
                 y=alt.Y('nombre_producto', sort='-x', title='Producto'),
                 tooltip=[
@@ -256,53 +309,73 @@ if not df.empty:
             ).properties(
                 title=f'Top 20 Productos por Cantidad Agregada al Carrito en {selected_month.strftime("%B %Y")}'
             ).interactive()
-            st.altair_chart(chart_intencion, use_container_width=True)
+            dibujar(chart_intencion, 'intención', mostrar_diagnostico)
         else:
             st.info("No hay datos de intención de compra disponibles para mostrar.")
             
         st.markdown("---")
 
+        diagnostico.hito('intención')
+
         # --- PREGUNTA 4: ¿Los productos más agregados al carrito también son los que más ingresos generan? ---
         st.subheader("4. 🎯 Correlación: Ingresos vs. Intención de Compra")
         st.markdown("Este gráfico de dispersión te ayuda a visualizar la relación entre la popularidad (intención de compra) y el éxito en ventas (ingresos).")
         
-        chart_scatter = alt.Chart(df_filtered_by_month).mark_circle(size=80, opacity=0.7).encode(
-            x=alt.X('cantidad_total_agregada_carrito', title='Cantidad Agregada al Carrito', axis=alt.Axis(format=',.0f')),
-            y=alt.Y('ingresos_totales', title='Ingresos Totales ($)', axis=alt.Axis(format='$,.0f')),
-            tooltip=[
-                alt.Tooltip('nombre_producto', title='Producto'),
-                alt.Tooltip('nombre_categoria', title='Categoría'),
-                alt.Tooltip('ingresos_totales', title='Ingresos', format='$,.2f'),
-                alt.Tooltip('cantidad_total_agregada_carrito', title='Veces en Carrito', format=',.0f')
-            ],
-            color=alt.Color('nombre_categoria', title='Categoría', legend=alt.Legend(orient="bottom", columns=2)), # Color por categoría
-            size=alt.Size('ingresos_totales', legend=None) # Tamaño del círculo por ingresos
-        ).properties(
-            title=f'Ingresos vs. Cantidad Agregada al Carrito en {selected_month.strftime("%B %Y")}'
-        ).interactive()
-        st.altair_chart(chart_scatter, use_container_width=True)
-
-        st.markdown("""
-        **Interpretación del gráfico de dispersión:**
-        * **Arriba a la derecha:** Productos de alto valor y alta intención (¡tus estrellas!).
-        * **Abajo a la derecha:** Alta intención, pero bajos ingresos (posibles carritos abandonados, productos de bajo precio o problemas de conversión).
-        * **Arriba a la izquierda:** Bajos carritos, pero altos ingresos (productos de nicho, alta gama, o compras impulsivas).
-        * **Abajo a la izquierda:** Bajo rendimiento en ambos (posibles productos a revisar o descontinuar).
-        """)
+        if df_filtered_by_month is None:
+            mostrar_error_panel('datos_dispersion')
+        else:
+            # Con catálogos grandes las zonas densas se agrupan y el resto se muestrea por categoría
+            with medir('transformación', 'dispersión', filas=len(df_filtered_by_month)):
+                datos_dispersion, reduccion = reducir_dispersion(
+                    proyectar(df_filtered_by_month, ['nombre_producto', 'nombre_categoria', 'ingresos_totales',
+                                                     'cantidad_total_agregada_carrito']),
+                    x='cantidad_total_agregada_carrito', y='ingresos_totales',
+                    color='nombre_categoria', etiqueta='nombre_producto'
+                )
+            chart_scatter = alt.Chart(datos_dispersion).mark_circle(size=80, opacity=0.7).encode(
+                x=alt.X('cantidad_total_agregada_carrito', title='Cantidad Agregada al Carrito', axis=alt.Axis(format=',.0f')),
+                y=alt.Y('ingresos_totales', title='Ingresos Totales ($)', axis=alt.Axis(format='$,.0f')),
+                tooltip=[
+                    alt.Tooltip('nombre_producto', title='Producto'),
+                    alt.Tooltip('nombre_categoria', title='Categoría'),
+                    alt.Tooltip('ingresos_totales', title='Ingresos', format='$,.2f'),
+                    alt.Tooltip('cantidad_total_agregada_carrito', title='Veces en Carrito', format=',.0f'),
+                    alt.Tooltip(COLUMNA_PRODUCTOS, title='Productos en el punto', format=',.0f')
+                ],
+                color=alt.Color('nombre_categoria', title='Categoría', legend=alt.Legend(orient="bottom", columns=2)), # Color por categoría
+                size=alt.Size('ingresos_totales', legend=None) # Tamaño del círculo por ingresos
+            ).properties(
+                title=f'Ingresos vs. Cantidad Agregada al Carrito en {selected_month.strftime("%B %Y")}'
+            ).interactive()
+            dibujar(chart_scatter, 'dispersión', mostrar_diagnostico)
+            if reduccion['puntos'] < reduccion['filas_origen']:
+                st.caption(
+                    f"Se muestran {reduccion['puntos']:,} puntos para {reduccion['filas_origen']:,} productos: "
+                    f"{reduccion['agrupados']:,} productos de zonas densas agrupados por celda (el tooltip indica "
+                    f"cuántos y los valores promedio)"
+                    + (f" y una muestra por categoría del resto ({reduccion['omitidos']:,} productos sin dibujar)."
+                       if reduccion['omitidos'] else ".")
+                )
+
+            st.markdown("""
+            **Interpretación del gráfico de dispersión:**
+            * **Arriba a la derecha:** Productos de alto valor y alta intención (¡tus estrellas!).
+            * **Abajo a la derecha:** Alta intención, pero bajos ingresos (posibles carritos abandonados, productos de bajo precio o problemas de conversión).
+            * **Arriba a la izquierda:** Bajos carritos, pero altos ingresos (productos de nicho, alta gama, o compras impulsivas).
+            * **Abajo a la izquierda:** Bajo rendimiento en ambos (posibles productos a revisar o descontinuar).
+            """)
 
         st.markdown("---")
 
+        diagnostico.hito('dispersión')
+
         # --- PREGUNTA 5: ¿Qué producto creció más y se convirtió en el top en ingresos? ---
         st.subheader("5. 🏆 Productos Estrella: Alto Crecimiento y Alto Rendimiento")
         st.markdown("Identifica los productos que no solo generan muchos ingresos, sino que también están creciendo rápidamente. Estos son candidatos ideales para inversión y promoción.")
         
-        df_high_growth_high_revenue = df_filtered_by_month[
-            df_filtered_by_month['crecimiento_porcentual_ventas'].notna() &
-            (df_filtered_by_month['crecimiento_porcentual_ventas'] != float('inf')) &
-            (df_filtered_by_month['crecimiento_porcentual_ventas'] != float('-inf'))
-        ].sort_values(by=['rank_crecimiento_ventas', 'rank_ingresos_totales']).head(10)
-
-        if not df_high_growth_high_revenue.empty:
+        if df_high_growth_high_revenue is None:
+            mostrar_error_panel('productos_estrella')
+        elif not df_high_growth_high_revenue.empty:
             st.dataframe(df_high_growth_high_revenue[[
                 'nombre_producto',
                 'nombre_categoria',
@@ -323,17 +396,15 @@ if not df.empty:
 
         st.markdown("---")
 
+        diagnostico.hito('estrella')
+
         # --- PREGUNTA 6: ¿Cuál es el producto con alta tasa de crecimiento y alta intención (carrito)? ---
         st.subheader("6. 💡 Productos con Potencial: Alto Crecimiento y Alta Intención de Compra")
         st.markdown("Descubre productos que están ganando popularidad y que los usuarios están explorando activamente. Son fuertes candidatos para convertirse en los próximos éxitos de ventas.")
 
-        df_high_growth_high_intencion = df_filtered_by_month[
-            df_filtered_by_month['crecimiento_porcentual_ventas'].notna() &
-            (df_filtered_by_month['crecimiento_porcentual_ventas'] != float('inf')) &
-            (df_filtered_by_month['crecimiento_porcentual_ventas'] != float('-inf'))
-        ].sort_values(by=['rank_crecimiento_ventas', 'rank_veces_agregado_carrito']).head(10)
-
-        if not df_high_growth_high_intencion.empty:
+        if df_high_growth_high_intencion is None:
+            mostrar_error_panel('productos_potencial')
+        elif not df_high_growth_high_intencion.empty:
             st.dataframe(df_high_growth_high_intencion[[
                 'nombre_producto',
                 'nombre_categoria',
@@ -351,6 +422,70 @@ if not df.empty:
             """)
         else:
             st.info("No hay productos con datos de crecimiento y/o intención de compra para analizar en conjunto en este mes o categoría.")
+        diagnostico.hito('potencial')
+
+        st.markdown("---")
+
+        # --- PREGUNTA 7: ¿Con qué métodos se paga y cuánto tardan los pagos? ---
+        st.subheader("7. 💳 Métodos de Pago: Mix, Rechazos y Demora")
+        st.markdown("Muestra con qué métodos se pagan los ingresos del periodo y cómo se comporta cada método: participación, pagos fallidos o reembolsados y horas desde la orden hasta el pago.")
+
+        if df_mix_metodos is None:
+            mostrar_error_panel('mix_metodos')
+        elif not df_mix_metodos.empty:
+            datos_mix = proyectar(df_mix_metodos, ['nombre_metodo_pago', 'ingresos_atribuidos', 'participacion_ingresos'])
+            chart_mix = alt.Chart(datos_mix).mark_bar(color='#9C27B0').encode(
+                x=alt.X('ingresos_atribuidos', title='Ingresos Atribuidos ($)', axis=alt.Axis(format='$,.0f')),
+                y=alt.Y('nombre_metodo_pago', sort='-x', title='Método de Pago'),
+                tooltip=[
+                    alt.Tooltip('nombre_metodo_pago', title='Método'),
+                    alt.Tooltip('ingresos_atribuidos', title='Ingresos', format='$,.2f'),
+                    alt.Tooltip('participacion_ingresos', title='Participación (%)', format=',.2f')
+                ]
+            ).properties(
+                title=f'Ingresos por Método de Pago en {selected_month.strftime("%B %Y")}'
+            )
+            dibujar(chart_mix, 'métodos de pago', mostrar_diagnostico)
+        else:
+            st.info("No hay ingresos con métodos de pago registrados para este mes o categoría.")
+
+        if df_pagos_metodos is None:
+            mostrar_error_panel('pagos_metodos')
+        elif not df_pagos_metodos.empty:
+            st.markdown("#### Pagos del Mes por Método")
+            st.markdown("Movimientos del historial de pagos del mes, de todas las categorías (cada pago corresponde a la orden completa).")
+            st.dataframe(df_pagos_metodos.style.format({
+                'monto_total': "${:,.2f}",
+                'participacion_monto': "{:,.2f}%",
+                'tasa_aprobacion': "{:,.2f}%",
+                'tasa_fallo': "{:,.2f}%",
+                'tasa_reembolso': "{:,.2f}%",
+                'horas_hasta_pago_p50': "{:,.1f} h",
+                'horas_hasta_pago_p90': "{:,.1f} h"
+            }), use_container_width=True, hide_index=True)
+        else:
+            st.info("No hay pagos registrados en este mes.")
+
+        st.markdown("---")
+
+        diagnostico.hito('pagos')
+
+        # --- PREGUNTA 8: ¿Qué productos están mejor calificados y cómo evoluciona su calificación? ---
+        st.subheader("8. ⭐ Productos Mejor Calificados")
+        st.markdown("Productos con mejor calificación promedio en las reseñas del mes, con su promedio histórico y la variación respecto del mes anterior con reseñas.")
+
+        if df_mejor_calificados is None:
+            mostrar_error_panel('mejor_calificados')
+        elif not df_mejor_calificados.empty:
+            st.dataframe(df_mejor_calificados.style.format({
+                'calificacion_promedio': "{:,.2f}",
+                'calificacion_acumulada': "{:,.2f}",
+                'variacion_calificacion': "{:+,.2f}",
+                'reseñas': "{:,.0f}"
+            }, na_rep='-'), use_container_width=True, hide_index=True)
+        else:
+            st.info("No hay reseñas disponibles para este mes o categoría.")
+        diagnostico.hito('calificaciones')
 
 else:
     st.error("❌ No hay datos disponibles para mostrar. Por favor, verifica tu conexión a la base de datos y asegúrate de que dbt se haya ejecutado correctamente para generar el modelo `rpt_analisis_productos_kpis`.")
@@ -361,4 +496,23 @@ else:
     3.  Ejecuta `dbt run --full-refresh` en tu terminal para reconstruir todos los modelos.
     4.  Si el problema persiste, revisa los logs de tu aplicación Streamlit para errores detallados.
     """)
-st.markdown("---")
\ No newline at end of file
+st.markdown("---")
+
+# --- Diagnóstico de rendimiento ---
+if mostrar_diagnostico:
+    with st.sidebar.expander("🩺 Diagnóstico", expanded=True):
+        etapas = pd.DataFrame(diagnostico.etapas)
+        if not etapas.empty:
+            st.markdown("**Tiempo por etapa (ms)**")
+            st.dataframe(etapas.groupby('etapa', sort=False)['ms'].sum().round(1), use_container_width=True)
+            st.dataframe(etapas, use_container_width=True, hide_index=True)
+        graficos = etapas[etapas['etapa'] == 'gráfico'] if not etapas.empty else etapas
+        if not graficos.empty:
+            st.markdown("**Datos enviados al navegador por gráfico**")
+            st.dataframe(graficos[['nombre', 'filas', 'bytes_enviados']], use_container_width=True, hide_index=True)
+        sentencias = pd.DataFrame(diagnostico.sentencias)
+        st.markdown(f"**Sentencias SQL en esta corrida:** {len(sentencias)}")
+        if not sentencias.empty:
+            st.dataframe(sentencias[['ms', 'filas', 'bytes_enviados', 'bytes_recibidos', 'origen', 'hilo', 'sql']],
+                         use_container_width=True, hide_index=True)
+        st.caption("Las sentencias lentas de todas las sesiones quedan en logs/consultas_lentas.jsonl.")
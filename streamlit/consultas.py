@@ -0,0 +1,231 @@
+# Capa de consultas del dashboard: cada panel pide a la base solo las filas del mes y
+# la categoría seleccionados. Las listas top-N salen del cubo rpt_paneles_kpis, que ya las
+# guarda ordenadas por celda (mes, categoría, panel); el reporte completo solo se lee
+# para la dispersión y los filtros.
+import pandas as pd
+from sqlalchemy import text
+
+from db_conector import get_db_connection
+from instrumentacion import medir, medir_recibidos, origen_llamada
+
+TABLA_KPIS = "rpt_analisis_productos_kpis"
+TABLA_PANELES = "rpt_paneles_kpis"
+
+# Vistas materializadas de pagos y reseñas (REFRESH ... CONCURRENTLY en cada dbt run), con la
+# columna de mes por la que filtra cada una
+VISTA_PAGOS = "mv_pagos_metodos"
+VISTA_MIX_METODOS = "mv_mix_metodos_categorias"
+VISTA_RESEÑAS = "mv_reseñas_productos"
+
+# Valor de la columna `categoria` del cubo para "Todas las Categorías"
+CATEGORIA_TODAS = "__todas__"
+
+# Una fila por modelo gold con la última corrida de dbt que lo reconstruyó
+# (macro registrar_version_datos de proyecto_dbt)
+TABLA_VERSION = "dbt_version_datos"
+
+COLUMNAS_KPIS = [
+    'producto_id',
+    'nombre_producto',
+    'nombre_categoria',
+    'mes_orden',
+    'ingresos_totales',
+    'crecimiento_porcentual_ventas',
+    'veces_agregado_al_carrito',
+    'cantidad_total_agregada_carrito',
+    'rank_ingresos_totales',
+    'rank_crecimiento_ventas',
+    'rank_veces_agregado_carrito'
+]
+
+COLUMNAS_PAGOS = [
+    'nombre_metodo_pago',
+    'pagos',
+    'monto_total',
+    'participacion_monto',
+    'tasa_aprobacion',
+    'tasa_fallo',
+    'tasa_reembolso',
+    'horas_hasta_pago_p50',
+    'horas_hasta_pago_p90'
+]
+
+COLUMNAS_MIX_METODOS = ['nombre_metodo_pago', 'ingresos_atribuidos', 'participacion_ingresos', 'productos']
+
+COLUMNAS_RESEÑAS = [
+    'nombre_producto',
+    'nombre_categoria',
+    'reseñas',
+    'calificacion_promedio',
+    'calificacion_acumulada',
+    'variacion_calificacion'
+]
+
+
+def _leer(query, **parametros):
+    # Los tiempos de lectura y conversión quedan en el diagnóstico del dashboard, si está activo
+    origen = origen_llamada()
+    with medir('lectura', origen), medir_recibidos() as lectura:
+        with get_db_connection() as conn:
+            df = pd.read_sql_query(text(query), conn, params=parametros)
+        # Bytes recibidos: tamaño del resultado ya convertido en DataFrame
+        lectura['bytes_recibidos'] = df.memory_usage(deep=True).sum()
+    with medir('transformación', origen, filas=len(df)):
+        if 'mes_orden' in df.columns:
+            df['mes_orden'] = pd.to_datetime(df['mes_orden'])
+        if 'crecimiento_porcentual_ventas' in df.columns:
+            df['crecimiento_porcentual_ventas'] = pd.to_numeric(df['crecimiento_porcentual_ventas'], errors='coerce')
+    return df
+
+
+def _consultar_kpis(columnas, mes, categoria=None, condicion=None, orden=None, limite=None):
+    """
+    Arma y ejecuta una consulta parametrizada sobre el reporte de KPIs para un mes y,
+    opcionalmente, una categoría (None = todas las categorías).
+    """
+    filtros = ["mes_orden = :mes"]
+    parametros = {'mes': pd.Timestamp(mes).to_pydatetime()}
+    if categoria is not None:
+        filtros.append("nombre_categoria = :categoria")
+        parametros['categoria'] = categoria
+    if condicion:
+        filtros.append(condicion)
+
+    query = f"SELECT {', '.join(columnas)} FROM {TABLA_KPIS} WHERE {' AND '.join(filtros)}"
+    if orden:
+        query += f" ORDER BY {orden}, producto_id"
+    if limite:
+        query += " LIMIT :limite"
+        parametros['limite'] = limite
+    return _leer(query, **parametros)
+
+
+def _consultar_panel(columnas, panel, mes, categoria=None, limite=None):
+    """
+    Lee una lista top-N ya calculada del cubo de paneles: solo filtra por la celda
+    (mes, categoría, panel) y corta por posición, sin ordenar ni rankear en la consulta.
+    """
+    query = (
+        f"SELECT {', '.join(columnas)} FROM {TABLA_PANELES} "
+        "WHERE mes_orden = :mes AND categoria = :categoria AND panel = :panel"
+    )
+    parametros = {
+        'mes': pd.Timestamp(mes).to_pydatetime(),
+        'categoria': CATEGORIA_TODAS if categoria is None else categoria,
+        'panel': panel
+    }
+    if limite:
+        query += " AND posicion <= :limite"
+        parametros['limite'] = limite
+    query += " ORDER BY posicion"
+    return _leer(query, **parametros)
+
+
+def version_datos():
+    """
+    Identificador de la última corrida de dbt que reconstruyó los modelos del dashboard, o
+    None si todavía no hay ninguna registrada. Lee una sola fila de una tabla diminuta, así
+    que se puede consultar seguido para decidir si hay que volver a leer los datos.
+    """
+    with get_db_connection() as conn:
+        fila = conn.execute(text(
+            f"SELECT invocation_id, fecha_actualizacion FROM {TABLA_VERSION} "
+            "ORDER BY fecha_actualizacion DESC LIMIT 1"
+        )).first()
+    if fila is None:
+        return None
+    return f"{fila.invocation_id}@{fila.fecha_actualizacion.isoformat()}"
+
+
+def obtener_meses():
+    """Meses disponibles en el reporte, del más reciente al más antiguo."""
+    df = _leer(f"SELECT DISTINCT mes_orden FROM {TABLA_KPIS} ORDER BY mes_orden DESC")
+    return df['mes_orden'].tolist()
+
+
+def obtener_categorias():
+    df = _leer(
+        f"SELECT DISTINCT nombre_categoria FROM {TABLA_KPIS} "
+        "WHERE nombre_categoria IS NOT NULL ORDER BY nombre_categoria"
+    )
+    return df['nombre_categoria'].tolist()
+
+
+def top_ingresos(mes, categoria=None, limite=20):
+    return _consultar_panel(COLUMNAS_KPIS, 'ingresos', mes, categoria, limite)
+
+
+def top_crecimiento(mes, categoria=None, limite=10):
+    return _consultar_panel(
+        ['nombre_producto', 'nombre_categoria', 'crecimiento_porcentual_ventas', 'ingresos_totales'],
+        'crecimiento', mes, categoria, limite
+    )
+
+
+def top_intencion(mes, categoria=None, limite=20):
+    return _consultar_panel(
+        ['nombre_producto', 'nombre_categoria', 'cantidad_total_agregada_carrito'],
+        'intencion', mes, categoria, limite
+    )
+
+
+def datos_dispersion(mes, categoria=None):
+    """Todos los productos del mes, solo con las columnas que usa el gráfico de dispersión."""
+    return _consultar_kpis(
+        ['nombre_producto', 'nombre_categoria', 'ingresos_totales', 'cantidad_total_agregada_carrito'],
+        mes, categoria
+    )
+
+
+def productos_estrella(mes, categoria=None, limite=10):
+    """Rankings dentro de la categoría elegida (o del mes completo para todas las categorías)."""
+    return _consultar_panel(
+        ['nombre_producto', 'nombre_categoria', 'ingresos_totales', 'crecimiento_porcentual_ventas',
+         'rank_ingresos_totales', 'rank_crecimiento_ventas'],
+        'estrella', mes, categoria, limite
+    )
+
+
+def productos_potencial(mes, categoria=None, limite=10):
+    """Rankings dentro de la categoría elegida (o del mes completo para todas las categorías)."""
+    return _consultar_panel(
+        ['nombre_producto', 'nombre_categoria', 'crecimiento_porcentual_ventas', 'cantidad_total_agregada_carrito',
+         'rank_crecimiento_ventas', 'rank_veces_agregado_carrito'],
+        'potencial', mes, categoria, limite
+    )
+
+
+def pagos_metodos(mes, categoria=None):
+    """
+    Pagos del mes por método, de la vista materializada. Un pago corresponde a la orden completa,
+    así que este panel no se filtra por categoría.
+    """
+    return _leer(
+        f"SELECT {', '.join(COLUMNAS_PAGOS)} FROM {VISTA_PAGOS} "
+        "WHERE mes_pago = :mes ORDER BY monto_total DESC, metodo_pago_id",
+        mes=pd.Timestamp(mes).to_pydatetime()
+    )
+
+
+def mix_metodos(mes, categoria=None):
+    """Ingresos del mes atribuidos a cada método de pago, en la categoría elegida o en todas."""
+    return _leer(
+        f"SELECT {', '.join(COLUMNAS_MIX_METODOS)} FROM {VISTA_MIX_METODOS} "
+        "WHERE mes_orden = :mes AND categoria = :categoria ORDER BY ingresos_atribuidos DESC, metodo_pago_id",
+        mes=pd.Timestamp(mes).to_pydatetime(),
+        categoria=CATEGORIA_TODAS if categoria is None else categoria
+    )
+
+
+def mejor_calificados(mes, categoria=None, limite=10):
+    """Productos con mejor calificación promedio en el mes (a igual promedio, los de más reseñas)."""
+    filtros = ["mes_reseña = :mes"]
+    parametros = {'mes': pd.Timestamp(mes).to_pydatetime(), 'limite': limite}
+    if categoria is not None:
+        filtros.append("nombre_categoria = :categoria")
+        parametros['categoria'] = categoria
+    return _leer(
+        f"SELECT {', '.join(COLUMNAS_RESEÑAS)} FROM {VISTA_RESEÑAS} WHERE {' AND '.join(filtros)} "
+        "ORDER BY calificacion_promedio DESC, reseñas DESC, producto_id LIMIT :limite",
+        **parametros
+    )
@@ -0,0 +1,207 @@
+# Misma interfaz que consultas.py, pero leyendo la exportación columnar de la capa gold
+# (orm/exportar_gold.py) en lugar de consultar PostgreSQL. Los archivos .arrow se abren
+# mapeados en memoria y solo se leen las particiones del mes y las columnas pedidas.
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from instrumentacion import medir, origen_llamada
+from consultas import (CATEGORIA_TODAS, COLUMNAS_KPIS, TABLA_KPIS, TABLA_PANELES, VISTA_PAGOS, VISTA_MIX_METODOS,
+                       VISTA_RESEÑAS, COLUMNAS_PAGOS, COLUMNAS_MIX_METODOS, COLUMNAS_RESEÑAS)
+
+RUTA_DATOS = os.getenv(
+    "DASHBOARD_RUTA_DATOS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'datos', 'gold')
+)
+
+# Columna de partición de cada exportación (exportar_gold.COLUMNAS_PARTICION_MODELO); el resto usa mes_orden
+COLUMNAS_MES = {
+    VISTA_PAGOS: 'mes_pago',
+    VISTA_RESEÑAS: 'mes_reseña'
+}
+
+
+def _particiones(columna):
+    return ds.partitioning(pa.schema([(columna, pa.date32())]), flavor='hive')
+
+_SISTEMA_ARCHIVOS = fs.LocalFileSystem(use_mmap=True)
+
+
+def _dataset(tabla=TABLA_KPIS):
+    """
+    Abre la exportación de una tabla. Se arma en cada llamada (solo lista las carpetas de
+    cada mes) para tomar siempre la última exportación. Las carpetas de cada mes se llaman
+    mes_orden=AAAA-MM-DD, mes_pago=..., según el modelo (COLUMNAS_MES).
+    """
+    ruta = os.path.abspath(os.path.join(RUTA_DATOS, tabla))
+    if not os.path.isdir(ruta):
+        raise FileNotFoundError(
+            f"No se encontró la exportación de {tabla} en {ruta}: hay que correr orm/exportar_gold.py "
+            f"después de dbt run (o usar DASHBOARD_FUENTE=postgres)"
+        )
+    archivos = [os.path.join(carpeta, archivo)
+                for carpeta, _, nombres in os.walk(ruta) for archivo in nombres]
+    formato = 'parquet' if any(archivo.endswith('.parquet') for archivo in archivos) else 'ipc'
+    columna = COLUMNAS_MES.get(tabla, 'mes_orden')
+    return ds.dataset(ruta, format=formato, partitioning=_particiones(columna), filesystem=_SISTEMA_ARCHIVOS)
+
+
+def _a_pandas(tabla):
+    with medir('transformación', origen_llamada(), filas=tabla.num_rows, bytes=tabla.nbytes):
+        df = tabla.to_pandas()
+        if 'mes_orden' in df.columns:
+            df['mes_orden'] = pd.to_datetime(df['mes_orden'])
+    return df
+
+
+def _consultar_kpis(columnas, mes, categoria=None, condicion=None, orden=None, limite=None):
+    """
+    Equivalente a consultas._consultar_kpis: `condicion` es una expresión de pyarrow y `orden`
+    una lista de (columna, 'ascending'|'descending').
+    """
+    filtro = ds.field('mes_orden') == pa.scalar(pd.Timestamp(mes).date(), pa.date32())
+    if categoria is not None:
+        filtro = filtro & (ds.field('nombre_categoria') == categoria)
+    if condicion is not None:
+        filtro = filtro & condicion
+
+    lectura = list(columnas)
+    if orden:
+        lectura += [columna for columna, _ in orden if columna not in lectura]
+        if 'producto_id' not in lectura:
+            lectura.append('producto_id')
+    with medir('lectura', origen_llamada()):
+        tabla = _dataset().to_table(columns=lectura, filter=filtro)
+    if orden:
+        tabla = tabla.sort_by(list(orden) + [('producto_id', 'ascending')])
+    if limite:
+        tabla = tabla.slice(0, limite)
+    return _a_pandas(tabla.select(list(columnas)))
+
+
+def _consultar_panel(columnas, panel, mes, categoria=None, limite=None):
+    """Equivalente a consultas._consultar_panel sobre la exportación del cubo de paneles."""
+    filtro = (
+        (ds.field('mes_orden') == pa.scalar(pd.Timestamp(mes).date(), pa.date32()))
+        & (ds.field('categoria') == (CATEGORIA_TODAS if categoria is None else categoria))
+        & (ds.field('panel') == panel)
+    )
+    if limite:
+        filtro = filtro & (ds.field('posicion') <= limite)
+    lectura = list(columnas) + (['posicion'] if 'posicion' not in columnas else [])
+    with medir('lectura', origen_llamada()):
+        tabla = _dataset(TABLA_PANELES).to_table(columns=lectura, filter=filtro).sort_by('posicion')
+    return _a_pandas(tabla.select(list(columnas)))
+
+
+def version_datos():
+    """
+    Equivalente a consultas.version_datos: exportar_gold.py reemplaza la carpeta de cada
+    modelo al terminar, así que su fecha de modificación cambia con cada exportación.
+    """
+    marcas = [
+        os.stat(ruta).st_mtime_ns
+        for ruta in (os.path.join(RUTA_DATOS, tabla)
+                     for tabla in (TABLA_KPIS, TABLA_PANELES, VISTA_PAGOS, VISTA_MIX_METODOS, VISTA_RESEÑAS))
+        if os.path.isdir(ruta)
+    ]
+    return str(max(marcas)) if marcas else None
+
+
+def obtener_meses():
+    """Meses disponibles en la exportación, del más reciente al más antiguo."""
+    fragmentos = _dataset().get_fragments()
+    # Una exportación vacía tiene un solo archivo, fuera de las carpetas de meses
+    meses = {
+        ds.get_partition_keys(fragmento.partition_expression).get('mes_orden')
+        for fragmento in fragmentos
+    } - {None}
+    return [pd.Timestamp(mes) for mes in sorted(meses, reverse=True)]
+
+
+def obtener_categorias():
+    tabla = _dataset().to_table(columns=['nombre_categoria'])
+    categorias = pc.unique(tabla['nombre_categoria']).drop_null()
+    return sorted(categorias.to_pylist())
+
+
+def top_ingresos(mes, categoria=None, limite=20):
+    return _consultar_panel(COLUMNAS_KPIS, 'ingresos', mes, categoria, limite)
+
+
+def top_crecimiento(mes, categoria=None, limite=10):
+    return _consultar_panel(
+        ['nombre_producto', 'nombre_categoria', 'crecimiento_porcentual_ventas', 'ingresos_totales'],
+        'crecimiento', mes, categoria, limite
+    )
+
+
+def top_intencion(mes, categoria=None, limite=20):
+    return _consultar_panel(
+        ['nombre_producto', 'nombre_categoria', 'cantidad_total_agregada_carrito'],
+        'intencion', mes, categoria, limite
+    )
+
+
+def datos_dispersion(mes, categoria=None):
+    """Todos los productos del mes, solo con las columnas que usa el gráfico de dispersión."""
+    return _consultar_kpis(
+        ['nombre_producto', 'nombre_categoria', 'ingresos_totales', 'cantidad_total_agregada_carrito'],
+        mes, categoria
+    )
+
+
+def productos_estrella(mes, categoria=None, limite=10):
+    """Rankings dentro de la categoría elegida (o del mes completo para todas las categorías)."""
+    return _consultar_panel(
+        ['nombre_producto', 'nombre_categoria', 'ingresos_totales', 'crecimiento_porcentual_ventas',
+         'rank_ingresos_totales', 'rank_crecimiento_ventas'],
+        'estrella', mes, categoria, limite
+    )
+
+
+def productos_potencial(mes, categoria=None, limite=10):
+    """Rankings dentro de la categoría elegida (o del mes completo para todas las categorías)."""
+    return _consultar_panel(
+        ['nombre_producto', 'nombre_categoria', 'crecimiento_porcentual_ventas', 'cantidad_total_agregada_carrito',
+         'rank_crecimiento_ventas', 'rank_veces_agregado_carrito'],
+        'potencial', mes, categoria, limite
+    )
+
+
+def _leer_vista(tabla, columnas, filtro, orden, limite=None):
+    """Lee el mes y las columnas pedidas de una vista exportada, ordenada por `orden`."""
+    lectura = list(columnas) + [columna for columna, _ in orden if columna not in columnas]
+    with medir('lectura', origen_llamada()):
+        resultado = _dataset(tabla).to_table(columns=lectura, filter=filtro).sort_by(orden)
+    if limite:
+        resultado = resultado.slice(0, limite)
+    return _a_pandas(resultado.select(list(columnas)))
+
+
+def _mes(columna, mes):
+    return ds.field(columna) == pa.scalar(pd.Timestamp(mes).date(), pa.date32())
+
+
+def pagos_metodos(mes, categoria=None):
+    """Equivalente a consultas.pagos_metodos (sin filtro de categoría)."""
+    return _leer_vista(VISTA_PAGOS, COLUMNAS_PAGOS, _mes('mes_pago', mes),
+                       [('monto_total', 'descending'), ('metodo_pago_id', 'ascending')])
+
+
+def mix_metodos(mes, categoria=None):
+    filtro = _mes('mes_orden', mes) & (ds.field('categoria') == (CATEGORIA_TODAS if categoria is None else categoria))
+    return _leer_vista(VISTA_MIX_METODOS, COLUMNAS_MIX_METODOS, filtro,
+                       [('ingresos_atribuidos', 'descending'), ('metodo_pago_id', 'ascending')])
+
+
+def mejor_calificados(mes, categoria=None, limite=10):
+    filtro = _mes('mes_reseña', mes)
+    if categoria is not None:
+        filtro = filtro & (ds.field('nombre_categoria') == categoria)
+    return _leer_vista(VISTA_RESEÑAS, COLUMNAS_RESEÑAS, filtro,
+                       [('calificacion_promedio', 'descending'), ('reseñas', 'descending'), ('producto_id', 'ascending')],
+                       limite)
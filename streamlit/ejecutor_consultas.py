@@ -0,0 +1,82 @@
+# Ejecuta en paralelo las consultas independientes de los paneles del dashboard. Cada consulta
+# corre en un hilo con su propia conexión del pool de db_conector, así que la página tarda lo
+# que la consulta más lenta y no la suma de todas. Una consulta que falla o se pasa de su
+# tiempo límite no impide mostrar las demás.
+import os
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as TiempoAgotado
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Hilos compartidos por todas las sesiones; conviene que alcancen para los paneles de una
+# página (nueve) y que no superen el pool de conexiones (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+MAX_HILOS = int(os.getenv("DASHBOARD_HILOS_CONSULTAS", "12"))
+SEGUNDOS_TIMEOUT = float(os.getenv("DASHBOARD_TIMEOUT_CONSULTA", "20"))
+# Espera máxima por un hilo libre cuando otras sesiones ocupan el pool
+SEGUNDOS_ESPERA_HILO = float(os.getenv("DASHBOARD_ESPERA_HILO", "30"))
+
+_ejecutor = ThreadPoolExecutor(max_workers=MAX_HILOS, thread_name_prefix="consulta_panel")
+
+
+class ConsultaVencida(Exception):
+    """La consulta no terminó dentro de su tiempo límite."""
+
+
+class _Tarea:
+    """Consulta de un panel con el momento en que un hilo la empezó a ejecutar."""
+
+    def __init__(self, funcion, contexto):
+        self.funcion = funcion
+        self.contexto = contexto
+        # Los hilos del ejecutor no son de Streamlit: se les pasa el contexto de la sesión que
+        # pidió la consulta para que st.cache_data y los avisos funcionen como en el hilo principal,
+        # y una copia de las variables de contexto (el diagnóstico activo de instrumentacion.py)
+        self.variables = contextvars.copy_context()
+        self.iniciada = threading.Event()
+        self.inicio = None
+
+    def __call__(self):
+        self.inicio = time.monotonic()
+        self.iniciada.set()
+        if self.contexto is not None:
+            add_script_run_ctx(threading.current_thread(), self.contexto)
+        return self.variables.run(self.funcion)
+
+
+def ejecutar_consultas(consultas, timeout=SEGUNDOS_TIMEOUT, timeouts=None, espera_hilo=SEGUNDOS_ESPERA_HILO):
+    """
+    Lanza a la vez las consultas de `consultas` ({nombre: función sin argumentos}) y espera
+    a cada una hasta su tiempo límite en segundos, contado desde que un hilo la empieza a
+    ejecutar (no desde que queda en la cola del pool compartido): `timeouts` permite uno
+    distinto por nombre, el resto usa `timeout`. Una consulta que no consigue hilo en
+    `espera_hilo` segundos se descarta sin ejecutarse.
+    Devuelve (resultados, errores): {nombre: resultado} de las que terminaron bien y
+    {nombre: excepción} de las que fallaron o vencieron.
+
+    Un hilo no se puede interrumpir: la consulta vencida sigue hasta que termina o hasta que
+    PostgreSQL la corta por DB_STATEMENT_TIMEOUT_MS, pero la página ya no la espera.
+    """
+    timeouts = timeouts or {}
+    contexto = get_script_run_ctx()
+    lanzamiento = time.monotonic()
+    tareas = {nombre: _Tarea(funcion, contexto) for nombre, funcion in consultas.items()}
+    futuros = {nombre: _ejecutor.submit(tarea) for nombre, tarea in tareas.items()}
+
+    resultados, errores = {}, {}
+    for nombre, futuro in futuros.items():
+        tarea = tareas[nombre]
+        if not tarea.iniciada.wait(max(0.0, lanzamiento + espera_hilo - time.monotonic())) and futuro.cancel():
+            errores[nombre] = ConsultaVencida(f"la consulta esperó más de {espera_hilo:g} s un hilo libre y no se ejecutó")
+            continue
+        limite = timeouts.get(nombre, timeout)
+        restante = max(0.0, tarea.inicio + limite - time.monotonic()) if tarea.inicio is not None else limite
+        try:
+            resultados[nombre] = futuro.result(timeout=restante)
+        except TiempoAgotado:
+            futuro.cancel()
+            errores[nombre] = ConsultaVencida(f"la consulta superó los {limite:g} s")
+        except Exception as e:
+            errores[nombre] = e
+    return resultados, errores
@@ -0,0 +1,129 @@
+# Preparación de los datos de los gráficos del dashboard. Altair incrusta el DataFrame completo
+# en la especificación Vega-Lite que se manda al navegador, así que el tamaño de cada gráfico
+# crece con el catálogo. Antes de dibujar:
+#   - se envían solo las columnas que el gráfico codifica, con los montos redondeados;
+#   - en la dispersión, las zonas densas se agrupan en celdas de una grilla 2D (un punto por
+#     celda y categoría, con la cantidad de productos que representa) y los productos aislados
+#     quedan como puntos individuales;
+#   - si aún así se supera el máximo de puntos, se toma una muestra estratificada por categoría
+#     (todas las categorías conservan puntos, en proporción a su tamaño).
+# Así el JSON de cada gráfico queda acotado sin importar cuántos productos tenga el catálogo.
+import os
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from instrumentacion import diagnostico_actual
+
+# Puntos máximos de un gráfico de dispersión (Altair rechaza más de 5000 filas por defecto)
+MAX_PUNTOS = int(os.getenv("DASHBOARD_MAX_PUNTOS", "2000"))
+# Divisiones de cada eje de la grilla con la que se agrupan las zonas densas
+CELDAS_GRILLA = int(os.getenv("DASHBOARD_CELDAS_GRILLA", "40"))
+# Semilla de la muestra: la misma selección en cada corrida para los mismos datos
+SEMILLA_MUESTRA = 42
+
+COLUMNA_PRODUCTOS = 'productos'
+
+
+def proyectar(df, columnas, decimales=2):
+    """Solo las columnas que usa el gráfico, con los decimales redondeados (menos texto en el JSON)."""
+    datos = df[list(columnas)].copy()
+    for columna in datos.select_dtypes(include='floating').columns:
+        datos[columna] = datos[columna].round(decimales)
+    return datos
+
+
+def muestra_estratificada(df, estrato, maximo, semilla=SEMILLA_MUESTRA):
+    """
+    Hasta `maximo` filas repartidas entre los valores de `estrato` en proporción a su tamaño,
+    con al menos una fila por estrato (si `maximo` alcanza). Conserva el orden original.
+    """
+    if len(df) <= maximo:
+        return df
+    tamanos = df.groupby(estrato, dropna=False, sort=False).size()
+    cuotas = np.maximum(1, np.floor(tamanos.to_numpy() * maximo / len(df))).astype(np.int64)
+    # El redondeo hacia abajo deja lugares libres: se reparten entre los estratos más grandes
+    sobrantes = maximo - cuotas.sum()
+    if sobrantes > 0:
+        restos = tamanos.to_numpy() - cuotas
+        for posicion in np.argsort(-restos)[:sobrantes]:
+            cuotas[posicion] += restos[posicion] > 0
+    cuotas = dict(zip(tamanos.index, np.minimum(cuotas, tamanos.to_numpy())))
+
+    rng = np.random.default_rng(semilla)
+    elegidas = []
+    for valor, grupo in df.groupby(estrato, dropna=False, sort=False):
+        elegidas.append(rng.choice(grupo.index.to_numpy(), size=cuotas[valor], replace=False))
+    return df.loc[np.sort(np.concatenate(elegidas))]
+
+
+def _celdas(valores, celdas):
+    minimo, maximo = np.nanmin(valores), np.nanmax(valores)
+    if maximo <= minimo:
+        return np.zeros(len(valores), dtype=np.int64)
+    return np.minimum(((valores - minimo) / (maximo - minimo) * celdas).astype(np.int64), celdas - 1)
+
+
+def reducir_dispersion(df, x, y, color, etiqueta, maximo=MAX_PUNTOS, celdas=CELDAS_GRILLA):
+    """
+    Datos de un gráfico de dispersión con a lo sumo `maximo` puntos. Cada fila del resultado
+    tiene la columna 'productos': 1 para un producto individual o la cantidad de productos de
+    una celda agrupada (en `etiqueta` dice "N productos" y `x`/`y` son los promedios).
+
+    Se agrupan primero las celdas (por categoría) con más productos, hasta que los puntos
+    entran en el máximo. Devuelve (datos, resumen) con las filas de origen, los puntos
+    enviados, los productos agrupados y los que quedaron fuera de la muestra.
+    """
+    resumen = {'filas_origen': len(df), 'puntos': len(df), 'agrupados': 0, 'omitidos': 0}
+    datos = df.assign(**{COLUMNA_PRODUCTOS: 1})
+    if len(df) <= maximo:
+        return datos, resumen
+
+    valores_x = df[x].to_numpy(dtype='float64')
+    valores_y = df[y].to_numpy(dtype='float64')
+    datos['_celda'] = _celdas(valores_x, celdas) * celdas + _celdas(valores_y, celdas)
+    por_celda = datos.groupby(['_celda', color], dropna=False, sort=False)
+    tamanos = por_celda[COLUMNA_PRODUCTOS].transform('size').to_numpy()
+
+    # Agrupar una celda de n productos ahorra n - 1 puntos: se agrupan las más pobladas primero
+    conteos = np.sort(por_celda.size().to_numpy())[::-1]
+    ahorro = np.cumsum(conteos - 1)
+    necesarias = int(np.searchsorted(ahorro, len(df) - maximo)) + 1
+    umbral = conteos[min(necesarias, len(conteos)) - 1]
+    agrupar = tamanos >= max(umbral, 2)
+
+    individuales = datos[~agrupar].drop(columns='_celda')
+    densas = datos[agrupar]
+    agrupadas = (densas.groupby(['_celda', color], dropna=False, sort=False)
+                 .agg(**{x: (x, 'mean'), y: (y, 'mean'), COLUMNA_PRODUCTOS: (COLUMNA_PRODUCTOS, 'size')})
+                 .reset_index()
+                 .drop(columns='_celda'))
+    agrupadas[etiqueta] = agrupadas[COLUMNA_PRODUCTOS].map(lambda cantidad: f"{cantidad:,} productos")
+
+    # Si aun agrupando todas las celdas no alcanza, se muestrean los puntos individuales
+    lugar = max(maximo - len(agrupadas), 0)
+    muestra = muestra_estratificada(individuales, color, lugar)
+    resultado = pd.concat([agrupadas, muestra], ignore_index=True)[list(df.columns) + [COLUMNA_PRODUCTOS]]
+    if len(resultado) > maximo:
+        resultado = muestra_estratificada(resultado, color, maximo)
+
+    resumen.update(puntos=len(resultado), agrupados=int(len(densas)),
+                   omitidos=len(df) - int(resultado[COLUMNA_PRODUCTOS].sum()))
+    return resultado, resumen
+
+
+def dibujar(chart, nombre, medir_tamano=False):
+    """
+    Dibuja un gráfico de Altair. Con `medir_tamano`, registra en el diagnóstico del dashboard
+    las filas incrustadas y el tamaño en bytes de la especificación que se envía al navegador
+    (serializarla cuesta tiempo, así que solo se mide con el diagnóstico visible).
+    """
+    diagnostico = diagnostico_actual()
+    if medir_tamano and diagnostico is not None:
+        inicio = time.perf_counter()
+        tamano = len(chart.to_json(indent=None).encode('utf-8'))
+        filas = len(chart.data) if isinstance(chart.data, pd.DataFrame) else None
+        diagnostico.registrar_etapa('gráfico', nombre, (time.perf_counter() - inicio) * 1000,
+                                    filas=filas, bytes_enviados=tamano)
+    st.altair_chart(chart, use_container_width=True)